@@ -0,0 +1,39 @@
+# Změří režii přetlumočení jednoho řádku v interaktivní konzoli (jeden
+# prepis_kod() na vstup) a ověří, že zůstává pod milisekundou. Jako ostatní
+# měření času běží mimo testy, kde by na vytíženém stroji náhodně selhávalo.
+#
+#   python benchmarks/bench_konzole.py [POCET_RADKU]
+#
+# Návratový kód: 0 v pořádku, 1 režie nad limitem.
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from zmije.konzole import prepis_kod
+
+LIMIT = 0.001
+
+
+def zmer(pocet, opakovani=5):
+    nejlepsi = None
+    for _ in range(opakovani):
+        zacatek = time.perf_counter()
+        for i in range(pocet):
+            prepis_kod(f"Hodnota = {i},5 + Pravda\n")
+        doba = (time.perf_counter() - zacatek) / pocet
+        nejlepsi = doba if nejlepsi is None else min(nejlepsi, doba)
+    return nejlepsi
+
+
+def hlavni():
+    pocet = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    doba = zmer(pocet)
+    print(f"režie na řádek: {doba * 1e6:8.1f} µs (limit {LIMIT * 1e6:.0f} µs)")
+    return 0 if doba < LIMIT else 1
+
+
+if __name__ == "__main__":
+    sys.exit(hlavni())
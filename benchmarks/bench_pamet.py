@@ -0,0 +1,101 @@
+# Změří špičku alokované paměti (tracemalloc) pro jednotlivé fáze převodu
+# a pro celé prepis_kod() a transpiluj() na generovaném zdroji zadané
+# velikosti. Vstupy fáze se připraví předem, takže se do špičky nepočítají.
+# Vypisuje se špička v MB na MB zdroje v UTF-8 a jako násobek velikosti
+# řetězce se zdrojem v paměti (sys.getsizeof; český text drží CPython po
+# dvou bajtech na znak). Fáze jsou měřeny na celém vstupu, prepis_kod()
+# a transpiluj() je ve skutečnosti pouštějí po blocích.
+#
+#   python benchmarks/bench_pamet.py [VELIKOST_MB]
+
+import os
+import sys
+import tokenize
+import tracemalloc
+import warnings
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from tests.program_generator import generate_program
+from zmije.main import (
+    ctecka_radku,
+    prepis_kod,
+    spust_pruchody,
+    transpiluj,
+    validuj_promenne_velkymi_pismeny,
+    validuj_zadna_anglicka_klicova_slova,
+)
+
+
+def generovany_zdroj(velikost):
+    kusy = []
+    delka = 0
+    seminko = 0
+    while delka < velikost:
+        kus = generate_program(seminko, broken_rate=0).rstrip("\n") + "\n"
+        kusy.append(kus)
+        delka += len(kus.encode("utf-8"))
+        seminko += 1
+    return "".join(kusy)
+
+
+def spicka(funkce, *argumenty):
+    # Každé měření má vlastní start(), takže špička začíná od nuly
+    # (tracemalloc.reset_peak() je až od Pythonu 3.9).
+    tracemalloc.start()
+    try:
+        zacatek = tracemalloc.get_traced_memory()[0]
+        vysledek = funkce(*argumenty)
+        return tracemalloc.get_traced_memory()[1] - zacatek, vysledek
+    finally:
+        tracemalloc.stop()
+
+
+def zkompiluj(kod):
+    # Generované programy smějí obsahovat i jména, z nichž vznikne klíčové
+    # slovo Pythonu; měří se paměť překladu, ne jeho úspěch.
+    try:
+        return compile(kod, "<bench>", "exec")
+    except SyntaxError:
+        return None
+
+
+def zkompiluj_varovani(kod):
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", SyntaxWarning)
+        return transpiluj(kod)
+
+
+def faze(kod):
+    normalizovany = kod.replace('„', '"').replace('‟', '"')
+    tokeny = list(tokenize.generate_tokens(ctecka_radku(normalizovany)))
+    prepisane = spust_pruchody(tokeny)
+    vystup = prepis_kod(kod)
+    return [
+        ("normalizace", lambda: kod.replace('„', '"').replace('‟', '"')),
+        ("validace velkých písmen", lambda: validuj_promenne_velkymi_pismeny(kod)),
+        ("validace anglických slov", lambda: validuj_zadna_anglicka_klicova_slova(kod)),
+        ("tokenizace", lambda: list(tokenize.generate_tokens(ctecka_radku(normalizovany)))),
+        ("průchody", lambda: spust_pruchody(tokeny)),
+        ("untokenize", lambda: tokenize.untokenize(prepisane)),
+        ("kontrola syntaxe", lambda: zkompiluj(vystup)),
+        ("prepis_kod", lambda: prepis_kod(kod)),
+        ("transpiluj", lambda: zkompiluj_varovani(kod)),
+        ("transpiluj bez kontroly", lambda: transpiluj(kod, kontrola_syntaxe=False)),
+    ]
+
+
+def hlavni():
+    velikost = float(sys.argv[1]) if len(sys.argv) > 1 else 1.0
+    kod = generovany_zdroj(int(velikost * 1024 * 1024))
+    bajtu = len(kod.encode("utf-8"))
+    v_pameti = sys.getsizeof(kod)
+    print(f"zdroj: {bajtu / 1024 / 1024:.2f} MB v UTF-8, {v_pameti / 1024 / 1024:.2f} MB v paměti, {kod.count(chr(10))} řádků")
+
+    for nazev, funkce in faze(kod):
+        spicka_, _ = spicka(funkce)
+        print(f"{nazev:>26}: {spicka_ / bajtu:8.2f} MB/MB  {spicka_ / v_pameti:6.2f}x")
+
+
+if __name__ == "__main__":
+    hlavni()
@@ -0,0 +1,66 @@
+# Porovná transpilaci s předběžným sítem a bez něj na směsi souborů, z nichž
+# většina neobsahuje nic k přepsání (generované tabulky a výrazy) a zbytek
+# je běžný kód v Zmiji.
+#
+#   python benchmarks/bench_rychla_cesta.py [PODIL_BEZ_PREPISU]
+
+import os
+import sys
+import time
+import tokenize
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from zmije.main import potrebuje_prepis, prepis_kod, prepis_na_tokeny
+
+
+def nacti_priklad():
+    cesta = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "example.zm")
+    with open(cesta, "r", encoding="utf-8") as f:
+        return f.read()
+
+
+def generovany_soubor(n):
+    radky = []
+    for i in range(200):
+        radky.append(f"Konstanta_{n}_{i} = {i * 7}")
+        radky.append(f'Nazev_{n}_{i} = "položka {i}"')
+        radky.append(f"Soucet_{n}_{i} = Konstanta_{n}_{i} * 3 + len(Nazev_{n}_{i})")
+    return "\n".join(radky) + "\n"
+
+
+def bez_sita(kod):
+    return tokenize.untokenize(prepis_na_tokeny(kod)[1])
+
+
+def zmer(funkce, soubory, opakovani=3):
+    nejlepsi = None
+    for _ in range(opakovani):
+        zacatek = time.perf_counter()
+        for kod in soubory:
+            funkce(kod)
+        doba = time.perf_counter() - zacatek
+        nejlepsi = doba if nejlepsi is None else min(nejlepsi, doba)
+    return nejlepsi
+
+
+def hlavni():
+    podil = float(sys.argv[1]) if len(sys.argv) > 1 else 0.7
+    celkem = 50
+    bez_prepisu = int(celkem * podil)
+    priklad = nacti_priklad()
+    soubory = [generovany_soubor(n) for n in range(bez_prepisu)] + [priklad * 10] * (celkem - bez_prepisu)
+
+    for kod in soubory:
+        assert prepis_kod(kod) == bez_sita(kod)
+
+    preskoceno = sum(1 for kod in soubory if not potrebuje_prepis(kod))
+    pred = zmer(bez_sita, soubory)
+    po = zmer(prepis_kod, soubory)
+    print(f"souborů {len(soubory)}, síto propustilo bez přepisu {preskoceno}")
+    print(f"bez síta: {pred * 1000:8.1f} ms")
+    print(f"se sítem: {po * 1000:8.1f} ms  zrychlení {pred / po:4.2f}x")
+
+
+if __name__ == "__main__":
+    hlavni()
@@ -0,0 +1,61 @@
+# Porovná režii jednoho krátkého skriptu spuštěného přes server se
+# studeným startem: převod `python -m zmije` a spuštění výsledku novým
+# interpretem. Server se spustí na dočasném soketu a po měření ukončí.
+#
+#   python benchmarks/bench_server.py [POCET]
+
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+
+KOREN = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, KOREN)
+
+from zmije.server import spust_na_serveru
+
+SKRIPT = "dovézt sys\nX = [1; 2,5]\nvytiskni(sum(X), sys.argv[1:])\n"
+
+
+def studeny_start(adresar):
+    zdroj = os.path.join(adresar, "skript.zm")
+    cil = os.path.join(adresar, "skript.py")
+    with open(zdroj, "w", encoding="utf-8") as f:
+        f.write(SKRIPT)
+    subprocess.run([sys.executable, "-m", "zmije", zdroj, "-o", cil], check=True, cwd=KOREN, capture_output=True)
+    subprocess.run([sys.executable, cil], check=True, capture_output=True)
+
+
+def zmer(funkce, pocet):
+    zacatek = time.perf_counter()
+    for _ in range(pocet):
+        funkce()
+    return (time.perf_counter() - zacatek) / pocet
+
+
+def hlavni():
+    pocet = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    with tempfile.TemporaryDirectory() as adresar:
+        cesta = os.path.join(adresar, "zmije.sock")
+        server = subprocess.Popen(
+            [sys.executable, "-m", "zmije", "server", "--socket", cesta, "-j", "1"],
+            cwd=KOREN, stdout=subprocess.PIPE, text=True,
+        )
+        try:
+            server.stdout.readline()
+            for _ in range(10):
+                spust_na_serveru(SKRIPT, cesta)
+            na_serveru = zmer(lambda: spust_na_serveru(SKRIPT, cesta), pocet)
+        finally:
+            server.send_signal(signal.SIGTERM)
+            server.wait()
+        studeny = zmer(lambda: studeny_start(adresar), max(pocet // 20, 3))
+
+    print(f"studený start: {studeny * 1000:8.2f} ms/skript")
+    print(f"      server:  {na_serveru * 1000:8.2f} ms/skript  ({studeny / na_serveru:.0f}x)")
+
+
+if __name__ == "__main__":
+    hlavni()
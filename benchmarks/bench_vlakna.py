@@ -0,0 +1,50 @@
+# Měří propustnost transpiluj() ve fondu vláken.
+#
+# Na běžném CPythonu se propustnost kvůli GIL škálovat nebude, na sestavení
+# bez GIL (python3.13t a novější) by měla růst s počtem vláken.
+#
+#   python benchmarks/bench_vlakna.py [POCET_ULOH]
+
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from zmije.main import transpiluj
+
+
+def nacti_priklad():
+    cesta = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "example.zm")
+    with open(cesta, "r", encoding="utf-8") as f:
+        return f.read()
+
+
+def zmer(kod, vlakna, pocet_uloh):
+    with ThreadPoolExecutor(max_workers=vlakna) as fond:
+        zacatek = time.perf_counter()
+        for _ in fond.map(transpiluj, [kod] * pocet_uloh):
+            pass
+        return time.perf_counter() - zacatek
+
+
+def hlavni():
+    pocet_uloh = int(sys.argv[1]) if len(sys.argv) > 1 else 400
+    kod = nacti_priklad()
+
+    gil = sys._is_gil_enabled() if hasattr(sys, "_is_gil_enabled") else True
+    print(f"Python {sys.version.split()[0]}, GIL {'zapnutý' if gil else 'vypnutý'}, jader {os.cpu_count()}")
+
+    zmer(kod, 1, 20)
+    zaklad = None
+    for vlakna in (1, 2, 4, 8):
+        doba = zmer(kod, vlakna, pocet_uloh)
+        propustnost = pocet_uloh / doba
+        if zaklad is None:
+            zaklad = propustnost
+        print(f"vláken {vlakna:2d}: {propustnost:9.1f} souborů/s  zrychlení {propustnost / zaklad:4.2f}x")
+
+
+if __name__ == "__main__":
+    hlavni()
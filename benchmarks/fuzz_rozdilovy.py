@@ -0,0 +1,142 @@
+# Rozdílové fuzzování: náhodné programy v Zmiji prožene současným převodem
+# i zmraženou kopií původního převodu (tests/reference_engine.py), ověří,
+# že výstupy i chyby souhlasí, a změří propustnost v programech za sekundu.
+#
+#   python benchmarks/fuzz_rozdilovy.py [--pocet N] [--seminko S] [--prikazu P]
+#                                       [--zaklad SOUBOR] [--prah P] [--uloz]
+#
+# Propustnost se porovnává jako poměr kandidát / reference naměřený v témže
+# běhu, takže nezávisí na rychlosti stroje. Se --zaklad skript selže, pokud
+# poměr některého kandidáta klesne pod prah * uložený poměr; --uloz zapíše
+# naměřené poměry jako nový základ.
+#
+# Návratový kód: 0 v pořádku, 1 rozdílný výstup, 2 pokles propustnosti.
+
+import json
+import os
+import sys
+import time
+import tokenize
+import warnings
+
+KOREN = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, KOREN)
+
+from tests import reference_engine
+from tests.program_generator import generate_program
+from zmije.main import prepis_kod, transpiluj
+
+KANDIDATI = {
+    "prepis_kod": prepis_kod,
+    "transpiluj": transpiluj,
+}
+
+VYCHOZI_ZAKLAD = os.path.join(os.path.dirname(os.path.abspath(__file__)), "propustnost.json")
+
+
+def vysledek(prevod, kod):
+    # Chyby se porovnávají podle druhu a zprávy; ChybaValidace je ValueError.
+    try:
+        return ("ok", prevod(kod))
+    except ValueError as e:
+        return ("ValueError", str(e))
+    except SyntaxError as e:
+        return (type(e).__name__, e.msg, e.lineno)
+    except tokenize.TokenError as e:
+        return ("TokenError", str(e))
+
+
+def najdi_rozdily(programy):
+    rozdily = []
+    for seminko, kod in programy:
+        ocekavany = vysledek(reference_engine.transpiluj, kod)
+        for nazev, prevod in KANDIDATI.items():
+            skutecny = vysledek(prevod, kod)
+            if skutecny != ocekavany:
+                rozdily.append((seminko, nazev, ocekavany, skutecny))
+    return rozdily
+
+
+def zmer(prevody, programy, opakovani=5):
+    # Převody se měří na střídačku, aby je šum stroje zasáhl stejně.
+    nejlepsi = {}
+    for _ in range(opakovani):
+        for nazev, prevod in prevody.items():
+            zacatek = time.perf_counter()
+            for kod in programy:
+                prevod(kod)
+            doba = time.perf_counter() - zacatek
+            nejlepsi[nazev] = min(doba, nejlepsi.get(nazev, doba))
+    return {nazev: len(programy) / doba for nazev, doba in nejlepsi.items()}
+
+
+def nacti_argumenty(argumenty):
+    nastaveni = {"pocet": 200, "seminko": 0, "prikazu": 20, "zaklad": None, "prah": 0.75, "uloz": False}
+    i = 0
+    while i < len(argumenty):
+        arg = argumenty[i]
+        if arg == "--uloz":
+            nastaveni["uloz"] = True
+        elif arg in ("--pocet", "--seminko", "--prikazu") and i + 1 < len(argumenty):
+            nastaveni[arg[2:]] = int(argumenty[i + 1])
+            i += 1
+        elif arg == "--prah" and i + 1 < len(argumenty):
+            nastaveni["prah"] = float(argumenty[i + 1])
+            i += 1
+        elif arg == "--zaklad" and i + 1 < len(argumenty):
+            nastaveni["zaklad"] = argumenty[i + 1]
+            i += 1
+        else:
+            raise SystemExit(f"Neznámý argument: {arg}")
+        i += 1
+    return nastaveni
+
+
+def hlavni():
+    nastaveni = nacti_argumenty(sys.argv[1:])
+    warnings.simplefilter("ignore", SyntaxWarning)
+
+    seminka = range(nastaveni["seminko"], nastaveni["seminko"] + nastaveni["pocet"])
+    programy = [(s, generate_program(s, nastaveni["prikazu"])) for s in seminka]
+
+    rozdily = najdi_rozdily(programy)
+    for seminko, nazev, ocekavany, skutecny in rozdily[:10]:
+        print(f"ROZDÍL seminko={seminko} kandidát={nazev}")
+        print(f"  reference: {ocekavany!r:.300}")
+        print(f"  kandidát:  {skutecny!r:.300}")
+    if rozdily:
+        print(f"{len(rozdily)} rozdílů na {len(programy)} programech")
+        return 1
+    print(f"{len(programy)} programů, výstupy souhlasí")
+
+    platne = [kod for _, kod in programy if vysledek(reference_engine.transpiluj, kod)[0] == "ok"]
+    rychlosti = zmer(dict(KANDIDATI, reference=reference_engine.transpiluj), platne)
+    reference = rychlosti.pop("reference")
+    print(f"{'reference':>12}: {reference:10.1f} programů/s")
+    pomery = {}
+    for nazev, rychlost in rychlosti.items():
+        pomery[nazev] = rychlost / reference
+        print(f"{nazev:>12}: {rychlost:10.1f} programů/s  {pomery[nazev]:5.2f}x reference")
+
+    zaklad = nastaveni["zaklad"] or VYCHOZI_ZAKLAD
+    if nastaveni["uloz"]:
+        with open(zaklad, "w", encoding="utf-8") as f:
+            json.dump({nazev: round(pomer, 3) for nazev, pomer in pomery.items()}, f, indent=4, sort_keys=True)
+            f.write("\n")
+        print(f"Základ uložen do {zaklad}")
+        return 0
+
+    if nastaveni["zaklad"] is None and not os.path.exists(zaklad):
+        return 0
+    with open(zaklad, "r", encoding="utf-8") as f:
+        ulozene = json.load(f)
+    navrat = 0
+    for nazev, pomer in pomery.items():
+        if nazev in ulozene and pomer < ulozene[nazev] * nastaveni["prah"]:
+            print(f"POKLES {nazev}: {pomer:.2f}x, základ {ulozene[nazev]:.2f}x, prah {nastaveni['prah']:.2f}")
+            navrat = 2
+    return navrat
+
+
+if __name__ == "__main__":
+    sys.exit(hlavni())
@@ -0,0 +1,144 @@
+"""Random Zmije program generator for differential fuzzing.
+
+Every construct used in example.zm has a template here. Programs are mostly
+valid; a fraction of them gets one deliberately broken statement (lowercase variable,
+English keyword, unbalanced bracket) so that error paths are compared too.
+"""
+
+import random
+
+NAMES = ["X", "Y", "Počet", "Výsledek", "Jméno", "Data", "Ž", "Je", "V", "Pro", "Nic_", "Ležák", "A", "Slovník"]
+ATTRIBUTES = ["atribut", "když", "jinak", "pro", "read", "v", "a"]
+NUMBERS = ["0", "1", "5", "19", "30", "100", "1e3", "0x1F", "7j"]
+FRACTIONS = ["5", "25", "99", "14", "0", "5e2"]
+STRINGS = ['„Ahoj světe"', '"text; s čárkou 1,5"', "'pro v když'", '„a"', 'f"{X}"', '"""víceřádkový\nřetězec"""']
+KEYWORD_VALUES = ["Pravda", "Lež", "Nic", "PRAVDA", "nic"]
+# Numbers a keyword can be glued to; the tokenizer splits "1.e5v" into 1.e5 and v.
+# "je" is left out because "1je" reads as the number 1j and the name e.
+GLUED_NUMBERS = ["1", "19", ".5", "1.", "1.e5", "1.E5", "1e3", "1.j", "7j"]
+GLUED_OPERATORS = ["nebo", "v"]
+BROKEN = [
+    "malá = 1",
+    "X = True",
+    "if X: pass",
+    "X = (1; 2",
+    "1Y = 2",
+    "Z = 5Proměnná",
+]
+
+
+class ProgramGenerator:
+    """Builds random programs from a seeded random.Random."""
+
+    def __init__(self, seed, broken_rate=0.2):
+        self.rnd = random.Random(seed)
+        self.broken_rate = broken_rate
+
+    def name(self):
+        return self.rnd.choice(NAMES)
+
+    def number(self):
+        cislo = self.rnd.choice(NUMBERS)
+        if self.rnd.random() < 0.4 and cislo.isdigit():
+            mezera = self.rnd.choice(["", " "])
+            return f"{cislo}{mezera},{mezera}{self.rnd.choice(FRACTIONS)}"
+        return cislo
+
+    def atom(self):
+        volba = self.rnd.randrange(6)
+        if volba == 0:
+            return self.number()
+        if volba == 1:
+            return self.rnd.choice(STRINGS)
+        if volba == 2:
+            return self.rnd.choice(KEYWORD_VALUES)
+        if volba == 3:
+            return f"{self.name()}.{self.rnd.choice(ATTRIBUTES)}"
+        if volba == 4:
+            return self.name()
+        return f"vytiskni({self.number()})"
+
+    def expression(self, depth=0):
+        if depth > 2:
+            return self.atom()
+        volba = self.rnd.randrange(8)
+        if volba == 0:
+            return f"[{'; '.join(self.expression(depth + 1) for _ in range(self.rnd.randrange(4)))}]"
+        if volba == 1:
+            polozky = (f"{self.rnd.choice(STRINGS)}: {self.expression(depth + 1)}" for _ in range(self.rnd.randrange(3)))
+            return "{" + "; ".join(polozky) + "}"
+        if volba == 2:
+            operator = self.rnd.choice(["+", "*", "<", "a", "nebo", "je", "v", "==", "-"])
+            if operator in GLUED_OPERATORS and self.rnd.random() < 0.3:
+                return f"{self.rnd.choice(GLUED_NUMBERS)}{operator} {self.expression(depth + 1)}"
+            return f"{self.expression(depth + 1)} {operator} {self.expression(depth + 1)}"
+        if volba == 3:
+            return f"vytiskni({'; '.join(self.expression(depth + 1) for _ in range(self.rnd.randrange(4)))})"
+        if volba == 4:
+            return f"({self.expression(depth + 1)};)"
+        return self.atom()
+
+    def block(self, indent, depth):
+        return [radek for _ in range(self.rnd.randint(1, 3)) for radek in self.statement(indent + "    ", depth + 1)]
+
+    def statement(self, indent="", depth=0):
+        volby = 14 if depth < 2 else 6
+        volba = self.rnd.randrange(volby)
+        if volba == 0:
+            return [f"{indent}{self.name()} = {self.expression()}"]
+        if volba == 1:
+            return [f"{indent}vytiskni({self.expression()}; {self.expression()})"]
+        if volba == 2:
+            return [f"{indent}# komentář s když a 1,5; Pravda"]
+        if volba == 3:
+            return [f"{indent}{self.rnd.choice(['přejdi', 'smaž X', 'dovézt sys', 'od os dovézt path jako Cesta'])}"]
+        if volba == 4:
+            return [f"{indent}{self.name()} = {self.number()} + \\", f"{indent}    {self.number()}"]
+        if volba == 5:
+            return [""]
+        if volba == 6:
+            radky = [f"{indent}když {self.expression()}:"] + self.block(indent, depth)
+            if self.rnd.random() < 0.5:
+                radky += [f"{indent}jinkdyž {self.expression()}:"] + self.block(indent, depth)
+            if self.rnd.random() < 0.5:
+                radky += [f"{indent}jinak:"] + self.block(indent, depth)
+            return radky
+        if volba == 7:
+            return [f"{indent}pro I v [{self.number()}; {self.number()}]:"] + self.block(indent, depth)
+        if volba == 8:
+            return [f"{indent}při {self.name()} < {self.number()}:"] + self.block(indent, depth) + [f"{indent}    rozbít"]
+        if volba == 9:
+            return [
+                f"{indent}klasa Zvire:",
+                f"{indent}    def __init__(self; Jméno; a=Pravda):",
+                f"{indent}        self.Jméno = Jméno",
+                f"{indent}    def zvuk(self):",
+            ] + self.block(indent + "    ", depth + 1)
+        if volba == 10:
+            radky = [f"{indent}zkus:"] + self.block(indent, depth) + [f"{indent}kromě ValueError jako E:"] + self.block(indent, depth)
+            if self.rnd.random() < 0.5:
+                radky += [f"{indent}konečně:"] + self.block(indent, depth)
+            return radky
+        if volba == 11:
+            return [f"{indent}def sečti(A; B):"] + self.block(indent, depth) + [f"{indent}    vrať A + B"]
+        if volba == 12:
+            return [f"{indent}s open({self.rnd.choice(STRINGS)}) jako F:", f"{indent}    Obsah = F.read()"]
+        return [f"{indent}def generátor():", f"{indent}    vynes {self.expression()}", f"{indent}    povznes ValueError({self.rnd.choice(STRINGS)})"]
+
+    def program(self, statements=20):
+        radky = []
+        for _ in range(statements):
+            radky.extend(self.statement())
+        if self.rnd.random() < self.broken_rate:
+            radky.insert(self.rnd.randrange(len(radky) + 1), self.rnd.choice(BROKEN))
+        return "\n".join(radky) + ("\n" if self.rnd.random() < 0.9 else "")
+
+
+def generate_program(seed, statements=20, broken_rate=0.2):
+    return ProgramGenerator(seed, broken_rate).program(statements)
+
+
+def generate_glued_line(seed):
+    """Return a line whose only rewrite is a keyword glued to a number."""
+    rnd = random.Random(seed)
+    return f"X = {rnd.choice(GLUED_NUMBERS)}{rnd.choice(GLUED_OPERATORS)} Y\n"
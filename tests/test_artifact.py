@@ -0,0 +1,111 @@
+"""Tests for precompiled .zmc artifacts."""
+
+import importlib.util
+import os
+import subprocess
+import sys
+
+import pytest
+from zmije.artefakt import (
+    HLAVICKA,
+    ChybaArtefaktu,
+    ZmcLoader,
+    je_aktualni,
+    nacti_artefakt,
+    nacti_kod,
+    precti_hlavicku,
+    sestav_artefakt,
+    sestav_soubor,
+)
+from zmije.main import otisk_prepisu
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+SOURCE = "Hodnota = 1,5\nSeznam = [1; 2]\nkdyž Pravda:\n    Vysledek = Hodnota * 2\n"
+
+
+@pytest.fixture
+def source_file(tmp_path):
+    path = tmp_path / "modul.zm"
+    path.write_text(SOURCE, encoding="utf-8")
+    return path
+
+
+class TestArtifactFormat:
+    """Tests for building and reading .zmc artifacts."""
+
+    def test_header_describes_artifact(self):
+        """Test that the header carries magic, hashes and fingerprint."""
+        header = precti_hlavicku(sestav_artefakt(SOURCE))
+        assert header.verze == 1
+        assert header.magie_pythonu == importlib.util.MAGIC_NUMBER
+        assert header.otisk_slov == otisk_prepisu()
+        assert len(header.otisk_zdroje) == 64
+
+    def test_code_executes(self):
+        """Test that the marshalled code runs without transpiling."""
+        namespace = {}
+        exec(nacti_kod(sestav_artefakt(SOURCE)), namespace)
+        assert namespace["Vysledek"] == 3.0
+        assert namespace["Seznam"] == [1, 2]
+
+    def test_rejects_foreign_file(self):
+        """Test that non-artifacts are rejected."""
+        with pytest.raises(ChybaArtefaktu):
+            nacti_kod(b"\0" * (HLAVICKA.size + 10))
+
+    def test_rejects_other_python_version(self):
+        """Test that a different interpreter magic number is rejected."""
+        data = bytearray(sestav_artefakt(SOURCE))
+        data[6:10] = b"\0\0\r\n"
+        with pytest.raises(ChybaArtefaktu, match="jinou verzi"):
+            nacti_kod(bytes(data))
+
+    def test_build_file_skips_current(self, source_file):
+        """Test that an up-to-date artifact is not rebuilt."""
+        target, built = sestav_soubor(str(source_file))
+        assert built and target.endswith("modul.zmc")
+        assert je_aktualni(target, SOURCE)
+        assert sestav_soubor(str(source_file)) == (target, False)
+
+        source_file.write_text(SOURCE + "Další = 1\n", encoding="utf-8")
+        assert sestav_soubor(str(source_file)) == (target, True)
+
+    def test_build_file_honours_encoding_declaration(self, tmp_path):
+        """Test that sources in a declared encoding build and are hashed as raw bytes."""
+        path = tmp_path / "latin.zm"
+        data = "# -*- coding: iso-8859-2 -*-\nJmeno = 'Žluťoučký kůň'\n".encode("iso-8859-2")
+        path.write_bytes(data)
+        target, built = sestav_soubor(str(path))
+        assert built and je_aktualni(target, data)
+        namespace = {}
+        exec(nacti_artefakt(target), namespace)
+        assert namespace["Jmeno"] == "Žluťoučký kůň"
+
+    def test_loader_imports_artifact(self, source_file):
+        """Test that ZmcLoader imports a module from an artifact alone."""
+        target, _ = sestav_soubor(str(source_file))
+        os.remove(source_file)
+        loader = ZmcLoader("modul_zmc", target)
+        spec = importlib.util.spec_from_file_location("modul_zmc", target, loader=loader)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        assert module.Hodnota == 1.5
+        assert nacti_artefakt(target).co_filename.endswith("modul.zm")
+
+    def test_cli_build_and_run(self, tmp_path):
+        """Test the sestav and spust commands."""
+        program = tmp_path / "program.zm"
+        program.write_text("dovézt sys\nvytiskni(sys.argv[1:]; 2,5)\n", encoding="utf-8")
+        out_dir = tmp_path / "sestaveno"
+
+        def run(*args):
+            return subprocess.run(
+                [sys.executable, "-m", "zmije", *args],
+                capture_output=True, text=True, encoding="utf-8", check=True, cwd=ROOT,
+            ).stdout
+
+        assert "Sestaveno" in run("sestav", str(program), "-d", str(out_dir))
+        assert "Aktuální" in run("sestav", str(program), "-d", str(out_dir))
+        output = run("spust", str(out_dir / "program.zmc"), "a", "b")
+        assert output.strip() == "['a', 'b'] 2.5"
@@ -0,0 +1,128 @@
+"""Tests for the setuptools build_py command that transpiles .zm modules."""
+
+import importlib.util
+import os
+import subprocess
+import sys
+
+import pytest
+
+pytest.importorskip("setuptools")
+
+from setuptools import Distribution
+from zmije.mezipamet import SqliteMezipamet, klic_zdroje
+from zmije.sestaveni import build_py
+
+
+@pytest.fixture
+def project(tmp_path):
+    package = tmp_path / "src" / "balik"
+    (package / "pod").mkdir(parents=True)
+    (package / "__init__.py").write_text("", encoding="utf-8")
+    (package / "jadro.zm").write_text("def hodnota():\n    vrať Pravda\n", encoding="utf-8")
+    (package / "pod" / "__init__.zm").write_text("Seznam = [1; 2,5]\n", encoding="utf-8")
+    (package / "obojí.zm").write_text("X = Lež\n", encoding="utf-8")
+    (package / "obojí.py").write_text("X = 'py'\n", encoding="utf-8")
+    return tmp_path
+
+
+def run_build(project, **options):
+    dist = Distribution({
+        "name": "balik",
+        "packages": ["balik", "balik.pod"],
+        "package_dir": {"": str(project / "src")},
+    })
+    dist.script_name = "setup.py"
+    command = build_py(dist)
+    command.build_lib = str(project / "build")
+    command.zmije_mezipamet = str(project / "cache.sqlite")
+    for name, value in options.items():
+        setattr(command, name, value)
+    command.ensure_finalized()
+    command.run()
+    return command
+
+
+class TestBuildPy:
+    """Tests for zmije.sestaveni.build_py."""
+
+    @pytest.mark.parametrize("jobs", [1, 2])
+    def test_transpiles_modules_into_build_tree(self, project, jobs):
+        """Test that .zm modules become importable .py files in build_lib."""
+        run_build(project, zmije_procesy=jobs)
+        build = project / "build" / "balik"
+        assert "return True" in (build / "jadro.py").read_text(encoding="utf-8")
+        assert "2.5" in (build / "pod" / "__init__.py").read_text(encoding="utf-8")
+        result = subprocess.run(
+            [sys.executable, "-c", "import balik.jadro, balik.pod; print(balik.jadro.hodnota(), balik.pod.Seznam)"],
+            capture_output=True, text=True, check=True, cwd=str(project / "build"),
+        )
+        assert result.stdout.strip() == "True [1, 2.5]"
+
+    def test_python_module_takes_precedence(self, project):
+        """Test that a .py module shadows a .zm module of the same name."""
+        run_build(project)
+        assert (project / "build" / "balik" / "obojí.py").read_text(encoding="utf-8") == "X = 'py'\n"
+
+    def test_results_are_cached_and_outputs_not_rewritten(self, project):
+        """Test that a repeated build hits the cache and keeps output mtimes."""
+        run_build(project)
+        output = project / "build" / "balik" / "jadro.py"
+        os.utime(output, ns=(7, 7))
+        with SqliteMezipamet(str(project / "cache.sqlite")) as cache:
+            source = (project / "src" / "balik" / "jadro.zm").read_text(encoding="utf-8")
+            assert cache.nacti(klic_zdroje(source), "py") is not None
+        run_build(project)
+        assert os.stat(output).st_mtime_ns == 7
+
+    @pytest.mark.parametrize("cached", [False, True])
+    def test_declared_encoding_is_kept(self, project, cached):
+        """Test that a source with a coding declaration builds and is written in its encoding."""
+        source = "# -*- coding: iso-8859-2 -*-\nJmeno = 'Kůň'\nPravdive = Pravda\n"
+        (project / "src" / "balik" / "latin.zm").write_bytes(source.encode("iso-8859-2"))
+        run_build(project)
+        if cached:
+            (project / "build" / "balik" / "latin.py").unlink()
+            run_build(project)
+        output = (project / "build" / "balik" / "latin.py").read_bytes()
+        assert output.decode("iso-8859-2").endswith("Jmeno = 'Kůň'\nPravdive = True\n")
+        result = subprocess.run(
+            [sys.executable, "-c", "import balik.latin; print(balik.latin.Jmeno == 'Kůň')"],
+            capture_output=True, text=True, check=True, cwd=str(project / "build"),
+        )
+        assert result.stdout.strip() == "True"
+
+    def test_compile_emits_pyc_and_lists_outputs(self, project, monkeypatch):
+        """Test that --compile also byte-compiles transpiled modules."""
+        monkeypatch.setattr(sys, "dont_write_bytecode", False)
+        command = run_build(project, compile=1)
+        output = str(project / "build" / "balik" / "jadro.py")
+        pyc = importlib.util.cache_from_source(output)
+        assert os.path.exists(pyc)
+        assert output in command.get_outputs()
+        assert pyc in command.get_outputs()
+
+    def test_invalid_module_fails_build(self, project):
+        """Test that a validation error stops the build and names the file."""
+        (project / "src" / "balik" / "spatny.zm").write_text("malé = 1\n", encoding="utf-8")
+        with pytest.raises(Exception) as excinfo:
+            run_build(project)
+        assert "spatny.zm" in str(excinfo.value)
+
+    def test_unusable_home_cache_is_skipped(self, project, monkeypatch):
+        """Test that the build proceeds when the default cache cannot be created."""
+        blocker = project / "not-a-directory"
+        blocker.write_text("", encoding="utf-8")
+        monkeypatch.delenv("ZMIJE_MEZIPAMET", raising=False)
+        monkeypatch.setenv("XDG_CACHE_HOME", str(blocker))
+        run_build(project, zmije_mezipamet=None)
+        build = project / "build" / "balik"
+        assert "return True" in (build / "jadro.py").read_text(encoding="utf-8")
+
+    def test_corrupt_cache_is_skipped(self, project):
+        """Test that a cache file that is not a database does not fail the build."""
+        cache = project / "broken.sqlite"
+        cache.write_bytes(b"this is not a database" * 100)
+        run_build(project, zmije_mezipamet=str(cache))
+        build = project / "build" / "balik"
+        assert "return True" in (build / "jadro.py").read_text(encoding="utf-8")
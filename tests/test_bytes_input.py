@@ -0,0 +1,117 @@
+"""Tests for bytes input with PEP 263 encoding detection."""
+
+import codecs
+import os
+import subprocess
+import sys
+
+import pytest
+import zmije.main
+from tests.program_generator import generate_program
+from zmije import metriky
+from zmije.main import dekoduj_zdroj, kodovani_zdroje, transpiluj
+from zmije.proud import cti_zdroj, rozpoznej_kodovani, zapis_proud
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+CP1250_SOURCE = '# -*- coding: cp1250 -*-\nkdyž Pravda:\n    Jméno = „Žluťoučký kůň"\n'
+
+
+class TestBytesApi:
+    """Tests for transpiluj with bytes-like input."""
+
+    @pytest.mark.parametrize("wrap", [bytes, bytearray, memoryview], ids=["bytes", "bytearray", "memoryview"])
+    def test_matches_str_path(self, wrap):
+        """Test that bytes-like input gives the encoded str result."""
+        code = "X = Pravda\nSeznam = [1; 2,5]\nvytiskni(„ahoj\")\n"
+        result = transpiluj(wrap(code.encode("utf-8")))
+        assert isinstance(result, bytes)
+        assert result == transpiluj(code).encode("utf-8")
+
+    def test_coding_cookie(self):
+        """Test that a coding declaration selects the input and output encoding."""
+        result = transpiluj(CP1250_SOURCE.encode("cp1250"))
+        assert result.decode("cp1250") == transpiluj(CP1250_SOURCE)
+        compile(result, "<test>", "exec")
+
+    def test_bom_is_kept(self):
+        """Test that a UTF-8 BOM is honoured and written back once."""
+        result = transpiluj(codecs.BOM_UTF8 + "X = Pravda\n".encode("utf-8"))
+        assert result == codecs.BOM_UTF8 + b"X = True\n"
+
+    def test_newlines_are_translated(self):
+        """Test that CR and CRLF line ends are read like a source file."""
+        assert transpiluj(b"X = Pravda\r\nY = Lez\rZ = Nic\n") == transpiluj("X = Pravda\nY = Lez\nZ = Nic\n").encode("utf-8")
+
+    def test_invalid_cookie(self):
+        """Test that an unknown encoding is reported as a SyntaxError."""
+        with pytest.raises(SyntaxError):
+            transpiluj(b"# coding: neznamne\nX = 1\n")
+
+    def test_large_input_is_encoded_in_pieces(self, monkeypatch):
+        """Test that block-wise output encodes to the same bytes."""
+        monkeypatch.setattr(zmije.main, "VELIKOST_BLOKU_PAMETI", 1024)
+        code = "".join(generate_program(seed, broken_rate=0).rstrip("\n") + "\n" for seed in range(40))
+        assert transpiluj(codecs.BOM_UTF8 + code.encode("utf-8"), kontrola_syntaxe=False) == (
+            codecs.BOM_UTF8 + transpiluj(code, kontrola_syntaxe=False).encode("utf-8")
+        )
+
+    def test_metrics_count_input_bytes(self):
+        """Test that the byte counter uses the size of the raw input."""
+        metriky.vynuluj()
+        data = CP1250_SOURCE.encode("cp1250")
+        transpiluj(data)
+        assert metriky.hodnota("zmije_bajty_celkem") == len(data)
+        metriky.vynuluj()
+
+    def test_decode_helpers(self):
+        """Test kodovani_zdroje and dekoduj_zdroj on a memoryview."""
+        data = memoryview(CP1250_SOURCE.encode("cp1250"))
+        assert kodovani_zdroje(data) == "cp1250"
+        assert dekoduj_zdroj(data) == (CP1250_SOURCE, "cp1250")
+        assert dekoduj_zdroj(b"") == ("", "utf-8")
+
+
+class TestStreams:
+    """Tests for encoding detection in the streaming reader and writer."""
+
+    def test_detection_replays_consumed_chunks(self):
+        """Test that chunks read for detection are yielded again."""
+        pieces = [b"# coding: ", b"latin-1\nX", b" = 1\n", b"Y = 2\n"]
+        encoding, replay = rozpoznej_kodovani(iter(pieces))
+        assert encoding == "iso-8859-1"
+        assert list(replay) == pieces
+
+    def test_read_source_with_cookie(self, tmp_path):
+        """Test that cti_zdroj decodes a declared encoding."""
+        source = tmp_path / "a.zm"
+        source.write_bytes(CP1250_SOURCE.encode("cp1250"))
+        encoding, lines = cti_zdroj(str(source))
+        assert encoding == "cp1250"
+        assert "".join(lines) == CP1250_SOURCE
+
+    def test_write_with_bom_once(self, tmp_path):
+        """Test that zapis_proud writes a BOM only at the start."""
+        target = tmp_path / "out.py"
+        zapis_proud(iter(["X = 1\n", "Y = 2\n"]), str(target), "utf-8-sig")
+        assert target.read_bytes() == codecs.BOM_UTF8 + b"X = 1\nY = 2\n"
+
+
+class TestCli:
+    """Tests for encodings on the command line."""
+
+    def test_file_keeps_declared_encoding(self, tmp_path):
+        """Test that the CLI writes output in the source's declared encoding."""
+        source = tmp_path / "a.zm"
+        source.write_bytes(CP1250_SOURCE.encode("cp1250"))
+        target = tmp_path / "a.py"
+        subprocess.run([sys.executable, "-m", "zmije", str(source), "-o", str(target)], check=True, cwd=ROOT, capture_output=True)
+        assert target.read_bytes().decode("cp1250") == transpiluj(CP1250_SOURCE)
+
+    def test_stdin_stream_keeps_declared_encoding(self):
+        """Test that the streaming path detects and keeps the encoding."""
+        result = subprocess.run(
+            [sys.executable, "-m", "zmije", "-", "-o", "-"],
+            input=CP1250_SOURCE.encode("cp1250"), check=True, cwd=ROOT, capture_output=True,
+        )
+        assert result.stdout.decode("cp1250") == transpiluj(CP1250_SOURCE)
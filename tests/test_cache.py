@@ -0,0 +1,173 @@
+"""Tests for the SQLite-backed shared result store."""
+
+import os
+import subprocess
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+import zmije.mezipamet
+from zmije.main import ChybaValidace, otisk_prepisu
+from zmije.mezipamet import (
+    SqliteMezipamet,
+    klic_zdroje,
+    transpiluj_s_mezipameti,
+    validuj_s_mezipameti,
+    zkompiluj_s_mezipameti,
+)
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+
+def transpile_in_process(args):
+    path, code = args
+    with SqliteMezipamet(path) as cache:
+        return transpiluj_s_mezipameti(code, cache)
+
+
+@pytest.fixture
+def cache(tmp_path):
+    with SqliteMezipamet(str(tmp_path / "mezipamet.sqlite")) as cache:
+        yield cache
+
+
+class TestSqliteCache:
+    """Tests for SqliteMezipamet and the cached transpile helpers."""
+
+    def test_store_and_load(self, cache):
+        """Test a raw round trip of stored data."""
+        cache.uloz("klic", "py", b"data")
+        assert cache.nacti("klic", "py") == b"data"
+        assert cache.nacti("klic", "kod") is None
+        assert cache.nacti("jiny", "py") is None
+
+    def test_wal_mode_enabled(self, cache):
+        """Test that the database uses write-ahead logging."""
+        mode = cache.spojeni.execute("PRAGMA journal_mode").fetchone()[0]
+        assert mode.lower() == "wal"
+
+    def test_network_filesystem_uses_rollback_journal(self, tmp_path, monkeypatch):
+        """Test that WAL is not used where shared memory cannot work."""
+        monkeypatch.setattr(zmije.mezipamet, "typ_souboroveho_systemu", lambda cesta: "nfs4")
+        with SqliteMezipamet(str(tmp_path / "sit.sqlite")) as cache:
+            assert cache.spojeni.execute("PRAGMA journal_mode").fetchone()[0].lower() == "delete"
+            cache.uloz("klic", "py", b"data")
+            assert cache.nacti("klic", "py") == b"data"
+
+    def test_journal_mode_can_be_forced(self, tmp_path, monkeypatch):
+        """Test that ZMIJE_MEZIPAMET_ZURNAL overrides the detected mode."""
+        monkeypatch.setenv("ZMIJE_MEZIPAMET_ZURNAL", "truncate")
+        with SqliteMezipamet(str(tmp_path / "vynuceny.sqlite")) as cache:
+            assert cache.spojeni.execute("PRAGMA journal_mode").fetchone()[0].lower() == "truncate"
+
+    def test_hits_do_not_write_until_flushed(self, tmp_path):
+        """Test that access times from reads are written in batches."""
+        import sqlite3
+
+        path = str(tmp_path / "cteni.sqlite")
+
+        def stored_time():
+            with sqlite3.connect(path) as other:
+                return other.execute("SELECT pouzito FROM zaznamy WHERE klic = 'klic'").fetchone()[0]
+
+        cache = SqliteMezipamet(path)
+        cache.uloz("klic", "py", b"data")
+        written = stored_time()
+        for _ in range(zmije.mezipamet.ZAPIS_POUZITI_PO - 1):
+            cache.nacti("klic", "py")
+        assert stored_time() == written
+        cache.nacti("klic", "py")
+        assert stored_time() > written
+        cache.zavri()
+
+    def test_size_is_not_summed_on_every_insert(self, tmp_path, monkeypatch):
+        """Test that inserts under the limit do not scan the table."""
+        with SqliteMezipamet(str(tmp_path / "soucet.sqlite")) as cache:
+            calls = []
+            original = cache._celkova_velikost
+            monkeypatch.setattr(cache, "_celkova_velikost", lambda: calls.append(1) or original())
+            for i in range(100):
+                cache.uloz(f"klic{i}", "py", b"x")
+            assert calls == []
+            for i in range(zmije.mezipamet.KONTROLA_VELIKOSTI_PO):
+                cache.uloz(f"dalsi{i}", "py", b"x")
+            assert len(calls) == 1
+
+    def test_key_includes_keyword_fingerprint(self):
+        """Test that the key depends on source and keyword table."""
+        assert klic_zdroje("X = 1").endswith(otisk_prepisu())
+        assert klic_zdroje("X = 1") != klic_zdroje("X = 2")
+
+    def test_transpile_hit_skips_work(self, cache, monkeypatch):
+        """Test that a second transpile is served from the cache."""
+        first = transpiluj_s_mezipameti("X = Pravda", cache)
+        monkeypatch.setattr("zmije.mezipamet.transpiluj", lambda kod: pytest.fail("not cached"))
+        assert transpiluj_s_mezipameti("X = Pravda", cache) == first
+
+    def test_validation_failure_cached(self, cache, monkeypatch):
+        """Test that validation errors are stored and replayed."""
+        with pytest.raises(ValueError) as first:
+            validuj_s_mezipameti("proměnná = 5", cache)
+        monkeypatch.setattr(
+            "zmije.mezipamet.validuj_promenne_velkymi_pismeny", lambda kod: pytest.fail("not cached")
+        )
+        with pytest.raises(ValueError) as second:
+            transpiluj_s_mezipameti("proměnná = 5", cache)
+        assert str(second.value) == str(first.value)
+        assert isinstance(second.value, ChybaValidace)
+        assert (second.value.radek, second.value.sloupec, second.value.pravidlo) == (
+            first.value.radek, first.value.sloupec, first.value.pravidlo,
+        ) == (1, 0, "velke_pismeno")
+
+    def test_bytecode_cached(self, cache):
+        """Test that compiled code objects round trip through the cache."""
+        code = zkompiluj_s_mezipameti("X = 1,5", cache, "modul.zm")
+        again = zkompiluj_s_mezipameti("X = 1,5", cache, "modul.zm")
+        assert again.co_filename == "modul.zm"
+        namespace = {}
+        exec(again, namespace)
+        assert namespace["X"] == 1.5
+        assert code.co_code == again.co_code
+
+    def test_size_based_eviction(self, tmp_path):
+        """Test that least recently used entries are evicted over the limit."""
+        with SqliteMezipamet(str(tmp_path / "maly.sqlite"), max_velikost=250) as cache:
+            cache.uloz("stary", "py", b"a" * 100)
+            cache.uloz("novy", "py", b"b" * 100)
+            cache.nacti("stary", "py")
+            cache.uloz("dalsi", "py", b"c" * 100)
+            assert cache.nacti("novy", "py") is None
+            assert cache.nacti("stary", "py") is not None
+            assert cache.statistika()["velikost"] <= 250
+
+    def test_purge(self, cache):
+        """Test that purging removes all entries."""
+        transpiluj_s_mezipameti("X = Pravda", cache)
+        assert cache.vycisti() == 2
+        assert cache.statistika()["zaznamu"] == 0
+
+    def test_shared_between_processes(self, tmp_path):
+        """Test that several processes can write the same file concurrently."""
+        path = str(tmp_path / "sdilena.sqlite")
+        jobs = [(path, f"X_{i} = {i},5") for i in range(40)]
+        with ProcessPoolExecutor(max_workers=4) as pool:
+            results = list(pool.map(transpile_in_process, jobs))
+        assert all(f"{i}.5" in result for i, result in enumerate(results))
+        with SqliteMezipamet(path) as cache:
+            assert cache.statistika()["druhy"]["py"][0] == 40
+
+    def test_cli_statistics_and_purge(self, tmp_path):
+        """Test the mezipamet CLI command."""
+        path = str(tmp_path / "cli.sqlite")
+        source = tmp_path / "vstup.zm"
+        source.write_text("X = Pravda\n", encoding="utf-8")
+
+        def run(*args):
+            return subprocess.run(
+                [sys.executable, "-m", "zmije", *args],
+                capture_output=True, text=True, encoding="utf-8", check=True, cwd=ROOT,
+            ).stdout
+
+        assert "True" in run("--mezipamet", path, str(source))
+        assert "Záznamů:  2" in run("mezipamet", "--soubor", path)
+        assert "Smazáno záznamů: 2" in run("mezipamet", "--soubor", path, "vycisti")
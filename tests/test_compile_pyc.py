@@ -0,0 +1,217 @@
+"""Tests for compiling .zm trees to __pycache__ bytecode."""
+
+import importlib.util
+import json
+import os
+import py_compile
+import signal
+import subprocess
+import sys
+
+import pytest
+import zmije.artefakt
+import zmije.dovoz
+from zmije.artefakt import cesta_pyc, druh_invalidace, nacti_pyc
+from zmije.dovoz import ZmijeLoader
+from zmije.kompilace import najdi_zdroje, zkompiluj, zkompiluj_soubor
+from zmije.main import odregistruj_slovnik, zaregistruj_slovnik
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+CHECKED = py_compile.PycInvalidationMode.CHECKED_HASH
+UNCHECKED = py_compile.PycInvalidationMode.UNCHECKED_HASH
+TIMESTAMP = py_compile.PycInvalidationMode.TIMESTAMP
+
+
+@pytest.fixture
+def tree(tmp_path):
+    (tmp_path / "balik" / "vnoreny").mkdir(parents=True)
+    (tmp_path / "balik" / "a.zm").write_text("Hodnota = 1,5\nSeznam = [1; 2]\n", encoding="utf-8")
+    (tmp_path / "balik" / "vnoreny" / "b.zm").write_text("když Pravda:\n    X = Nic\n", encoding="utf-8")
+    (tmp_path / "balik" / "c.zm").write_text("X = 1\n", encoding="utf-8")
+    (tmp_path / "balik" / "c.py").write_text("X = 2\n", encoding="utf-8")
+    return tmp_path / "balik"
+
+
+def load(path, monkeypatch=None):
+    if monkeypatch is not None:
+        def fail(*args, **kwargs):
+            raise AssertionError("the source was transpiled")
+        monkeypatch.setattr(zmije.dovoz, "transpiluj", fail)
+    loader = ZmijeLoader("modul_pyc", str(path))
+    spec = importlib.util.spec_from_file_location("modul_pyc", str(path), loader=loader)
+    module = importlib.util.module_from_spec(spec)
+    loader.exec_module(module)
+    return module
+
+
+class TestCompile:
+    """Tests for writing .pyc files."""
+
+    def test_tree_is_found(self, tree):
+        """Test that directories are walked and shadowed modules are skipped."""
+        found = sorted(os.path.relpath(path, tree) for path in najdi_zdroje([str(tree)]))
+        assert found == ["a.zm", os.path.join("vnoreny", "b.zm")]
+
+    @pytest.mark.parametrize("mode", [TIMESTAMP, CHECKED, UNCHECKED], ids=["timestamp", "checked", "unchecked"])
+    def test_pyc_header_and_import(self, tree, mode, monkeypatch):
+        """Test that each invalidation mode writes a PEP 552 header the loader accepts."""
+        source = tree / "a.zm"
+        result = zkompiluj_soubor(str(source), mode)
+        assert result.zkompilovano and result.chyba is None
+        assert os.path.dirname(result.cil) == str(tree / "__pycache__")
+        with open(result.cil, "rb") as f:
+            data = f.read()
+        assert druh_invalidace(data) == mode
+        if mode != TIMESTAMP:
+            assert data[8:16] == importlib.util.source_hash(source.read_bytes())
+
+        module = load(source, monkeypatch)
+        assert module.Hodnota == 1.5 and module.Seznam == [1, 2]
+
+    def test_current_pyc_is_skipped(self, tree):
+        """Test that a second run skips files and a mode change or -f rebuilds them."""
+        assert all(result.zkompilovano for result in zkompiluj([str(tree)], invalidace=CHECKED))
+        assert not any(result.zkompilovano for result in zkompiluj([str(tree)], invalidace=CHECKED))
+        assert all(result.zkompilovano for result in zkompiluj([str(tree)], invalidace=UNCHECKED))
+        assert all(result.zkompilovano for result in zkompiluj([str(tree)], invalidace=UNCHECKED, vynutit=True))
+
+    def test_changed_source_is_rebuilt(self, tree):
+        """Test that editing a source makes its pyc stale."""
+        zkompiluj([str(tree)], invalidace=TIMESTAMP)
+        source = tree / "a.zm"
+        source.write_text("Hodnota = 2\n", encoding="utf-8")
+        os.utime(source, (0, 0))
+        results = zkompiluj([str(tree)], invalidace=TIMESTAMP)
+        assert [result.zkompilovano for result in results] == [True, False]
+
+    @pytest.mark.parametrize("mode", [CHECKED, UNCHECKED], ids=["checked", "unchecked"])
+    def test_hash_pyc_is_rebuilt_after_edit(self, tree, mode, monkeypatch):
+        """Test that the compiler compares source hashes whatever the import-time check mode."""
+        monkeypatch.setattr(zmije.artefakt._imp, "check_hash_based_pycs", "never")
+        source = tree / "a.zm"
+        zkompiluj_soubor(str(source), mode)
+        assert not zkompiluj_soubor(str(source), mode).zkompilovano
+        source.write_text("Hodnota = 2\nSeznam = []\n", encoding="utf-8")
+        assert zkompiluj_soubor(str(source), mode).zkompilovano
+        assert load(source, monkeypatch).Hodnota == 2
+
+    def test_stale_checked_pyc_falls_back_to_source(self, tree):
+        """Test that a checked-hash pyc is ignored once the source changes."""
+        source = tree / "a.zm"
+        zkompiluj_soubor(str(source), CHECKED)
+        source.write_text("Hodnota = 7\nSeznam = []\n", encoding="utf-8")
+        assert nacti_pyc(str(source)) is None
+        assert load(source).Hodnota == 7
+
+    def test_unchecked_pyc_is_trusted(self, tree):
+        """Test that an unchecked-hash pyc is used without reading the source."""
+        source = tree / "a.zm"
+        zkompiluj_soubor(str(source), UNCHECKED)
+        source.write_text("Hodnota = 7\nSeznam = []\n", encoding="utf-8")
+        assert load(source).Hodnota == 1.5
+
+    def test_hash_builds_are_reproducible(self, tree):
+        """Test that hash-based pycs do not depend on file times."""
+        source = tree / "a.zm"
+        target = zkompiluj_soubor(str(source), CHECKED).cil
+        with open(target, "rb") as f:
+            first = f.read()
+        os.utime(source, (12345, 12345))
+        assert zkompiluj_soubor(str(source), CHECKED, vynutit=True).zkompilovano
+        with open(target, "rb") as f:
+            assert f.read() == first
+
+    def test_pack_changes_the_cache_name(self, tree, tmp_path):
+        """Test that bytecode built with other rewrite rules is never picked up."""
+        source = str(tree / "a.zm")
+        before = cesta_pyc(source)
+        pack = tmp_path / "pack.json"
+        pack.write_text(json.dumps({"nazev": "x", "slova": {"délka": "len"}}), encoding="utf-8")
+        zaregistruj_slovnik(str(pack), str(tmp_path / "cache"))
+        try:
+            assert cesta_pyc(source) != before
+        finally:
+            odregistruj_slovnik(str(pack))
+
+    def test_parallel_matches_serial(self, tree):
+        """Test that -j gives the same files as a serial run."""
+        serial = zkompiluj([str(tree)], invalidace=CHECKED)
+        contents = [open(result.cil, "rb").read() for result in serial]
+        parallel = zkompiluj([str(tree)], procesy=2, invalidace=CHECKED, vynutit=True)
+        assert [result.cil for result in parallel] == [result.cil for result in serial]
+        assert [open(result.cil, "rb").read() for result in parallel] == contents
+
+    def test_errors_are_reported(self, tmp_path):
+        """Test that a rejected source is reported without stopping the run."""
+        (tmp_path / "spatny.zm").write_text("promenna = 1\n", encoding="utf-8")
+        (tmp_path / "dobry.zm").write_text("X = 1\n", encoding="utf-8")
+        results = zkompiluj([str(tmp_path)])
+        assert [bool(result.chyba) for result in results] == [False, True]
+        assert "spatny.zm" in results[1].chyba
+
+
+def slow_source(path):
+    # Tens of thousands of rewrites take seconds to transpile.
+    path.write_text("".join(f"X{i} = [{i},5; {i}]\n" for i in range(30000)), encoding="utf-8")
+
+
+@pytest.mark.skipif(os.name != "posix", reason="per-file limits need SIGALRM and RLIMIT_AS")
+class TestLimits:
+    """Tests for the per-file time and memory limits of a batch."""
+
+    def test_slow_file_times_out(self, tmp_path):
+        """Test that a file over the time limit fails and the batch goes on."""
+        slow_source(tmp_path / "pomaly.zm")
+        (tmp_path / "dobry.zm").write_text("X = 1,5\n", encoding="utf-8")
+        results = zkompiluj([str(tmp_path)], limit_casu=0.2)
+        assert results[0].chyba is None and results[0].zkompilovano
+        assert "Překročen časový limit 0.2 s." in results[1].chyba
+        assert not os.path.exists(results[1].cil)
+        assert signal.getsignal(signal.SIGALRM) == signal.SIG_DFL
+        assert signal.getitimer(signal.ITIMER_REAL) == (0.0, 0.0)
+
+    def test_memory_limit(self, tmp_path):
+        """Test that a file needing more memory than allowed fails and the limit is restored."""
+        import resource
+
+        before = resource.getrlimit(resource.RLIMIT_AS)
+        (tmp_path / "obri.zm").write_text("X = \"" + "a" * (24 * 1024 * 1024) + "\"\n", encoding="utf-8")
+        (tmp_path / "maly.zm").write_text("X = 1,5\n", encoding="utf-8")
+        results = zkompiluj([str(tmp_path)], limit_pameti=8 * 1024 * 1024)
+        assert results[0].zkompilovano
+        assert "Překročen limit paměti 8 MB." in results[1].chyba
+        assert resource.getrlimit(resource.RLIMIT_AS) == before
+
+    def test_limits_apply_in_workers(self, tmp_path):
+        """Test that zmije kompiluj -j enforces --cas in worker processes."""
+        slow_source(tmp_path / "pomaly.zm")
+        (tmp_path / "dobry.zm").write_text("X = 1\n", encoding="utf-8")
+        result = subprocess.run(
+            [sys.executable, "-m", "zmije", "kompiluj", "-j", "2", "--cas", "0.2", "--pamet", "256", str(tmp_path)],
+            cwd=ROOT, capture_output=True, text=True, encoding="utf-8", timeout=60,
+        )
+        assert result.returncode == 1
+        assert "pomaly.zm: Překročen časový limit 0.2 s." in result.stdout
+        assert "Zkompilováno 1, aktuálních 0, chyb 1." in result.stdout
+
+
+class TestCli:
+    """Tests for the kompiluj command."""
+
+    def test_cli_compiles_and_skips(self, tree):
+        """Test that zmije kompiluj compiles a tree and then reports it current."""
+        command = [sys.executable, "-m", "zmije", "kompiluj", "-j", "2", "--invalidace", "checked-hash", str(tree)]
+        first = subprocess.run(command, check=True, cwd=ROOT, capture_output=True, text=True, encoding="utf-8")
+        assert "Zkompilováno 2, aktuálních 0, chyb 0." in first.stdout
+        second = subprocess.run(command, check=True, cwd=ROOT, capture_output=True, text=True, encoding="utf-8")
+        assert "Zkompilováno 0, aktuálních 2, chyb 0." in second.stdout
+
+    def test_cli_rejects_unknown_mode(self, tree):
+        """Test that an unknown invalidation mode is an error."""
+        result = subprocess.run(
+            [sys.executable, "-m", "zmije", "kompiluj", "--invalidace", "vzdy", str(tree)],
+            cwd=ROOT, capture_output=True, text=True, encoding="utf-8",
+        )
+        assert result.returncode == 1
+        assert "Chabička se vloudila" in result.stdout
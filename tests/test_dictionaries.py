@@ -0,0 +1,182 @@
+"""Tests for external keyword dictionary packs and their binary tables."""
+
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+import zmije.main
+from zmije.main import (
+    ChybaValidace,
+    odregistruj_slovnik,
+    otisk_prepisu,
+    potrebuje_prepis,
+    transpiluj,
+    zaregistruj_slovnik,
+)
+from zmije.slovniky import MAGIE, ChybaSlovniku, Slovnik, sestav_soubor
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+PACK = {
+    "nazev": "vestavene",
+    "slova": {
+        "délka": "len",
+        "převeď na text": "str",
+        "rozsah": "range",
+        "seřazeno": "sorted",
+    },
+}
+
+
+def write_pack(path, words=None):
+    path.write_text(json.dumps({"nazev": "test", "slova": words or PACK["slova"]}, ensure_ascii=False), encoding="utf-8")
+    return str(path)
+
+
+@pytest.fixture
+def pack(tmp_path):
+    source = write_pack(tmp_path / "vestavene.json")
+    zaregistruj_slovnik(source, str(tmp_path / "cache"))
+    yield source
+    odregistruj_slovnik(source)
+
+
+class TestTable:
+    """Tests for the compiled hash table."""
+
+    def test_lookup_every_entry(self, tmp_path):
+        """Test that every entry of a large pack is found and misses are empty."""
+        words = {f"slovo{i}": f"word{i}" for i in range(5000)}
+        words["dlouhá sekvence slov"] = "long_one"
+        source = write_pack(tmp_path / "big.json", words)
+        pack = Slovnik(source, str(tmp_path / "cache"))
+
+        for i in range(0, 5000, 7):
+            assert pack.kandidati(f"slovo{i}") == (((f"slovo{i}",), f"word{i}"),)
+        assert pack.kandidati("slov") == ((("dlouhá", "sekvence", "slov"), "long_one"),)
+        assert pack.je_prvni_slovo("dlouhá")
+        assert not pack.je_prvni_slovo("sekvence")
+        assert pack.kandidati("neexistuje") == ()
+        assert pack.nejdelsi_sekvence() == 3
+
+    def test_longest_sequence_first(self, tmp_path):
+        """Test that candidates ending in the same word are ordered longest first."""
+        source = write_pack(tmp_path / "pack.json", {"b": "x", "a b": "y", "c a b": "z"})
+        pack = Slovnik(source, str(tmp_path / "cache"))
+        assert [replacement for _, replacement in pack.kandidati("b")] == ["z", "y", "x"]
+
+    def test_table_is_cached_and_reused(self, tmp_path):
+        """Test that an unchanged source reuses the cached table."""
+        source = write_pack(tmp_path / "pack.json")
+        cache = tmp_path / "cache"
+        Slovnik(source, str(cache)).priprav()
+        [table] = os.listdir(cache)
+        stamp = os.stat(cache / table).st_mtime_ns
+
+        Slovnik(source, str(cache)).priprav()
+        assert os.stat(cache / table).st_mtime_ns == stamp
+
+    def test_changed_source_is_recompiled(self, tmp_path):
+        """Test that editing the source rebuilds the table."""
+        source = write_pack(tmp_path / "pack.json")
+        cache = str(tmp_path / "cache")
+        first = Slovnik(source, cache)
+        assert first.kandidati("délka")
+
+        write_pack(tmp_path / "pack.json", {"velikost": "len"})
+        second = Slovnik(source, cache)
+        assert second.kandidati("délka") == ()
+        assert second.kandidati("velikost") == ((("velikost",), "len"),)
+        assert second.otisk_slovniku() != first.otisk_slovniku()
+
+    def test_precompiled_table_loads_directly(self, tmp_path):
+        """Test that a precompiled .zsl file is mapped without a cache."""
+        target = sestav_soubor(write_pack(tmp_path / "pack.json"), str(tmp_path / "pack.zsl"))
+        with open(target, "rb") as f:
+            assert f.read(len(MAGIE)) == MAGIE
+        pack = Slovnik(target, str(tmp_path / "cache"))
+        assert pack.kandidati("rozsah") == ((("rozsah",), "range"),)
+        assert not os.path.exists(tmp_path / "cache")
+
+    @pytest.mark.parametrize("words", [{"dvě slova!": "x"}, {"slovo": "1x"}, {"slovo": 5}, {"": "x"}])
+    def test_invalid_entries(self, tmp_path, words):
+        """Test that malformed entries are rejected with the source path."""
+        source = write_pack(tmp_path / "bad.json", words)
+        with pytest.raises(ChybaSlovniku, match="bad.json"):
+            Slovnik(source, str(tmp_path / "cache")).priprav()
+
+    def test_invalid_json(self, tmp_path):
+        """Test that a file that is not JSON is rejected."""
+        source = tmp_path / "bad.json"
+        source.write_text("{", encoding="utf-8")
+        with pytest.raises(ChybaSlovniku):
+            Slovnik(str(source), str(tmp_path / "cache")).priprav()
+
+
+class TestTranspile:
+    """Tests for transpiling with a registered pack."""
+
+    def test_pack_entries_are_rewritten(self, pack):
+        """Test that single- and multi-word pack entries are replaced."""
+        code = "X = délka([1; 2])\nkdyž převeď na text(X):\n    Y = seřazeno(rozsah(3))\n"
+        # Merged multi-word entries keep the source columns, so untokenize pads them.
+        assert transpiluj(code).replace(" ", "") == "X=len([1,2])\nifstr(X):\nY=sorted(range(3))\n"
+
+    def test_builtin_map_wins_ties(self, tmp_path):
+        """Test that the built-in map takes precedence over a pack for the same sequence."""
+        source = write_pack(tmp_path / "pack.json", {"vytiskni": "log"})
+        zaregistruj_slovnik(source, str(tmp_path / "cache"))
+        try:
+            assert transpiluj("vytiskni(1)") == "print(1)"
+        finally:
+            odregistruj_slovnik(source)
+
+    def test_pack_words_are_not_variables(self, pack):
+        """Test that pack words pass the capital-letter validation like keywords."""
+        assert transpiluj("rozsah = 1") == "range = 1"
+        with pytest.raises(ChybaValidace):
+            transpiluj("jiny = 1")
+
+    def test_prefilter_is_bypassed(self, pack):
+        """Test that the fast path is disabled while packs are loaded."""
+        assert potrebuje_prepis("X = 1")
+        assert transpiluj("X = 1\nY = délka(X)") == "X = 1\nY = len(X)"
+
+    def test_fingerprint_covers_packs(self, tmp_path):
+        """Test that loading a pack changes the rewrite fingerprint."""
+        before = otisk_prepisu()
+        source = write_pack(tmp_path / "pack.json")
+        zaregistruj_slovnik(source, str(tmp_path / "cache"))
+        try:
+            assert otisk_prepisu() != before
+        finally:
+            odregistruj_slovnik(source)
+        assert otisk_prepisu() == before
+        assert not potrebuje_prepis("X = 1")
+
+    def test_duplicate_registration(self, pack):
+        """Test that a pack cannot be registered twice."""
+        with pytest.raises(ValueError):
+            zaregistruj_slovnik(pack)
+        assert len(zmije.main.SLOVNIKY) == 1
+
+
+class TestCli:
+    """Tests for pack options on the command line."""
+
+    def test_slovnik_option_and_precompile(self, tmp_path):
+        """Test that zmije slovnik precompiles and --slovnik loads the table."""
+        source = write_pack(tmp_path / "pack.json")
+        env = dict(os.environ, XDG_CACHE_HOME=str(tmp_path / "xdg"))
+        subprocess.run([sys.executable, "-m", "zmije", "slovnik", source], check=True, cwd=ROOT, env=env, capture_output=True)
+        assert os.path.exists(tmp_path / "pack.zsl")
+
+        program = tmp_path / "a.zm"
+        program.write_text("X = délka([1; 2])\n", encoding="utf-8")
+        output = subprocess.run(
+            [sys.executable, "-m", "zmije", "--slovnik", str(tmp_path / "pack.zsl"), str(program), "-o", "-"],
+            check=True, cwd=ROOT, env=env, capture_output=True, text=True, encoding="utf-8",
+        ).stdout
+        assert output == "X = len([1, 2])\n"
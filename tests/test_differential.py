@@ -0,0 +1,50 @@
+"""Differential fuzzing of the transpiler against the frozen reference engine."""
+
+import tokenize
+import warnings
+
+import pytest
+from tests import reference_engine
+from tests.program_generator import generate_program
+from zmije.main import prepis_kod, prepis_paralelne, transpiluj
+
+
+def outcome(engine, code):
+    try:
+        return ("ok", engine(code))
+    except ValueError as e:
+        return ("ValueError", str(e))
+    except SyntaxError as e:
+        return (type(e).__name__, e.msg, e.lineno)
+    except tokenize.TokenError as e:
+        return ("TokenError", str(e))
+
+
+@pytest.fixture(autouse=True)
+def quiet_syntax_warnings():
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", SyntaxWarning)
+        yield
+
+
+class TestDifferential:
+    """Tests that current engines reproduce the reference output exactly."""
+
+    @pytest.mark.parametrize("engine", [prepis_kod, transpiluj], ids=["prepis_kod", "transpiluj"])
+    def test_random_programs_match_reference(self, engine):
+        """Test outputs and errors agree on a fixed set of random programs."""
+        for seed in range(150):
+            code = generate_program(seed)
+            assert outcome(engine, code) == outcome(reference_engine.transpiluj, code), f"seed {seed}"
+
+    def test_generator_covers_valid_and_invalid_programs(self):
+        """Test that the generated corpus exercises both success and error paths."""
+        kinds = {outcome(reference_engine.transpiluj, generate_program(seed))[0] for seed in range(150)}
+        assert "ok" in kinds
+        assert "ValueError" in kinds
+
+    def test_parallel_chunks_match_reference(self):
+        """Test that chunked parallel rewriting agrees on a large random program."""
+        code = generate_program(12345, statements=400, broken_rate=0)
+        expected = reference_engine.transpiluj(code)
+        assert prepis_paralelne(code, 2, velikost_bloku=2000) == expected
@@ -0,0 +1,102 @@
+"""Tests for the edit-list output mode."""
+
+import json
+import os
+import subprocess
+import sys
+import tokenize
+import io
+
+import pytest
+from zmije.main import seznam_uprav, transpiluj
+
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+
+def apply_edits(code, edits):
+    """Apply (line, column, old, new) edits to code, checking each old text."""
+    line_starts = [0]
+    for line in code.splitlines(True):
+        line_starts.append(line_starts[-1] + len(line))
+    result = code
+    for line, column, old, new in reversed(edits):
+        offset = line_starts[line - 1] + column
+        assert result[offset:offset + len(old)] == old
+        result = result[:offset] + new + result[offset + len(old):]
+    return result
+
+
+def token_strings(code):
+    return [
+        tok.string
+        for tok in tokenize.generate_tokens(io.StringIO(code).readline)
+        if tok.type not in (tokenize.NL, tokenize.COMMENT)
+    ]
+
+
+class TestEditList:
+    """Tests for seznam_uprav."""
+
+    def test_keyword_edit(self):
+        """Test a single keyword replacement position."""
+        assert seznam_uprav("X = Pravda") == [(1, 4, "Pravda", "True")]
+
+    def test_decimal_edit_covers_whole_number(self):
+        """Test that a decimal comma edit replaces the whole literal."""
+        assert seznam_uprav("Cena = 19,99") == [(1, 7, "19,99", "19.99")]
+
+    def test_semicolon_edits(self):
+        """Test list separator edits."""
+        edits = seznam_uprav("Seznam = [1; 2]")
+        assert edits == [(1, 11, ";", ",")]
+
+    def test_czech_quote_edits(self):
+        """Test that Czech opening quotes are reported."""
+        edits = seznam_uprav('Text = „Ahoj"\nJiný = „a‟')
+        assert edits == [(1, 7, "„", '"'), (2, 7, "„", '"'), (2, 9, "‟", '"')]
+
+    def test_edits_are_sorted(self):
+        """Test that edits come in source order."""
+        code = 'když X > 1,5:\n    vytiskni(„a"; [1; 2])'
+        edits = seznam_uprav(code)
+        assert edits == sorted(edits)
+        assert [edit.novy for edit in edits] == ["if", "1.5", "print", '"', ",", ","]
+
+    def test_no_edits_for_plain_code(self):
+        """Test that code with nothing to rewrite yields no edits."""
+        assert seznam_uprav("X = Y + 1\n") == []
+
+    def test_edit_spanning_lines(self):
+        """Test a decimal literal continued with a backslash."""
+        edits = seznam_uprav("X = (1,\\\n5)")
+        assert edits == [(1, 5, "1,\\\n5", "1.5")]
+
+    @pytest.mark.parametrize("separator", ["\f", "\v", "\x1c", "\x85", "\u2028", "\u2029"])
+    def test_edit_spanning_lines_after_unicode_separator(self, separator):
+        """Test that only newlines, not other Unicode line breaks, count as line ends."""
+        edits = seznam_uprav(f"Text = 'a{separator}b'\nX = (1,\\\n5)")
+        assert edits == [(2, 5, "1,\\\n5", "1.5")]
+
+    def test_applying_edits_matches_transpile(self):
+        """Test that applying edits gives the same tokens as transpiluj."""
+        with open(os.path.join(ROOT, "example.zm"), encoding="utf-8") as f:
+            code = f.read()
+        edited = apply_edits(code, seznam_uprav(code))
+        assert token_strings(edited) == token_strings(transpiluj(code))
+
+    def test_validation_errors_raised(self):
+        """Test that invalid code raises like transpiluj does."""
+        with pytest.raises(ValueError, match="velkým"):
+            seznam_uprav("proměnná = 5")
+
+    def test_cli_prints_json_lines(self, tmp_path):
+        """Test the --upravy CLI mode."""
+        source = tmp_path / "vstup.zm"
+        source.write_text("X = Pravda\nY = [1; 2]\n", encoding="utf-8")
+        result = subprocess.run(
+            [sys.executable, "-m", "zmije", "--upravy", str(source)],
+            capture_output=True, text=True, encoding="utf-8", check=True, cwd=ROOT,
+        )
+        lines = [json.loads(line) for line in result.stdout.splitlines() if line]
+        assert lines == [[1, 4, "Pravda", "True"], [2, 6, ";", ","]]
@@ -0,0 +1,102 @@
+"""Tests for the prefilter that bypasses rewriting when nothing can change."""
+
+import tokenize
+
+import pytest
+from tests.program_generator import generate_glued_line
+from tests.reference_engine import transpiluj as reference_transpiluj
+from zmije.main import potrebuje_prepis, prepis_kod, prepis_na_tokeny, seznam_uprav, transpiluj
+
+
+def slow_path(code):
+    return tokenize.untokenize(prepis_na_tokeny(code)[1])
+
+
+PLAIN = [
+    "X = 1\n",
+    "X = f(Y, 2)\n",
+    "Hodnota = Data[1] + Data[2]\n",
+    'Text = "bez klíčových slov"\n',
+    "Ležák = Pivo\nPravdivost = 5\n",
+    "Souřadnice = Bod(X1, Y1)\n",
+]
+
+TRIGGERS = [
+    "X = Pravda",
+    "X = PRAVDA",
+    "X = 1,5",
+    "X = 1 , 5",
+    "X = (1.5e3 ,\\\n .5)",
+    "Seznam = [1; 2]",
+    "Text = „ahoj\"",
+    "Text = \"ahoj‟",
+    "X = Y.a",
+    "Y = 1nebo Z",
+    "X = .5Klasa",
+    "X = 0xanebo Y",
+    "X = 1.e5v Y",
+    "X = 1.E5nebo Y",
+    "X = 1.jv Y",
+    "X = A.5nebo Y",
+]
+
+
+class TestPrefilter:
+    """Tests for potrebuje_prepis and the fast path in prepis_kod."""
+
+    @pytest.mark.parametrize("code", PLAIN)
+    def test_plain_code_needs_no_rewrite(self, code):
+        """Test that code without rewrite candidates passes the filter."""
+        assert not potrebuje_prepis(code)
+        assert seznam_uprav(code) == []
+
+    @pytest.mark.parametrize("code", TRIGGERS)
+    def test_rewrite_candidates_detected(self, code):
+        """Test that every kind of rewrite trips the filter."""
+        assert potrebuje_prepis(code)
+
+    def test_plain_code_returned_unchanged(self):
+        """Test that the fast path returns the very same string."""
+        code = "Konstanta = 42\nNazev = 'x'\n"
+        assert prepis_kod(code) is code
+
+    @pytest.mark.parametrize(
+        "code",
+        ["X = 1\t# komentář\n", "X = 1 + \\\n    2\n", "X = 1\r\nY = 2\r\n", "X = 1", "   ", "X = 1\n   "],
+    )
+    def test_fast_path_matches_slow_path(self, code):
+        """Test that inputs untokenize would alter still match the full pipeline."""
+        assert not potrebuje_prepis(code)
+        assert prepis_kod(code) == slow_path(code)
+
+    def test_fast_path_still_validates(self):
+        """Test that skipped rewriting does not skip validation."""
+        with pytest.raises(ValueError, match="velkým"):
+            transpiluj("hodnota = 1")
+        with pytest.raises(ValueError, match="print"):
+            transpiluj("print(X)")
+
+    def test_example_program_uses_full_pipeline(self):
+        """Test that realistic Zmije code is still rewritten."""
+        code = 'když X > 0:\n    vytiskni(„kladné")'
+        assert potrebuje_prepis(code)
+        assert prepis_kod(code) == slow_path(code)
+
+    @pytest.mark.parametrize("code", [
+        "Y = 1nebo Z\n", "X = .5Klasa\n", "X = 0xanebo Y\n", "X = 1.e5v Y\n", "X = 1.E5nebo Y\n", "X = 1.jv Y\n",
+        "   ", "X = 1\n  \n  ",
+    ])
+    def test_matches_reference_engine(self, code):
+        """Test that keywords glued to numbers and trailing blank lines match the original engine."""
+        assert transpiluj(code) == reference_transpiluj(code)
+
+    @pytest.mark.parametrize("code, column", [("Y = 1nebo Z\n", 5), ("X = .5Klasa\n", 6)])
+    def test_keyword_glued_to_number_is_listed(self, code, column):
+        """Test that seznam_uprav reports a keyword written right after a number."""
+        assert [(edit.radek, edit.sloupec) for edit in seznam_uprav(code)] == [(1, column)]
+
+    def test_generated_glued_keywords_match_reference_engine(self):
+        """Test that generated lines with a keyword glued to a number match the original engine."""
+        for seed in range(100):
+            code = generate_glued_line(seed)
+            assert transpiluj(code) == reference_transpiluj(code), code
@@ -0,0 +1,142 @@
+"""Tests for hot reloading .zm modules in a running process."""
+
+import os
+import sys
+import time
+
+import pytest
+import zmije.dovoz
+from zmije import dovoz
+from zmije.obnova import Obnova
+
+
+@pytest.fixture
+def package(tmp_path, monkeypatch):
+    root = tmp_path / "koren"
+    (root / "obn").mkdir(parents=True)
+    (root / "obn" / "__init__.zm").write_text("", encoding="utf-8")
+    (root / "obn" / "zaklad.zm").write_text("Hodnota = 1\n", encoding="utf-8")
+    (root / "obn" / "pouziti.zm").write_text("od obn.zaklad dovézt Hodnota\nDvojita = Hodnota * 2\n", encoding="utf-8")
+    (root / "obn" / "jiny.zm").write_text("X = 1\n", encoding="utf-8")
+    monkeypatch.syspath_prepend(str(root))
+    dovoz.instaluj()
+    yield root / "obn"
+    dovoz.odinstaluj()
+    for name in [name for name in sys.modules if name == "obn" or name.startswith("obn.")]:
+        del sys.modules[name]
+
+
+def edit(path, text):
+    # A different size and an explicit newer mtime make the change visible on any filesystem.
+    path.write_text(text, encoding="utf-8")
+    stamp = time.time() + 5
+    os.utime(path, (stamp, stamp))
+
+
+def count_transpiles(monkeypatch):
+    calls = []
+    original = zmije.dovoz.transpiluj
+
+    def counting(code, *args, **kwargs):
+        calls.append(code)
+        return original(code, *args, **kwargs)
+
+    monkeypatch.setattr(zmije.dovoz, "transpiluj", counting)
+    return calls
+
+
+class TestReload:
+    """Tests for detecting and reloading changed modules."""
+
+    def test_changed_module_and_dependents_reload_in_place(self, package):
+        """Test that the edited module and its importers see the new value."""
+        import obn.jiny
+        import obn.pouziti
+        import obn.zaklad
+
+        module = obn.zaklad
+        reload = Obnova()
+        assert reload.zmenene() == []
+
+        edit(package / "zaklad.zm", "Hodnota = 21\n")
+        assert reload.zmenene() == ["obn.zaklad"]
+        result = reload.obnov()
+        assert result.obnoveno == ["obn.zaklad", "obn.pouziti"]
+        assert result.zavisle == ["obn.pouziti"]
+        assert module is sys.modules["obn.zaklad"] and module.Hodnota == 21
+        assert obn.pouziti.Dvojita == 42
+        assert reload.zmenene() == []
+
+    def test_only_changed_source_is_transpiled(self, package, monkeypatch):
+        """Test that unrelated modules are not transpiled again."""
+        import obn.jiny
+        import obn.zaklad  # noqa: F401
+
+        reload = Obnova(obnovit_zavisle=False)
+        reload.zmenene()
+        calls = count_transpiles(monkeypatch)
+        edit(package / "zaklad.zm", "Hodnota = 2\n")
+        assert reload.obnov().obnoveno == ["obn.zaklad"]
+        assert calls == ["Hodnota = 2\n"]
+
+    def test_touch_without_change_does_not_reload(self, package):
+        """Test that a new mtime with the same content is ignored."""
+        import obn.zaklad  # noqa: F401
+
+        reload = Obnova()
+        edit(package / "zaklad.zm", "Hodnota = 3\n")
+        reload.obnov()
+        path = package / "zaklad.zm"
+        stamp = time.time() + 10
+        os.utime(path, (stamp, stamp))
+        assert reload.obnov().obnoveno == []
+
+    def test_edit_before_first_check_is_detected(self, package):
+        """Test that the baseline is the source as it was at import time."""
+        import obn.zaklad
+
+        edit(package / "zaklad.zm", "Hodnota = 5\n")
+        assert Obnova().obnov().obnoveno == ["obn.zaklad"]
+        assert obn.zaklad.Hodnota == 5
+
+    def test_broken_edit_keeps_old_module(self, package):
+        """Test that a source that fails to transpile leaves the module and its importers alone."""
+        import obn.pouziti
+        import obn.zaklad
+
+        reload = Obnova()
+        edit(package / "zaklad.zm", "hodnota = 5\n")
+        result = reload.obnov()
+        assert result.obnoveno == []
+        assert list(result.chyby) == ["obn.zaklad"]
+        assert obn.zaklad.Hodnota == 1 and obn.pouziti.Dvojita == 2
+
+        edit(package / "zaklad.zm", "Hodnota = 6\n")
+        assert reload.obnov().obnoveno == ["obn.zaklad", "obn.pouziti"]
+
+    def test_hooks_receive_dependents(self, package):
+        """Test that hooks are told which modules import the changed one."""
+        import obn.pouziti  # noqa: F401
+
+        reload = Obnova(obnovit_zavisle=False)
+        seen = []
+        reload.pri_obnove(seen.append)
+        edit(package / "zaklad.zm", "Hodnota = 7\n")
+        reload.obnov()
+        assert seen[0].obnoveno == ["obn.zaklad"]
+        assert seen[0].zavisle == ["obn.pouziti"]
+
+    def test_background_watcher(self, package):
+        """Test that the watcher thread reloads an edited module."""
+        import obn.zaklad
+
+        reload = Obnova()
+        reload.sleduj(interval=0.05)
+        try:
+            edit(package / "zaklad.zm", "Hodnota = 8\n")
+            deadline = time.monotonic() + 5
+            while obn.zaklad.Hodnota != 8 and time.monotonic() < deadline:
+                time.sleep(0.02)
+        finally:
+            reload.zastav()
+        assert obn.zaklad.Hodnota == 8
@@ -0,0 +1,196 @@
+"""Tests for importing .zm modules from directories and zip archives, and for bundling."""
+
+import hashlib
+import importlib
+import os
+import subprocess
+import sys
+import zipfile
+
+import pytest
+from zmije.artefakt import sestav_soubor
+from zmije.dovoz import instaluj, odinstaluj
+from zmije.zabal import zabal
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+
+def write_tree(base, files):
+    for name, content in files.items():
+        path = base / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content, encoding="utf-8")
+
+
+def make_zip(path, files):
+    with zipfile.ZipFile(path, "w") as archive:
+        for name, content in files.items():
+            archive.writestr(name, content)
+
+
+@pytest.fixture
+def importer():
+    modules_before = set(sys.modules)
+    path_before = list(sys.path)
+    instaluj()
+    yield
+    odinstaluj()
+    sys.path[:] = path_before
+    for name in set(sys.modules) - modules_before:
+        del sys.modules[name]
+
+
+TREE = {
+    "zm_modul.zm": "Hodnota = 1,5\n",
+    "zm_balik/__init__.zm": "od zm_balik.pod dovézt Y\nX = Y\n",
+    "zm_balik/pod.zm": "Y = Pravda\n",
+}
+
+
+class TestDirectoryImport:
+    """Tests for importing .zm modules from directories."""
+
+    def test_module_and_package(self, tmp_path, importer):
+        """Test importing a .zm module and a package with __init__.zm."""
+        write_tree(tmp_path, TREE)
+        sys.path.insert(0, str(tmp_path))
+        assert importlib.import_module("zm_modul").Hodnota == 1.5
+        package = importlib.import_module("zm_balik")
+        assert package.X is True
+        assert package.__path__ == [str(tmp_path / "zm_balik")]
+
+    def test_python_module_takes_precedence(self, tmp_path, importer):
+        """Test that a .py module wins over a .zm module of the same name."""
+        write_tree(tmp_path, {"zm_obojí.zm": "Zdroj = „zmije\"\n", "zm_obojí.py": "Zdroj = 'python'\n"})
+        sys.path.insert(0, str(tmp_path))
+        assert importlib.import_module("zm_obojí").Zdroj == "python"
+
+    def test_artifact_import(self, tmp_path, importer):
+        """Test importing a precompiled .zmc module without its source."""
+        write_tree(tmp_path, {"zm_predkompilovany.zm": "Hodnota = 2,5\n"})
+        sestav_soubor(str(tmp_path / "zm_predkompilovany.zm"))
+        os.remove(tmp_path / "zm_predkompilovany.zm")
+        sys.path.insert(0, str(tmp_path))
+        assert importlib.import_module("zm_predkompilovany").Hodnota == 2.5
+
+    def test_uninstall_removes_hooks(self, tmp_path, importer):
+        """Test that .zm modules are not importable after uninstalling."""
+        write_tree(tmp_path, TREE)
+        sys.path.insert(0, str(tmp_path))
+        odinstaluj()
+        with pytest.raises(ImportError):
+            importlib.import_module("zm_modul")
+        instaluj()
+
+
+class TestZipImport:
+    """Tests for importing .zm modules from zip archives."""
+
+    def test_module_and_package_in_zip(self, tmp_path, importer):
+        """Test importing .zm modules and packages from a zip on sys.path."""
+        archive = tmp_path / "knihovna.zip"
+        make_zip(archive, TREE)
+        sys.path.insert(0, str(archive))
+        module = importlib.import_module("zm_modul")
+        assert module.Hodnota == 1.5
+        assert module.__file__ == os.path.join(str(archive), "zm_modul.zm")
+        assert importlib.import_module("zm_balik").X is True
+
+    def test_python_modules_in_zip_still_work(self, tmp_path, importer):
+        """Test that regular modules in the same zip are still imported by zipimport."""
+        archive = tmp_path / "smisene.zip"
+        make_zip(archive, {"zm_py_modul.py": "VALUE = 42\n", "zm_jmenny/cast.zm": "Cast = 1\n"})
+        sys.path.insert(0, str(archive))
+        assert importlib.import_module("zm_py_modul").VALUE == 42
+        assert importlib.import_module("zm_jmenny.cast").Cast == 1
+
+    def test_get_source_from_zip(self, tmp_path, importer):
+        """Test that the loader exposes the Zmije source."""
+        archive = tmp_path / "zdroj.zip"
+        make_zip(archive, {"zm_se_zdrojem.zm": "Hodnota = Nic\n"})
+        sys.path.insert(0, str(archive))
+        module = importlib.import_module("zm_se_zdrojem")
+        assert module.__loader__.get_source("zm_se_zdrojem") == "Hodnota = Nic\n"
+
+
+class TestBundle:
+    """Tests for zabal, the zipapp bundler."""
+
+    def test_bundle_contains_only_bytecode(self, tmp_path):
+        """Test that sources are replaced by .pyc files."""
+        write_tree(tmp_path / "src", dict(TREE, **{"data.txt": "x"}))
+        target = tmp_path / "app.pyz"
+        zabal(str(tmp_path / "src"), str(target), hlavni="zm_balik:print")
+        with zipfile.ZipFile(target) as archive:
+            names = sorted(archive.namelist())
+        assert names == ["__main__.pyc", "data.txt", "zm_balik/__init__.pyc", "zm_balik/pod.pyc", "zm_modul.pyc"]
+
+    def test_bundle_is_reproducible(self, tmp_path):
+        """Test that bundling the same tree twice gives identical bytes."""
+        write_tree(tmp_path / "src", TREE)
+        digests = []
+        for name in ("a.pyz", "b.pyz"):
+            zabal(str(tmp_path / "src"), str(tmp_path / name), hlavni="zm_modul:print")
+            digests.append(hashlib.sha256((tmp_path / name).read_bytes()).hexdigest())
+        assert digests[0] == digests[1]
+
+    def test_bundle_requires_entry_point(self, tmp_path):
+        """Test that a tree without __main__ needs an explicit entry point."""
+        write_tree(tmp_path / "src", TREE)
+        with pytest.raises(ValueError, match="__main__"):
+            zabal(str(tmp_path / "src"), str(tmp_path / "app.pyz"))
+
+    @pytest.mark.parametrize("entry", ["zm_modul", ":print", "zm_modul:"])
+    def test_invalid_entry_point_writes_nothing(self, tmp_path, entry):
+        """Test that a malformed entry point is rejected before the archive is created."""
+        write_tree(tmp_path / "src", TREE)
+        target = tmp_path / "app.pyz"
+        with pytest.raises(ValueError, match="modul:funkce"):
+            zabal(str(tmp_path / "src"), str(target), hlavni=entry)
+        assert sorted(os.listdir(tmp_path)) == ["src"]
+
+    def test_entry_point_conflicts_with_main_module(self, tmp_path):
+        """Test that an entry point is refused when the tree has its own __main__."""
+        write_tree(tmp_path / "src", dict(TREE, **{"__main__.zm": "vytiskni(1)\n"}))
+        with pytest.raises(ValueError, match="__main__"):
+            zabal(str(tmp_path / "src"), str(tmp_path / "app.pyz"), hlavni="zm_modul:print")
+        assert not (tmp_path / "app.pyz").exists()
+
+    def test_failed_module_keeps_previous_archive(self, tmp_path):
+        """Test that an invalid module leaves neither a partial archive nor a temporary file."""
+        write_tree(tmp_path / "src", TREE)
+        target = tmp_path / "app.pyz"
+        target.write_bytes(b"stary")
+        write_tree(tmp_path / "src", {"zz_rozbity.zm": "malé = 1\n"})
+        with pytest.raises(ValueError):
+            zabal(str(tmp_path / "src"), str(target), hlavni="zm_modul:print")
+        assert target.read_bytes() == b"stary"
+        assert sorted(os.listdir(tmp_path)) == ["app.pyz", "src"]
+
+    def test_bundle_honours_encoding_declaration(self, tmp_path):
+        """Test that modules with a coding declaration are decoded like on import."""
+        (tmp_path / "src").mkdir()
+        source = "# coding: iso-8859-2\nvytiskni(ord('ů'))\n"
+        (tmp_path / "src" / "__main__.zm").write_bytes(source.encode("iso-8859-2"))
+        target = tmp_path / "app.pyz"
+        zabal(str(tmp_path / "src"), str(target))
+        result = subprocess.run(
+            [sys.executable, "-I", str(target)], capture_output=True, text=True, check=True, cwd=str(tmp_path),
+        )
+        assert result.stdout.strip() == str(ord("ů"))
+
+    def test_bundle_runs_without_zmije(self, tmp_path):
+        """Test that the archive runs with a plain interpreter via the CLI."""
+        write_tree(tmp_path / "src", {
+            "__main__.zm": "od zm_balik dovézt X\nvytiskni(X; 1,5)\n",
+            "zm_balik/__init__.zm": "X = Pravda\n",
+        })
+        target = tmp_path / "app.pyz"
+        subprocess.run(
+            [sys.executable, "-m", "zmije", "zabal", str(tmp_path / "src"), "-o", str(target)],
+            check=True, cwd=ROOT, capture_output=True,
+        )
+        result = subprocess.run(
+            [sys.executable, "-I", str(target)], capture_output=True, text=True, check=True, cwd=str(tmp_path),
+        )
+        assert result.stdout.strip() == "True 1.5"
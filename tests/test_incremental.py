@@ -0,0 +1,128 @@
+"""Tests for dependency stamps and skip-unchanged writes in the CLI."""
+
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+from zmije.razitko import (
+    cesta_razitka, je_aktualni, nacti_razitko, otisk_souboru, stav_souboru, uloz_razitko, zapis_atomicky,
+)
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+
+def run_cli(*args):
+    return subprocess.run(
+        [sys.executable, "-m", "zmije", *args],
+        capture_output=True, text=True, encoding="utf-8", check=True, cwd=ROOT,
+    ).stdout
+
+
+class TestAtomicWrite:
+    """Tests for zapis_atomicky."""
+
+    def test_identical_content_is_not_rewritten(self, tmp_path):
+        """Test that writing the same bytes keeps the file and its mtime."""
+        target = tmp_path / "out.py"
+        assert zapis_atomicky(str(target), "X = True\n") is True
+        os.utime(target, ns=(1, 1))
+        assert zapis_atomicky(str(target), "X = True\n") is False
+        assert os.stat(target).st_mtime_ns == 1
+
+    def test_changed_content_is_replaced(self, tmp_path):
+        """Test that different content replaces the file without leftovers."""
+        target = tmp_path / "out.py"
+        target.write_text("old", encoding="utf-8")
+        assert zapis_atomicky(str(target), "new") is True
+        assert target.read_text(encoding="utf-8") == "new"
+        assert os.listdir(tmp_path) == ["out.py"]
+
+
+class TestStamp:
+    """Tests for the dependency stamp."""
+
+    @pytest.fixture
+    def built(self, tmp_path):
+        source = tmp_path / "a.zm"
+        target = tmp_path / "a.py"
+        source.write_text("X = Pravda\n", encoding="utf-8")
+        target.write_text("X = True\n", encoding="utf-8")
+        uloz_razitko(str(source), str(target))
+        return source, target
+
+    def test_fresh_after_build(self, built):
+        """Test that a just written stamp marks the output as current."""
+        source, target = built
+        assert je_aktualni(str(source), str(target))
+        assert nacti_razitko(str(target))["zdroj_stav"][0] == len(source.read_bytes())
+
+    def test_touch_without_change_is_still_fresh(self, built):
+        """Test that only content, not mtime, decides about staleness."""
+        source, target = built
+        os.utime(source, ns=(10 ** 18, 10 ** 18))
+        assert je_aktualni(str(source), str(target))
+
+    def test_source_edit_makes_stale(self, built):
+        """Test that editing the source invalidates the stamp."""
+        source, target = built
+        source.write_text("X = Lež\n", encoding="utf-8")
+        assert not je_aktualni(str(source), str(target))
+
+    def test_output_edit_makes_stale(self, built):
+        """Test that a hand-edited or deleted output is rebuilt."""
+        source, target = built
+        target.write_text("X = 2\n", encoding="utf-8")
+        assert not je_aktualni(str(source), str(target))
+        target.unlink()
+        assert not je_aktualni(str(source), str(target))
+
+    def test_edit_during_build_makes_stale(self, tmp_path):
+        """Test that a source changed while it was being transpiled is rebuilt next time."""
+        source = tmp_path / "a.zm"
+        target = tmp_path / "a.py"
+        source.write_text("X = Pravda\n", encoding="utf-8")
+        state = stav_souboru(str(source))
+        digest = otisk_souboru(str(source))
+        target.write_text("X = True\n", encoding="utf-8")
+        source.write_text("X = Lež\n", encoding="utf-8")
+        os.utime(source, ns=(10 ** 18, 10 ** 18))
+        uloz_razitko(str(source), str(target), digest, state)
+        assert not je_aktualni(str(source), str(target))
+
+    def test_rule_change_makes_stale(self, built):
+        """Test that a stamp from different rewrite rules is ignored."""
+        source, target = built
+        path = cesta_razitka(str(target))
+        with open(path, encoding="utf-8") as f:
+            stamp = json.load(f)
+        stamp["pravidla"] = "0" * 64
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(stamp, f)
+        assert not je_aktualni(str(source), str(target))
+
+
+class TestIncrementalCli:
+    """Tests for incremental builds through the CLI."""
+
+    def test_noop_build_leaves_output_untouched(self, tmp_path):
+        """Test that a second build skips transpiling and keeps the mtime."""
+        source = tmp_path / "a.zm"
+        target = tmp_path / "a.py"
+        source.write_text("vytiskni(Pravda)\n", encoding="utf-8")
+        assert "uložen" in run_cli(str(source), "-o", str(target))
+        os.utime(target, ns=(5, 5))
+        uloz_razitko(str(source), str(target))
+        assert "aktuální" in run_cli(str(source), "-o", str(target))
+        assert os.stat(target).st_mtime_ns == 5
+
+    def test_forced_rebuild_with_same_output_keeps_mtime(self, tmp_path):
+        """Test that --znovu transpiles again but does not rewrite identical output."""
+        source = tmp_path / "a.zm"
+        target = tmp_path / "a.py"
+        source.write_text("X = Nic\n", encoding="utf-8")
+        run_cli(str(source), "-o", str(target))
+        os.utime(target, ns=(5, 5))
+        assert "nezměnil" in run_cli(str(source), "-o", str(target), "--znovu")
+        assert os.stat(target).st_mtime_ns == 5
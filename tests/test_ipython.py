@@ -0,0 +1,85 @@
+"""Tests for the IPython extension."""
+
+import pytest
+
+pytest.importorskip("IPython")
+
+from zmije.ipython import PrevodBunek
+
+
+@pytest.fixture
+def shell():
+    from IPython.core.interactiveshell import InteractiveShell
+
+    shell = InteractiveShell.instance()
+    shell.run_line_magic("load_ext", "zmije")
+    yield shell
+    shell.run_line_magic("unload_ext", "zmije")
+    InteractiveShell.clear_instance()
+
+
+def transformer(shell):
+    return next(t for t in shell.input_transformers_post if isinstance(t, PrevodBunek))
+
+
+class TestIPythonExtension:
+    """Tests for %load_ext zmije and the cell transformer."""
+
+    def test_cell_runs_zmije_code(self, shell):
+        """Test that a Zmije cell executes."""
+        result = shell.run_cell("X = Pravda\nY = [1; 2,5]\n")
+        assert result.success
+        assert shell.user_ns["X"] is True
+        assert shell.user_ns["Y"] == [1, 2.5]
+
+    def test_load_is_idempotent(self, shell):
+        """Test that loading twice registers one transformer."""
+        shell.run_line_magic("reload_ext", "zmije")
+        assert sum(isinstance(t, PrevodBunek) for t in shell.input_transformers_post) == 1
+
+    def test_unload_removes_transformer(self, shell):
+        """Test that unloading removes the transformer."""
+        shell.run_line_magic("unload_ext", "zmije")
+        assert not any(isinstance(t, PrevodBunek) for t in shell.input_transformers_post)
+        shell.run_line_magic("load_ext", "zmije")
+
+    def test_rerun_hits_cache(self, shell, monkeypatch):
+        """Test that re-running an unchanged cell does not transpile again."""
+        shell.run_cell("Počet = 1,5\n")
+        monkeypatch.setattr("zmije.ipython.transpiluj", lambda kod: pytest.fail("not cached"))
+        result = shell.run_cell("Počet = 1,5\n")
+        assert result.success
+        assert transformer(shell).zasahy >= 1
+
+    def test_validation_error_maps_to_cell_line(self, shell):
+        """Test that validation errors are reported as SyntaxError at the cell line."""
+        result = shell.run_cell("X = 1\nY = 2\nšpatná = 3\n")
+        error = result.error_before_exec
+        assert isinstance(error, SyntaxError)
+        assert error.lineno == 3
+        assert error.text == "špatná = 3"
+        assert "velkým" in error.msg
+
+
+class TestCellTransformer:
+    """Tests for PrevodBunek used directly."""
+
+    def test_leading_blank_lines_shift_error_line(self):
+        """Test that blank lines before the code are counted in the error line."""
+        with pytest.raises(SyntaxError) as excinfo:
+            PrevodBunek()(["\n", "\n", "X = 1\n", "špatná = 2\n"])
+        assert excinfo.value.lineno == 4
+
+    def test_leading_blank_lines_preserved_in_output(self):
+        """Test that output lines stay aligned with cell lines."""
+        lines = PrevodBunek()(["\n", "X = Pravda\n"])
+        assert lines[0] == "\n"
+        assert "True" in lines[1]
+
+    def test_cache_is_bounded(self):
+        """Test that the least recently used cells are dropped."""
+        prevod = PrevodBunek(max_bunek=2)
+        for i in range(3):
+            prevod([f"X = {i}\n"])
+        assert len(prevod.mezipamet) == 2
+        assert prevod.minuti == 3
@@ -0,0 +1,104 @@
+"""Tests for lazily loading .zm modules on first attribute access."""
+
+import importlib
+import sys
+import zipfile
+
+import pytest
+import zmije.dovoz
+from zmije import dovoz
+from zmije.main import ChybaValidace
+from zmije.obnova import moduly_zmije
+
+TREE = {
+    "lin/__init__.zm": "Zaklad = 1\n",
+    "lin/pomaly.zm": "Hodnota = 42\n",
+    "lin/rozbity.zm": "hodnota = 1\n",
+    "zbr/__init__.zm": "",
+    "zbr/modul.zm": "Hodnota = 7\n",
+}
+
+
+def write_tree(base, files):
+    for name, content in files.items():
+        path = base / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content, encoding="utf-8")
+
+
+@pytest.fixture
+def importer(tmp_path, monkeypatch):
+    modules_before = set(sys.modules)
+    monkeypatch.syspath_prepend(str(tmp_path))
+    write_tree(tmp_path, TREE)
+    calls = []
+    original = zmije.dovoz.transpiluj
+
+    def counting(code, *args, **kwargs):
+        calls.append(code)
+        return original(code, *args, **kwargs)
+
+    monkeypatch.setattr(zmije.dovoz, "transpiluj", counting)
+    dovoz.instaluj(line=["lin"])
+    yield calls
+    dovoz.odinstaluj()
+    dovoz.bez_lineho_nacitani()
+    for name in set(sys.modules) - modules_before:
+        del sys.modules[name]
+
+
+class TestLazyImport:
+    """Tests for the per-package lazy mode of the import hook."""
+
+    def test_module_runs_on_first_attribute_access(self, importer):
+        """Test that importing a lazy module neither transpiles nor executes it."""
+        # Importing a submodule reads the parent's __path__, which loads the parent.
+        module = importlib.import_module("lin.pomaly")
+        assert importer == ["Zaklad = 1\n"]
+        assert module.Hodnota == 42
+        assert importer == ["Zaklad = 1\n", "Hodnota = 42\n"]
+        assert sys.modules["lin.pomaly"] is module
+        assert isinstance(module.__spec__.loader, dovoz.ZmijeLoader)
+
+    def test_other_packages_stay_eager(self, importer):
+        """Test that packages not configured as lazy load at import time."""
+        importlib.import_module("zbr.modul")
+        assert importer == ["", "Hodnota = 7\n"]
+
+    def test_errors_surface_on_first_access(self, importer):
+        """Test that a broken lazy module fails when it is used, not when it is imported."""
+        module = importlib.import_module("lin.rozbity")
+        with pytest.raises(ChybaValidace):
+            module.hodnota
+
+    def test_lazy_mode_can_be_switched_off(self, importer):
+        """Test that removing a package from the lazy set makes new imports eager."""
+        dovoz.bez_lineho_nacitani("lin")
+        importlib.import_module("lin")
+        assert importer == ["Zaklad = 1\n"]
+        assert not dovoz.je_liny("lin.pomaly")
+
+    def test_prefix_matches_whole_package_names(self, importer):
+        """Test that a lazy package does not make similarly named packages lazy."""
+        assert dovoz.je_liny("lin") and dovoz.je_liny("lin.pomaly")
+        assert not dovoz.je_liny("linka")
+
+    def test_zip_archive_module(self, tmp_path, importer):
+        """Test that modules inside zip archives can be lazy as well."""
+        archive = tmp_path / "balik.zip"
+        with zipfile.ZipFile(archive, "w") as zf:
+            zf.writestr("linzip/__init__.zm", "")
+            zf.writestr("linzip/modul.zm", "Hodnota = 3\n")
+        sys.path.insert(0, str(archive))
+        dovoz.line_nacitani("linzip")
+        module = importlib.import_module("linzip.modul")
+        assert importer == [""]
+        assert module.Hodnota == 3
+
+    def test_hot_reload_ignores_unloaded_modules(self, importer):
+        """Test that scanning for reloadable modules does not force a lazy module to load."""
+        importlib.import_module("lin.pomaly")
+        assert "lin.pomaly" not in moduly_zmije()
+        assert importer == ["Zaklad = 1\n"]
+        sys.modules["lin.pomaly"].Hodnota
+        assert "lin.pomaly" in moduly_zmije()
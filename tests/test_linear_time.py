@@ -0,0 +1,125 @@
+"""Stress tests that the rewrite engine stays linear on adversarial inputs."""
+
+import time
+
+import pytest
+from zmije.main import potrebuje_prepis, seznam_uprav, spust_pruchody, transpiluj
+from zmije.proud import radky_z_bajtu
+
+# Quadrupling the input of a linear step takes about 4x as long and of a
+# quadratic one about 16x; the bound leaves room for timing noise.
+FACTOR = 4
+MAX_GROWTH = 9
+
+
+def best_time(function, argument, repeats=3):
+    best = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function(argument)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def growth(function, make, size):
+    small = best_time(function, make(size))
+    large = best_time(function, make(size * FACTOR))
+    return large / small
+
+
+def transpile(code):
+    return transpiluj(code, kontrola_syntaxe=False)
+
+
+def names_line(count):
+    return "X = [" + ", ".join(f"A{i}" for i in range(count)) + "]\n"
+
+
+def keyword_run(count):
+    # A long run of NAME tokens that all look like the start of a keyword.
+    return "X = (" + " ".join(["není"] * count) + ")\n"
+
+
+def decimal_list(count):
+    return "X = [" + "; ".join(f"{i},{i % 10}" for i in range(count)) + "]\n"
+
+
+def dotted_number(count):
+    return "X = " + "1." * count + "1\n"
+
+
+def long_line_chunks(count):
+    # One line with no newline until the end, read in 1 KiB pieces.
+    return [b"X = ["] + [b"1, " * 341] * count + [b"1]\n"]
+
+
+def read_lines(chunks):
+    assert len(list(radky_z_bajtu(chunks))) == 1
+
+
+def quotes_line(count):
+    return "X = [" + ", ".join("„a‟" for _ in range(count)) + "]\n"
+
+
+class TestLinearTime:
+    """Tests that rewriting time grows linearly with the input."""
+
+    @pytest.mark.parametrize("make, size", [
+        (names_line, 5000),
+        (keyword_run, 5000),
+        (decimal_list, 1000),
+    ], ids=["names", "keyword_run", "decimal_list"])
+    def test_transpile_is_linear(self, make, size):
+        """Test that transpiling long lines grows linearly."""
+        assert growth(transpile, make, size) < MAX_GROWTH
+
+    def test_keyword_pass_is_linear(self):
+        """Test that the keyword pass looks back a bounded number of tokens."""
+        import io
+        import tokenize
+
+        def rewrite(code):
+            spust_pruchody(tokenize.generate_tokens(io.StringIO(code).readline))
+
+        assert growth(rewrite, keyword_run, 10000) < MAX_GROWTH
+
+    def test_prefilter_is_linear(self):
+        """Test that the rewrite prefilter does not rescan runs of dotted digits."""
+        assert growth(potrebuje_prepis, dotted_number, 20000) < MAX_GROWTH
+
+    def test_streamed_long_line_is_linear(self):
+        """Test that decoding a long line piece by piece does not recopy it."""
+        assert growth(read_lines, long_line_chunks, 1000) < MAX_GROWTH
+
+    def test_edit_list_positions_of_many_quotes(self):
+        """Test that quote positions found incrementally match a direct count."""
+        code = quotes_line(300) + "\n\n" + quotes_line(200)
+        edits = seznam_uprav(code)
+        expected = []
+        for number, line in enumerate(code.split("\n"), 1):
+            expected += [(number, column) for column, char in enumerate(line) if char in "„‟"]
+        assert [(edit.radek, edit.sloupec) for edit in edits if edit.stary in "„‟"] == expected
+
+
+class TestPrefilter:
+    """Tests that the linear prefilter still finds every decimal comma."""
+
+    @pytest.mark.parametrize("code", [
+        "X = 1,5\n", "X = 1 , 5\n", "X = .5,3\n", "X = A.5,3\n", "X = 1.5,3\n", "X = 0x1,2\n",
+        "X = f(1,\\\n  2)\n", "X = 1.1.1,1\n",
+    ])
+    def test_number_before_comma(self, code):
+        """Test that a number followed by a comma and a digit is a rewrite candidate."""
+        assert potrebuje_prepis(code)
+
+    @pytest.mark.parametrize("code", ["X = A1, 2\n", "X = ž1,5\n", "X = g(Bod, 1)\n", "X = " + "1." * 1000 + "\n"])
+    def test_names_before_comma(self, code):
+        """Test that names ending in digits and commas after names are not candidates."""
+        assert not potrebuje_prepis(code)
+
+    def test_large_inputs_finish(self):
+        """Test that a million-character run of dotted digits is scanned quickly."""
+        start = time.perf_counter()
+        assert not potrebuje_prepis(dotted_number(500000))
+        assert time.perf_counter() - start < 5
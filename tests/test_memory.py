@@ -0,0 +1,78 @@
+"""Tests for the peak-memory budget of the transpiler."""
+
+import sys
+import tracemalloc
+
+import pytest
+import zmije.main
+from tests.program_generator import generate_program
+from zmije.main import meze_bez_okraju, prepis_kod, radky_textu, transpiluj
+
+BUDGET = 4
+
+
+def source(size):
+    parts = []
+    length = 0
+    seed = 0
+    while length < size:
+        part = generate_program(seed, broken_rate=0).rstrip("\n") + "\n"
+        parts.append(part)
+        length += len(part)
+        seed += 1
+    return "".join(parts)
+
+
+def peak(function, *args, **kwargs):
+    # A fresh start() traces from zero, so the peak needs no reset
+    # (tracemalloc.reset_peak() only exists from Python 3.9).
+    tracemalloc.start()
+    try:
+        start = tracemalloc.get_traced_memory()[0]
+        function(*args, **kwargs)
+        return tracemalloc.get_traced_memory()[1] - start
+    finally:
+        tracemalloc.stop()
+
+
+@pytest.fixture
+def small_blocks(monkeypatch):
+    # A smaller block keeps the fixed per-block overhead proportional to the
+    # test input, so the budget is checked at a size that runs quickly.
+    monkeypatch.setattr(zmije.main, "VELIKOST_BLOKU_PAMETI", 4096)
+
+
+class TestMemoryBudget:
+    """Tests that peak memory stays within a multiple of the source size."""
+
+    @pytest.mark.parametrize("engine", [prepis_kod, lambda code: transpiluj(code, kontrola_syntaxe=False)],
+                             ids=["prepis_kod", "transpiluj"])
+    def test_peak_under_budget(self, engine, small_blocks):
+        """Test that peak allocations stay under BUDGET times the source string."""
+        code = source(256 * 1024)
+        used = peak(engine, code)
+        assert used < BUDGET * sys.getsizeof(code), f"{used / sys.getsizeof(code):.2f}x"
+
+    def test_block_size_does_not_change_output(self, small_blocks):
+        """Test that block-wise rewriting matches the single-block path."""
+        code = source(64 * 1024)
+        expected = zmije.main.prepis_overeneho(code)
+        assert prepis_kod(code) == expected
+
+
+class TestLineReader:
+    """Tests for the copy-free line reader."""
+
+    @pytest.mark.parametrize("text", ["", "a", "a\n", "a\nb", "\n\n", "a\r\nb\rc\n"])
+    def test_matches_stringio(self, text):
+        """Test that lines match io.StringIO.readline splitting."""
+        import io
+
+        reader = io.StringIO(text)
+        assert list(radky_textu(text)) == list(iter(reader.readline, ""))
+
+    @pytest.mark.parametrize("text", ["", "  ", " a ", "\n\tX = 1\n\n", "X "])
+    def test_bounds_match_strip(self, text):
+        """Test that meze_bez_okraju matches str.strip."""
+        start, end = meze_bez_okraju(text)
+        assert text[start:end] == text.strip()
@@ -0,0 +1,138 @@
+"""Tests for the process-wide metrics and their Prometheus text export."""
+
+import os
+import subprocess
+import sys
+import threading
+
+import pytest
+from zmije import metriky
+from zmije.main import ChybaValidace, prepis_proud, transpiluj
+from zmije.mezipamet import SqliteMezipamet, transpiluj_s_mezipameti
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+
+@pytest.fixture(autouse=True)
+def clean_metrics():
+    metriky.vynuluj()
+    yield
+    metriky.vynuluj()
+
+
+class TestCounters:
+    """Tests for the counters updated by transpilation."""
+
+    def test_sources_bytes_and_tokens(self):
+        """Test that a transpiled source is counted with its UTF-8 size."""
+        code = "X = Pravda\nŽ = 3,14\n"
+        transpiluj(code)
+        assert metriky.hodnota("zmije_zdroje_celkem") == 1
+        assert metriky.hodnota("zmije_bajty_celkem") == len(code.encode("utf-8"))
+        assert metriky.hodnota("zmije_tokeny_celkem") > 0
+
+    def test_keyword_replacements_per_entry(self):
+        """Test that replacements are counted per keyword map entry."""
+        transpiluj("když Pravda:\n    X = Nic\nkdyž Pravda:\n    X = 1\n")
+        assert metriky.hodnota("zmije_klicova_slova_celkem", klicove_slovo="když") == 2
+        assert metriky.hodnota("zmije_klicova_slova_celkem", klicove_slovo="pravda") == 2
+        assert metriky.hodnota("zmije_klicova_slova_celkem", klicove_slovo="nic") == 1
+
+    def test_validation_failures_by_rule(self):
+        """Test that rejected sources are counted by the violated rule."""
+        for code in ("promenna = 1", "X = 1\nif X:\n    pass", "X = (1"):
+            with pytest.raises(ChybaValidace):
+                transpiluj(code)
+        assert metriky.hodnota("zmije_chyby_validace_celkem", pravidlo="velke_pismeno") == 1
+        assert metriky.hodnota("zmije_chyby_validace_celkem", pravidlo="anglicke_klicove_slovo") == 1
+        assert metriky.hodnota("zmije_chyby_validace_celkem", pravidlo="tokenizace") == 1
+        assert metriky.hodnota("zmije_zdroje_celkem") == 0
+
+    def test_stream_counts_source_once(self):
+        """Test that a streamed source counts once although it has many blocks."""
+        lines = [f"X{i} = {i}\n" for i in range(200)]
+        "".join(prepis_proud(iter(lines), velikost_bloku=100))
+        assert metriky.hodnota("zmije_zdroje_celkem") == 1
+        assert metriky.hodnota("zmije_bajty_celkem") == len("".join(lines))
+
+    def test_stream_retry_is_not_a_failure(self):
+        """Test that a block retried after a bad split is not counted as a failure."""
+        lines = ["X = (1,\n"] + [f"     {i},\n" for i in range(50)] + [")\n"] * 1 + ["Y = 2\n"] * 50
+        "".join(prepis_proud(iter(lines), velikost_bloku=32))
+        assert metriky.hodnota("zmije_chyby_validace_celkem", pravidlo="tokenizace") == 0
+
+    def test_stage_timings(self):
+        """Test that every stage records its cumulative time and calls."""
+        transpiluj("X = Pravda\n")
+        for stage in ("validace", "prepis", "kontrola_syntaxe"):
+            assert metriky.hodnota("zmije_faze_volani_celkem", faze=stage) == 1
+            assert metriky.hodnota("zmije_faze_sekundy_celkem", faze=stage) >= 0
+
+    def test_cache_hits_and_misses(self, tmp_path):
+        """Test that cache lookups are counted by entry kind."""
+        with SqliteMezipamet(str(tmp_path / "cache.sqlite")) as cache:
+            transpiluj_s_mezipameti("X = Pravda\n", cache)
+            transpiluj_s_mezipameti("X = Pravda\n", cache)
+        assert metriky.hodnota("zmije_mezipamet_minuti_celkem", druh="py") == 1
+        assert metriky.hodnota("zmije_mezipamet_zasahy_celkem", druh="py") == 1
+
+    def test_concurrent_updates_are_not_lost(self):
+        """Test that counters stay exact under concurrent updates."""
+        def run():
+            for _ in range(1000):
+                metriky.pridej("zmije_tokeny_celkem")
+
+        threads = [threading.Thread(target=run) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert metriky.hodnota("zmije_tokeny_celkem") == 8000
+
+
+class TestExport:
+    """Tests for the Prometheus text exporter."""
+
+    def test_unlabelled_metrics_are_always_present(self):
+        """Test that an empty registry still exports zero totals."""
+        text = metriky.export()
+        assert "# TYPE zmije_zdroje_celkem counter\nzmije_zdroje_celkem 0\n" in text
+        assert "zmije_klicova_slova_celkem" not in text
+
+    def test_labels_are_escaped(self):
+        """Test that label values are escaped per the text format."""
+        metriky.pridej("zmije_chyby_validace_celkem", pravidlo='a"b\\c\nd')
+        assert 'zmije_chyby_validace_celkem{pravidlo="a\\"b\\\\c\\nd"} 1' in metriky.export()
+
+    def test_dump_to_file(self, tmp_path):
+        """Test that uloz writes the export atomically."""
+        transpiluj("X = Pravda\n")
+        target = tmp_path / "zmije.prom"
+        metriky.uloz(str(target))
+        assert target.read_text(encoding="utf-8") == metriky.export()
+        assert os.listdir(tmp_path) == ["zmije.prom"]
+
+    def test_cli_dump(self, tmp_path):
+        """Test that --metriky writes the counters when the CLI exits."""
+        source = tmp_path / "a.zm"
+        source.write_text("když Pravda:\n    X = 1\n", encoding="utf-8")
+        target = tmp_path / "metriky.prom"
+        subprocess.run(
+            [sys.executable, "-m", "zmije", str(source), "--metriky", str(target), "-o", str(tmp_path / "a.py")],
+            capture_output=True, check=True, cwd=ROOT,
+        )
+        text = target.read_text(encoding="utf-8")
+        assert "zmije_zdroje_celkem 1\n" in text
+        assert 'zmije_klicova_slova_celkem{klicove_slovo="když"} 1' in text
+
+    def test_cli_dump_on_error(self, tmp_path):
+        """Test that the counters are written even when transpilation fails."""
+        source = tmp_path / "a.zm"
+        source.write_text("promenna = 1\n", encoding="utf-8")
+        target = tmp_path / "metriky.prom"
+        result = subprocess.run(
+            [sys.executable, "-m", "zmije", "--metriky", str(target), str(source)],
+            capture_output=True, cwd=ROOT,
+        )
+        assert result.returncode != 0
+        assert 'zmije_chyby_validace_celkem{pravidlo="velke_pismeno"} 1' in target.read_text(encoding="utf-8")
@@ -0,0 +1,182 @@
+"""Tests for chunked parallel transpilation of large sources."""
+
+import functools
+import json
+import multiprocessing
+import tokenize
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+import zmije.main
+from zmije import metriky
+from zmije.main import (
+    Pruchod,
+    SkenerRadku,
+    odregistruj_pruchod,
+    odregistruj_slovnik,
+    rozdel_na_bloky,
+    transpiluj,
+    zaregistruj_pruchod,
+    zaregistruj_slovnik,
+)
+
+
+BLOCK = '''# Vygenerovaná tabulka
+Tabulka_{n} = [
+    (1,5; 2,25; „a"),
+    (3,75; 4,0; „b"),
+]
+Text_{n} = """víceřádkový
+    řetězec; s Pravda a 1,5
+"""
+když Tabulka_{n}:
+    vytiskni(Tabulka_{n}; Text_{n})
+jinak:
+    přejdi
+def funkce_{n}(a; b):
+    vrať a + b
+Pokračování_{n} = 1 + \\
+    2
+'''
+
+
+def generate(count):
+    return "".join(BLOCK.format(n=n) for n in range(count))
+
+
+def normalized(code):
+    return code.replace("„", '"').replace("‟", '"')
+
+
+class UpperStrings(Pruchod):
+    nazev = "velke_retezce"
+    typy = (tokenize.STRING,)
+
+    def zpracuj(self, stav, okno, vystup):
+        vystup.append(okno[0]._replace(string=okno[0].string.upper()))
+        return 1
+
+
+class UnpicklablePass(UpperStrings):
+    nazev = "nepredatelny"
+
+    def __init__(self):
+        self.transform = lambda text: text
+
+
+@pytest.fixture
+def spawn_pool(monkeypatch):
+    # Workers started by spawn inherit nothing registered at run time.
+    context = multiprocessing.get_context("spawn")
+    monkeypatch.setattr(zmije.main, "ProcessPoolExecutor", functools.partial(ProcessPoolExecutor, mp_context=context))
+
+
+@pytest.fixture
+def custom_rules(tmp_path):
+    pack = tmp_path / "pack.json"
+    pack.write_text(json.dumps({"nazev": "test", "slova": {"délka": "len"}}), encoding="utf-8")
+    zaregistruj_pruchod(UpperStrings())
+    zaregistruj_slovnik(str(pack), str(tmp_path / "cache"))
+    yield
+    odregistruj_slovnik(str(pack))
+    odregistruj_pruchod("velke_retezce")
+
+
+class TestSplitIntoChunks:
+    """Tests for rozdel_na_bloky."""
+
+    def test_chunks_concatenate_to_input(self):
+        """Test that splitting loses and duplicates nothing."""
+        code = normalized(generate(20))
+        chunks = rozdel_na_bloky(code, 200)
+        assert len(chunks) > 1
+        assert "".join(chunks) == code
+
+    def test_chunks_start_at_top_level_statements(self):
+        """Test that every chunk after the first starts a column-0 statement."""
+        code = normalized(generate(20))
+        for chunk in rozdel_na_bloky(code, 1)[1:]:
+            assert chunk[0] not in " \t#\n"
+            assert not chunk.startswith("    řetězec")
+            assert not chunk.startswith('"""')
+            assert not chunk.startswith("(3,75")
+
+    def test_small_input_is_one_chunk(self):
+        """Test that input below the chunk size is not split."""
+        code = normalized(generate(2))
+        assert rozdel_na_bloky(code, len(code) + 1) == [code]
+
+    def test_scanner_tracks_brackets_and_strings(self):
+        """Test the line scanner state across continuation lines."""
+        scanner = SkenerRadku()
+        scanner.zpracuj("X = [1; (2\n")
+        assert scanner.hloubka == 2
+        scanner.zpracuj("]) # ]]]\n")
+        assert scanner.uzavreno
+        scanner.zpracuj("S = '''začátek ( [\n")
+        assert scanner.otevreny_retezec == "'''"
+        scanner.zpracuj("konec''' + (\n")
+        assert scanner.otevreny_retezec is None
+        assert scanner.hloubka == 1
+        scanner.zpracuj(")\n")
+        scanner.zpracuj("Y = 1 + \\\n")
+        assert scanner.pokracovani
+        assert not scanner.uzavreno
+
+
+class TestParallelTranspile:
+    """Tests that the parallel path matches the serial one exactly."""
+
+    def test_parallel_output_identical(self):
+        """Test parallel output is byte-for-byte identical to serial output."""
+        code = generate(60)
+        assert len(rozdel_na_bloky(normalized(code), 500)) > 1
+        assert transpiluj(code, procesy=2, velikost_bloku=500) == transpiluj(code)
+
+    def test_parallel_output_identical_with_czech_quotes(self):
+        """Test identity when quote normalization happens before splitting."""
+        code = generate(30).replace('„a"', "„a‟")
+        assert transpiluj(code, procesy=3, velikost_bloku=300) == transpiluj(code)
+
+    def test_parallel_without_trailing_newline(self):
+        """Test identity for input that does not end with a newline."""
+        code = generate(10) + "Konec = 1,5"
+        assert transpiluj(code, procesy=2, velikost_bloku=200) == transpiluj(code)
+
+    def test_parallel_error_matches_serial(self):
+        """Test that a validation error reports the same message as serially."""
+        code = generate(30) + "špatná = 1\n" + generate(5)
+        with pytest.raises(ValueError) as serial:
+            transpiluj(code)
+        with pytest.raises(ValueError) as parallel:
+            transpiluj(code, procesy=2, velikost_bloku=300)
+        assert str(parallel.value) == str(serial.value)
+
+    def test_workers_use_registered_passes_and_dictionaries(self, spawn_pool, custom_rules):
+        """Test that spawned workers apply the parent's custom passes and dictionaries."""
+        code = generate(20) + "Delka = délka(Text_1)\n"
+        serial = transpiluj(code)
+        assert '"""VÍCEŘÁDKOVÝ' in serial and "len(Text_1)" in serial
+        assert transpiluj(code, procesy=2, velikost_bloku=500) == serial
+
+    def test_unpicklable_pass_falls_back_to_serial(self, spawn_pool):
+        """Test that a pass the workers cannot receive is still applied."""
+        zaregistruj_pruchod(UnpicklablePass())
+        try:
+            code = generate(20)
+            assert transpiluj(code, procesy=2, velikost_bloku=500) == transpiluj(code)
+        finally:
+            odregistruj_pruchod("nepredatelny")
+
+    def test_worker_counters_reach_parent(self):
+        """Test that keyword and token counts from workers are added to the parent's."""
+        code = generate(20)
+        metriky.METRIKY.vynuluj()
+        transpiluj(code)
+        serial = metriky.METRIKY.hodnota("zmije_klicova_slova_celkem", klicove_slovo="když")
+        tokens = metriky.METRIKY.hodnota("zmije_tokeny_celkem")
+        metriky.METRIKY.vynuluj()
+        transpiluj(code, procesy=2, velikost_bloku=500)
+        assert serial == 20
+        assert metriky.METRIKY.hodnota("zmije_klicova_slova_celkem", klicove_slovo="když") == serial
+        assert metriky.METRIKY.hodnota("zmije_tokeny_celkem") >= tokens
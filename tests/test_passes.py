@@ -0,0 +1,114 @@
+"""Tests for the pass manager that fuses token rewrite passes into one walk."""
+
+import io
+import os
+import tokenize
+
+import pytest
+from zmije.main import (
+    REGISTR_PRUCHODU,
+    Pruchod,
+    nahrad_oddelovac_desetinnych,
+    nahrad_oddelovace_seznamu,
+    odregistruj_pruchod,
+    otisk_prepisu,
+    prepis_kod,
+    prepis_tokeny,
+    spust_pruchody,
+    zaregistruj_pruchod,
+)
+
+ROOT = os.path.join(os.path.dirname(__file__), "..")
+
+
+def tokens(code):
+    return list(tokenize.generate_tokens(io.StringIO(code).readline))
+
+
+def sequential(toks):
+    return nahrad_oddelovace_seznamu(nahrad_oddelovac_desetinnych(prepis_tokeny(toks)))
+
+
+class CountingIterable:
+    """Iterable that records how many times it was iterated."""
+
+    def __init__(self, items):
+        self.items = items
+        self.walks = 0
+
+    def __iter__(self):
+        self.walks += 1
+        return iter(self.items)
+
+
+class TestFusedPasses:
+    """Tests for spust_pruchody with the built-in passes."""
+
+    @pytest.mark.parametrize("code", [
+        "když Pravda a Nepravda:\n    vytiskni(1,5; 2,25)\n",
+        "def funkce(a; b):\n    vrať a + b\n",
+        "X = není v [1; 2]\nY = Objekt.když\n",
+        "pro I v rozsah(3):\n    pokud ne I:\n        pokračuj\n",
+    ])
+    def test_fused_matches_sequential(self, code):
+        """Test that the fused walk produces the same tokens as separate passes."""
+        toks = tokens(code)
+        assert spust_pruchody(toks) == sequential(toks)
+
+    def test_fused_matches_sequential_on_example(self):
+        """Test fused and sequential passes agree on the bundled example."""
+        with open(os.path.join(ROOT, "example.zm"), encoding="utf-8") as f:
+            code = f.read().replace("„", '"').replace("‟", '"')
+        toks = tokens(code)
+        assert spust_pruchody(toks) == sequential(toks)
+
+    def test_single_walk_over_tokens(self):
+        """Test that all passes run over one iteration of the input."""
+        toks = CountingIterable(tokens("když 1,5; 2:\n    přejdi\n"))
+        spust_pruchody(toks)
+        assert toks.walks == 1
+
+
+class UpperStrings(Pruchod):
+    nazev = "velke_retezce"
+    typy = (tokenize.STRING,)
+
+    def zpracuj(self, stav, okno, vystup):
+        vystup.append(okno[0]._replace(string=okno[0].string.upper()))
+        return 1
+
+
+class TestPassRegistry:
+    """Tests for registering custom passes."""
+
+    def test_registered_pass_runs_in_pipeline(self):
+        """Test that a registered pass participates in prepis_kod."""
+        zaregistruj_pruchod(UpperStrings())
+        try:
+            assert prepis_kod('vytiskni("ahoj")\n') == 'print("AHOJ")\n'
+        finally:
+            odregistruj_pruchod("velke_retezce")
+        assert prepis_kod('vytiskni("ahoj")\n') == 'print("ahoj")\n'
+
+    def test_registration_changes_fingerprint(self):
+        """Test that cached results are invalidated by a different pass set."""
+        before = otisk_prepisu()
+        zaregistruj_pruchod(UpperStrings())
+        try:
+            assert otisk_prepisu() != before
+        finally:
+            odregistruj_pruchod("velke_retezce")
+        assert otisk_prepisu() == before
+
+    def test_duplicate_name_rejected(self):
+        """Test that two passes cannot share a name."""
+        with pytest.raises(ValueError):
+            zaregistruj_pruchod(REGISTR_PRUCHODU[0])
+
+    def test_registered_pass_bypasses_prefilter(self):
+        """Test that sources with nothing to rewrite still reach custom passes."""
+        zaregistruj_pruchod(UpperStrings())
+        try:
+            assert prepis_kod('X = "ahoj"\n') == 'X = "AHOJ"\n'
+        finally:
+            odregistruj_pruchod("velke_retezce")
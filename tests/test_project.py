@@ -0,0 +1,239 @@
+"""Tests for the import graph and incremental project builds."""
+
+import json
+import os
+import py_compile
+import subprocess
+import sys
+
+import pytest
+from zmije.artefakt import cesta_pyc, nacti_pyc
+from zmije.projekt import (
+    NAZEV_GRAFU,
+    dovozy_zdroje,
+    exportovane_nazvy,
+    najdi_moduly,
+    nacti_graf,
+    sestav_projekt,
+    silne_komponenty,
+    zavisle_moduly,
+)
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+
+def write(root, relative, text):
+    path = root / relative
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text, encoding="utf-8")
+    return path
+
+
+@pytest.fixture
+def project(tmp_path):
+    write(tmp_path, "app/__init__.zm", "")
+    write(tmp_path, "app/konfigurace.zm", "Zaklad = 21\n")
+    write(tmp_path, "app/util/__init__.zm", "")
+    write(tmp_path, "app/util/mat.zm", "def Dvojnasobek(X):\n    vrať X * 2\n")
+    write(tmp_path, "app/hlavni.zm", "od app.util.mat dovézt Dvojnasobek\nod .konfigurace dovézt Zaklad\nHodnota = Dvojnasobek(Zaklad)\n")
+    return tmp_path
+
+
+def graph(root):
+    return nacti_graf(str(root / NAZEV_GRAFU))
+
+
+class TestGraph:
+    """Tests for parsing imports and building the graph."""
+
+    def test_import_statements(self):
+        """Test that every form of import statement is found."""
+        code = (
+            "dovézt os, sys.path jako P; dovézt re\n"
+            "od ..balik.modul dovézt (A jako B,\n    C)\n"
+            "když Pravda: od . dovézt X\n"
+            "povznes Chyba od Puvod\n"
+            "# dovézt zakomentovano\n"
+            "Text = \"dovézt v řetězci\"\n"
+        )
+        assert dovozy_zdroje(code) == [
+            [0, "os", None], [0, "sys.path", None], [0, "re", None],
+            [2, "balik.modul", ["A", "C"]], [1, "", ["X"]],
+        ]
+
+    def test_module_names(self, project):
+        """Test that packages and modules are named from their paths."""
+        write(project, "app/stin.zm", "X = 1\n")
+        write(project, "app/stin.py", "X = 1\n")
+        assert sorted(najdi_moduly(str(project))) == ["app", "app.hlavni", "app.konfigurace", "app.util", "app.util.mat"]
+
+    def test_dependencies_resolve_relative_imports_and_parents(self, project):
+        """Test that edges include parent packages and relative imports."""
+        sestav_projekt(str(project))
+        modules = graph(project)["moduly"]
+        assert modules["app.hlavni"]["zavislosti"] == ["app", "app.konfigurace", "app.util", "app.util.mat"]
+        assert modules["app.util.mat"]["zavislosti"] == ["app", "app.util"]
+        edges = {name: entry["zavislosti"] for name, entry in modules.items()}
+        assert zavisle_moduly(edges, ["app.util.mat"]) == {"app.hlavni"}
+        assert zavisle_moduly(edges, ["app.util"]) == {"app.util.mat", "app.hlavni"}
+
+    def test_components_are_topological(self):
+        """Test that cycles are merged and dependencies come first."""
+        order = silne_komponenty({"a": ["b"], "b": ["c"], "c": ["b"], "d": []})
+        assert order.index(("b", "c")) < order.index(("a",))
+        assert sorted(order) == [("a",), ("b", "c"), ("d",)]
+
+    def test_exported_names(self):
+        """Test that top-level bindings are collected and dynamic modules give None."""
+        import ast
+
+        tree = ast.parse("import os.path\nfrom x import y as z\nA = 1\nif A:\n    B = 2\ndef f():\n    global C\n    D = 1\nclass E: pass\n")
+        assert exportovane_nazvy(tree) == ["A", "B", "C", "E", "f", "os", "z"]
+        assert exportovane_nazvy(ast.parse("from x import *\n")) is None
+
+    @pytest.mark.skipif(sys.version_info < (3, 10), reason="match statements need Python 3.10")
+    def test_exported_names_from_match_patterns(self):
+        """Test that capture, star and mapping-rest patterns bind names."""
+        import ast
+
+        tree = ast.parse("match x:\n    case [A, *B]: pass\n    case {**C}: pass\n    case D: pass\n")
+        assert exportovane_nazvy(tree) == ["A", "B", "C", "D"]
+
+    def test_exported_names_without_match_nodes(self, monkeypatch):
+        """Test that an interpreter without match pattern nodes still collects names."""
+        import ast
+
+        import zmije.projekt
+
+        monkeypatch.setattr(zmije.projekt, "VZORY_SE_JMENEM", ())
+        monkeypatch.setattr(zmije.projekt, "VZOR_MAPOVANI", ())
+        assert exportovane_nazvy(ast.parse("A = 1\nif A:\n    B = 2\n")) == ["A", "B"]
+
+
+class TestBuild:
+    """Tests for scheduled and incremental builds."""
+
+    def test_full_build_writes_bytecode(self, project):
+        """Test that every module is compiled and dependencies are built first."""
+        summary = sestav_projekt(str(project), procesy=2)
+        assert summary.chyby == []
+        assert sorted(summary.sestaveno) == sorted(najdi_moduly(str(project)))
+        assert summary.sestaveno.index("app.util.mat") < summary.sestaveno.index("app.hlavni")
+        assert summary.kriticka_cesta == ["app", "app.util", "app.util.mat", "app.hlavni"]
+        namespace = {}
+        exec(nacti_pyc(str(project / "app" / "util" / "mat.zm")), namespace)
+        assert namespace["Dvojnasobek"](2) == 4
+
+    def test_second_run_is_a_no_op(self, project):
+        """Test that an unchanged project rebuilds nothing."""
+        sestav_projekt(str(project))
+        summary = sestav_projekt(str(project))
+        assert summary.sestaveno == [] and summary.zkontrolovano == []
+        assert len(summary.aktualni) == 5
+
+    def test_body_change_does_not_touch_dependents(self, project):
+        """Test that a change keeping the same names rebuilds only the module."""
+        sestav_projekt(str(project))
+        write(project, "app/util/mat.zm", "def Dvojnasobek(X):\n    vrať X + X\n")
+        summary = sestav_projekt(str(project))
+        assert summary.sestaveno == ["app.util.mat"]
+        assert summary.zkontrolovano == []
+
+    def test_interface_change_rechecks_dependents(self, project):
+        """Test that renaming a definition re-checks importers and reports the missing name."""
+        sestav_projekt(str(project))
+        write(project, "app/util/mat.zm", "def Trojnasobek(X):\n    vrať X * 3\n")
+        summary = sestav_projekt(str(project))
+        assert summary.sestaveno == ["app.util.mat"]
+        assert summary.zkontrolovano == ["app.hlavni"]
+        assert summary.chyby == ["app/hlavni.zm: modul app.util.mat nedefinuje název Dvojnasobek.".replace("/", os.sep, 1)]
+
+        # The error is reported until it is fixed.
+        assert sestav_projekt(str(project)).chyby == summary.chyby
+        write(project, "app/util/mat.zm", "def Dvojnasobek(X):\n    vrať X * 2\n")
+        assert sestav_projekt(str(project)).chyby == []
+
+    def test_failed_dependency_skips_changed_dependents(self, project):
+        """Test that a module is not built after its dependency fails, and is retried."""
+        sestav_projekt(str(project))
+        write(project, "app/util/mat.zm", "promenna = 1\n")
+        write(project, "app/hlavni.zm", "od app.util.mat dovézt Dvojnasobek\nHodnota = Dvojnasobek(1)\n")
+        summary = sestav_projekt(str(project))
+        assert len(summary.chyby) == 2
+        assert "nesestaveno" in summary.chyby[1]
+        assert "app.hlavni" not in summary.sestaveno
+
+        write(project, "app/util/mat.zm", "def Dvojnasobek(X):\n    vrať X * 2\n")
+        summary = sestav_projekt(str(project))
+        assert summary.chyby == []
+        assert sorted(summary.sestaveno) == ["app.hlavni", "app.util.mat"]
+
+    def test_import_cycle(self, tmp_path):
+        """Test that mutually importing modules are built together."""
+        write(tmp_path, "a.zm", "dovézt b\nX = 1\n")
+        write(tmp_path, "b.zm", "od a dovézt X\n")
+        summary = sestav_projekt(str(tmp_path), procesy=2)
+        assert summary.chyby == []
+        assert sorted(summary.sestaveno) == ["a", "b"]
+
+    def test_critical_path_goes_first(self, tmp_path):
+        """Test that the ready module with the longest remaining path is started first."""
+        write(tmp_path, "samotny.zm", "X = 1\n")
+        write(tmp_path, "zaklad.zm", "X = 1\n")
+        write(tmp_path, "nad.zm", "dovézt zaklad\n")
+        sestav_projekt(str(tmp_path))
+        path = tmp_path / NAZEV_GRAFU
+        data = json.loads(path.read_text(encoding="utf-8"))
+        for name, cost in (("samotny", 1.0), ("zaklad", 0.4), ("nad", 0.4)):
+            data["moduly"][name]["cena"] = cost
+        path.write_text(json.dumps(data), encoding="utf-8")
+        assert sestav_projekt(str(tmp_path), vynutit=True).sestaveno[0] == "samotny"
+
+        data["moduly"]["samotny"]["cena"] = 0.5
+        path.write_text(json.dumps(data), encoding="utf-8")
+        assert sestav_projekt(str(tmp_path), vynutit=True).sestaveno[0] == "zaklad"
+
+    def test_missing_bytecode_is_rebuilt(self, project):
+        """Test that deleting a pyc makes its module dirty."""
+        sestav_projekt(str(project))
+        os.remove(cesta_pyc(str(project / "app" / "konfigurace.zm")))
+        assert sestav_projekt(str(project)).sestaveno == ["app.konfigurace"]
+
+    def test_touch_refreshes_timestamp_pyc(self, project):
+        """Test that a touched but unchanged module keeps a pyc the loader accepts."""
+        sestav_projekt(str(project), invalidace=py_compile.PycInvalidationMode.TIMESTAMP)
+        source = project / "app" / "konfigurace.zm"
+        os.utime(source, ns=(10 ** 18, 10 ** 18))
+        summary = sestav_projekt(str(project), invalidace=py_compile.PycInvalidationMode.TIMESTAMP)
+        assert summary.sestaveno == [] and len(summary.aktualni) == 5
+        namespace = {}
+        exec(nacti_pyc(str(source)), namespace)
+        assert namespace["Zaklad"] == 21
+
+    def test_replaced_timestamp_pyc_is_rebuilt(self, project):
+        """Test that a pyc not matching the source or the last build makes the module dirty."""
+        sestav_projekt(str(project), invalidace=py_compile.PycInvalidationMode.TIMESTAMP)
+        source = project / "app" / "konfigurace.zm"
+        pyc = cesta_pyc(str(source))
+        with open(pyc, "r+b") as f:
+            f.seek(8)
+            f.write(b"\0" * 8)
+        summary = sestav_projekt(str(project), invalidace=py_compile.PycInvalidationMode.TIMESTAMP)
+        assert summary.sestaveno == ["app.konfigurace"]
+        assert nacti_pyc(str(source)) is not None
+
+
+class TestCli:
+    """Tests for the projekt command."""
+
+    def test_cli_reports_and_fails_on_errors(self, project):
+        """Test that zmije projekt prints a summary and exits 1 on a lint error."""
+        command = [sys.executable, "-m", "zmije", "projekt", str(project), "-j", "2"]
+        result = subprocess.run(command, cwd=ROOT, capture_output=True, text=True, encoding="utf-8")
+        assert result.returncode == 0
+        assert "Sestaveno 5, zkontrolováno 0, aktuálních 0, chyb 0." in result.stdout
+
+        write(project, "app/konfigurace.zm", "Jiny = 21\n")
+        result = subprocess.run(command, cwd=ROOT, capture_output=True, text=True, encoding="utf-8")
+        assert result.returncode == 1
+        assert "nedefinuje název Zaklad" in result.stdout
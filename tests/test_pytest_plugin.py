@@ -0,0 +1,171 @@
+"""Tests for the pytest plugin that collects test modules written in Zmije."""
+
+import os
+import subprocess
+import sys
+
+import pytest
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+PASSING = """dovézt pytest
+
+def test_pravda():
+    assert Pravda
+
+@pytest.mark.parametrize("Hodnota"; [1,5; 2,5])
+def test_desetinna(Hodnota):
+    assert Hodnota > 1
+"""
+
+FAILING = """def test_selhani():
+    X = 2
+    assert X + 1 == 4
+"""
+
+
+def run_pytest(directory, *args):
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    return subprocess.run(
+        [sys.executable, "-m", "pytest", "-p", "zmije.testy", *args],
+        capture_output=True, text=True, encoding="utf-8", cwd=str(directory), env=env,
+    )
+
+
+def cache_entries(directory):
+    cache = directory / ".pytest_cache" / "d" / "zmije"
+    return sorted(p.name for p in cache.iterdir()) if cache.exists() else []
+
+
+class TestCollection:
+    """Tests for collecting and running .zm test modules."""
+
+    def test_collects_and_runs_zmije_tests(self, tmp_path):
+        """Test that test_*.zm modules are collected and executed."""
+        (tmp_path / "test_a.zm").write_text(PASSING, encoding="utf-8")
+        (tmp_path / "pomocnik.zm").write_text("def test_neni_test():\n    assert Lež\n", encoding="utf-8")
+        result = run_pytest(tmp_path, "-q")
+        assert result.returncode == 0, result.stdout
+        assert "3 passed" in result.stdout
+
+    def test_assertions_are_rewritten(self, tmp_path):
+        """Test that failing asserts show introspected values and Zmije source lines."""
+        (tmp_path / "test_b.zm").write_text(FAILING, encoding="utf-8")
+        result = run_pytest(tmp_path, "-q")
+        assert result.returncode == 1
+        assert "assert (2 + 1) == 4" in result.stdout
+        assert "test_b.zm:3" in result.stdout
+
+    def test_plain_assert_mode(self, tmp_path):
+        """Test that --assert=plain disables rewriting."""
+        (tmp_path / "test_b.zm").write_text(FAILING, encoding="utf-8")
+        result = run_pytest(tmp_path, "-q", "--assert=plain")
+        assert "assert (2 + 1) == 4" not in result.stdout
+
+    def test_imports_zmije_modules_under_test(self, tmp_path):
+        """Test that tests can import sibling .zm modules."""
+        (tmp_path / "kalkulacka.zm").write_text("def dvojnasobek(X):\n    vrať X * 2\n", encoding="utf-8")
+        (tmp_path / "test_c.zm").write_text(
+            "od kalkulacka dovézt dvojnasobek\n\ndef test_dvojnasobek():\n    assert dvojnasobek(2) == 4\n",
+            encoding="utf-8",
+        )
+        result = run_pytest(tmp_path, "-q")
+        assert result.returncode == 0, result.stdout
+
+    def test_declared_encoding(self, tmp_path):
+        """Test that modules with a coding declaration are decoded and their asserts explained."""
+        source = "# coding: iso-8859-2\ndef test_kun():\n    Jmeno = 'Kůň'\n    assert Jmeno == 'Kůn'\n"
+        (tmp_path / "test_e.zm").write_bytes(source.encode("iso-8859-2"))
+        result = run_pytest(tmp_path, "-q")
+        assert result.returncode == 1
+        assert "assert 'Kůň' == 'Kůn'" in result.stdout
+
+    def test_invalid_module_is_a_collection_error(self, tmp_path):
+        """Test that a validation error is reported as a collection error."""
+        (tmp_path / "test_d.zm").write_text("malé = 1\n", encoding="utf-8")
+        result = run_pytest(tmp_path, "-q")
+        assert result.returncode == 2
+        assert "velkým" in result.stdout
+
+
+HOOK_CHECK = """import sys
+from zmije import dovoz
+
+def test_hooks():
+    assert (dovoz.HAK_ADRESARU in sys.path_hooks) == {expected}
+"""
+
+
+class TestImportHooks:
+    """Tests for when the plugin installs the global .zm import hooks."""
+
+    def test_python_only_session_leaves_hooks_alone(self, tmp_path):
+        """Test that a run without .zm tests does not touch the import system."""
+        (tmp_path / "test_a.py").write_text(HOOK_CHECK.format(expected=False), encoding="utf-8")
+        result = run_pytest(tmp_path, "-q")
+        assert result.returncode == 0, result.stdout
+
+    def test_collected_zmije_tests_install_hooks(self, tmp_path):
+        """Test that collecting a .zm test module installs the hooks for the session."""
+        (tmp_path / "test_a.zm").write_text(PASSING, encoding="utf-8")
+        (tmp_path / "test_b.py").write_text(HOOK_CHECK.format(expected=True), encoding="utf-8")
+        result = run_pytest(tmp_path, "-q")
+        assert result.returncode == 0, result.stdout
+
+    @pytest.mark.parametrize("value, expected", [("true", True), ("false", False)])
+    def test_ini_option_forces_mode(self, tmp_path, value, expected):
+        """Test that zmije_dovoz can switch the hooks on or off explicitly."""
+        (tmp_path / "pytest.ini").write_text(f"[pytest]\nzmije_dovoz = {value}\n", encoding="utf-8")
+        (tmp_path / "test_a.py").write_text(HOOK_CHECK.format(expected=expected), encoding="utf-8")
+        result = run_pytest(tmp_path, "-q")
+        assert result.returncode == 0, result.stdout
+
+
+class TestCache:
+    """Tests for the cross-session bytecode cache."""
+
+    def test_second_session_does_not_transpile(self, tmp_path):
+        """Test that cached bytecode is reused instead of transpiling again."""
+        (tmp_path / "test_a.zm").write_text(PASSING, encoding="utf-8")
+        assert run_pytest(tmp_path, "-q").returncode == 0
+        entries = cache_entries(tmp_path)
+        assert len(entries) == 1
+
+        (tmp_path / "conftest.py").write_text(
+            "import zmije.testy\n"
+            "def fail(*args):\n"
+            "    raise AssertionError('transpiled again')\n"
+            "zmije.testy.transpiluj = fail\n",
+            encoding="utf-8",
+        )
+        result = run_pytest(tmp_path, "-q")
+        assert result.returncode == 0, result.stdout
+        assert cache_entries(tmp_path) == entries
+
+    def test_runs_without_cache_provider(self, tmp_path):
+        """Test that modules are compiled directly when pytest's cache plugin is disabled."""
+        (tmp_path / "test_a.zm").write_text(PASSING, encoding="utf-8")
+        result = run_pytest(tmp_path, "-q", "-p", "no:cacheprovider")
+        assert result.returncode == 0, result.stdout
+        assert "3 passed" in result.stdout
+        assert not (tmp_path / ".pytest_cache").exists()
+
+    def test_changed_source_gets_new_entry(self, tmp_path):
+        """Test that the cache key follows the file content."""
+        source = tmp_path / "test_a.zm"
+        source.write_text(PASSING, encoding="utf-8")
+        run_pytest(tmp_path, "-q")
+        source.write_text(PASSING + "\ndef test_dalsi():\n    přejdi\n", encoding="utf-8")
+        result = run_pytest(tmp_path, "-q")
+        assert "4 passed" in result.stdout
+        assert len(cache_entries(tmp_path)) == 2
+        assert not [name for name in cache_entries(tmp_path) if name.endswith(".tmp")]
+
+    def test_xdist_workers_share_cache(self, tmp_path):
+        """Test running under pytest-xdist."""
+        pytest.importorskip("xdist")
+        for n in range(4):
+            (tmp_path / f"test_{n}.zm").write_text(PASSING, encoding="utf-8")
+        result = run_pytest(tmp_path, "-q", "-n", "2")
+        assert result.returncode == 0, result.stdout
+        assert len(cache_entries(tmp_path)) == 4
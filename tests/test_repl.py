@@ -0,0 +1,92 @@
+"""Tests for the interactive Zmije console."""
+
+import os
+import subprocess
+import sys
+
+import pytest
+import zmije.konzole
+from zmije.konzole import ZmijeKonzole
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+
+class RecordingConsole(ZmijeKonzole):
+    def __init__(self, namespace):
+        super().__init__(namespace)
+        self.written = []
+
+    def write(self, data):
+        self.written.append(data)
+
+
+@pytest.fixture
+def console():
+    return RecordingConsole({})
+
+
+class TestZmijeConsole:
+    """Tests for ZmijeKonzole."""
+
+    def test_simple_statement(self, console):
+        """Test that a single statement is transpiled and executed."""
+        assert console.push("X = Pravda") is False
+        assert console.locals["X"] is True
+
+    def test_bracket_continuation(self, console):
+        """Test that open brackets request more input."""
+        assert console.push("Seznam = [1;") is True
+        assert console.push("2,5]") is False
+        assert console.locals["Seznam"] == [1, 2.5]
+
+    def test_multiline_string(self, console):
+        """Test that an open triple-quoted string requests more input."""
+        assert console.push('Text = """první') is True
+        assert console.push('druhý; Pravda"""') is False
+        assert console.locals["Text"] == "první\ndruhý; Pravda"
+
+    def test_compound_statement(self, console):
+        """Test that blocks are completed by an empty line."""
+        assert console.push("když Pravda:") is True
+        assert console.push("    Y = 1") is True
+        assert console.push("jinak:") is True
+        assert console.push("    Y = 2") is True
+        assert console.push("") is False
+        assert console.locals["Y"] == 1
+
+    def test_each_logical_line_transpiled_once(self, console, monkeypatch):
+        """Test that earlier lines of a block are not transpiled again."""
+        calls = []
+        original = zmije.konzole.prepis_kod
+
+        def counting(code):
+            calls.append(code)
+            return original(code)
+
+        monkeypatch.setattr(zmije.konzole, "prepis_kod", counting)
+        for line in ["pro I v [1;", "2]:", "    Z = I", "    W = I", ""]:
+            console.push(line)
+        assert calls == ["pro I v [1;\n2]:\n", "    Z = I\n", "    W = I\n", "\n"]
+        assert console.locals["W"] == 2
+
+    def test_validation_error_resets_state(self, console):
+        """Test that a validation error is reported and the buffer is cleared."""
+        console.push("když Pravda:")
+        assert console.push("    špatná = 1") is False
+        assert "velkým" in "".join(console.written)
+        assert console.buffer == []
+        assert console.push("X = 1") is False
+        assert console.locals["X"] == 1
+
+    def test_line_rewrite_used_by_console(self):
+        """Test the per-line rewrite the console runs; its timing is in benchmarks/bench_konzole.py."""
+        assert zmije.konzole.prepis_kod("Hodnota = 1,5 + Pravda\n").split() == ["Hodnota", "=", "1.5", "+", "True"]
+
+    def test_cli_starts_console_without_file(self):
+        """Test that running zmije without a file starts the console."""
+        result = subprocess.run(
+            [sys.executable, "-m", "zmije"],
+            input="X = [1;\n2,5]\nvytiskni(X)\n",
+            capture_output=True, text=True, encoding="utf-8", cwd=ROOT, timeout=60,
+        )
+        assert "[1, 2.5]" in result.stdout
@@ -0,0 +1,108 @@
+"""Tests for the pre-fork execution server."""
+
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+
+pytestmark = pytest.mark.skipif(os.name != "posix", reason="the server needs fork and Unix sockets")
+
+from zmije.server import spoj_limity, spust_na_serveru  # noqa: E402
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+
+@pytest.fixture(scope="module")
+def server(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp("server") / "zmije.sock")
+    process = subprocess.Popen(
+        [sys.executable, "-m", "zmije", "server", "--socket", path, "-j", "2", "--cas", "10"],
+        cwd=ROOT, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, encoding="utf-8",
+    )
+    assert "Server naslouchá" in process.stdout.readline()
+    yield path
+    process.send_signal(signal.SIGTERM)
+    process.wait(timeout=10)
+    assert not os.path.exists(path)
+
+
+class TestJobs:
+    """Tests for running scripts on the server."""
+
+    def test_output_arguments_and_input(self, server):
+        """Test that argv, stdin, stdout and the exit code reach the job and back."""
+        code = "dovézt sys\nvytiskni(sys.argv)\nvytiskni(sys.stdin.read().upper())\nsys.exit(3)\n"
+        result = spust_na_serveru(code, server, nazev="a.zm", argumenty=["x"], vstup=b"ahoj")
+        assert result.navratovy_kod == 3
+        assert result.vystup == b"['a.zm', 'x']\nAHOJ\n"
+        assert result.chyba is None
+
+    def test_validation_error(self, server):
+        """Test that a rejected source is reported on stderr with exit code 1."""
+        result = spust_na_serveru("promenna = 1\n", server)
+        assert result.navratovy_kod == 1
+        assert "Chabička se vloudila" in result.chybovy_vystup.decode("utf-8")
+
+    def test_jobs_do_not_share_state(self, server):
+        """Test that a job cannot leave state behind for the next one."""
+        spust_na_serveru("dovézt json\njson.X = 1\n", server)
+        result = spust_na_serveru("dovézt json\nvytiskni(hasattr(json, 'X'))\n", server)
+        assert result.vystup == b"False\n"
+
+    def test_cpu_limit(self, server):
+        """Test that a busy loop is stopped by the CPU limit."""
+        result = spust_na_serveru("při Pravda:\n    přejdi\n", server, limity={"cpu": 1})
+        assert result.signal in (signal.SIGXCPU, signal.SIGKILL)
+
+    def test_wall_clock_limit(self, server):
+        """Test that a sleeping job is killed after its time limit."""
+        start = time.monotonic()
+        result = spust_na_serveru("dovézt time\ntime.sleep(30)\n", server, limity={"cas": 0.5})
+        assert time.monotonic() - start < 5
+        assert result.signal == signal.SIGKILL
+        assert result.navratovy_kod == -signal.SIGKILL
+        assert result.chyba
+
+    def test_output_is_truncated(self, server):
+        """Test that output beyond the limit is dropped and flagged."""
+        result = spust_na_serveru("vytiskni('x' * 5000)\n", server, limity={"vystup": 100})
+        assert result.vystup == b"x" * 100
+        assert result.oriznuto
+
+    def test_concurrent_clients(self, server):
+        """Test that more clients than workers are all served."""
+        results = []
+
+        def run(i):
+            results.append(spust_na_serveru(f"vytiskni({i} * 2)\n", server).vystup)
+
+        threads = [threading.Thread(target=run, args=(i,)) for i in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert sorted(results) == sorted(f"{i * 2}\n".encode() for i in range(8))
+
+    def test_limits_can_only_be_tightened(self):
+        """Test that a request cannot raise the server's limits."""
+        limits = spoj_limity({"cpu": 10, "soubor": None}, {"cpu": 100, "soubor": 5, "neznamy": 1})
+        assert limits == {"cpu": 10, "soubor": 5}
+
+
+class TestCli:
+    """Tests for the klient command."""
+
+    def test_client_forwards_io_and_exit_code(self, server, tmp_path):
+        """Test that zmije klient behaves like running the script directly."""
+        source = tmp_path / "a.zm"
+        source.write_text("dovézt sys\nvytiskni(sys.stdin.read(), sys.argv[1])\nsys.exit(4)\n", encoding="utf-8")
+        result = subprocess.run(
+            [sys.executable, "-m", "zmije", "klient", "--socket", server, str(source), "arg"],
+            input="vstup", capture_output=True, text=True, encoding="utf-8", cwd=ROOT,
+        )
+        assert result.returncode == 4
+        assert result.stdout == "vstup arg\n"
@@ -0,0 +1,115 @@
+"""Tests for streaming transpilation and the stdin/stdout CLI mode."""
+
+import io
+import os
+import subprocess
+import sys
+
+import pytest
+from tests.program_generator import generate_program
+from zmije.main import ChybaValidace, prepis_kod, prepis_proud
+from zmije.proud import cti_radky, radky_z_bajtu, zapis_proud
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+
+class TestPrepisProud:
+    """Tests for prepis_proud."""
+
+    @pytest.mark.parametrize("seed", range(20))
+    def test_matches_whole_source(self, seed):
+        """Test that small blocks produce exactly the whole-file output."""
+        code = generate_program(seed, statements=40, broken_rate=0)
+        chunks = list(prepis_proud(io.StringIO(code), velikost_bloku=200))
+        assert len(chunks) > 1
+        assert "".join(chunks) == prepis_kod(code)
+
+    def test_yields_before_input_is_exhausted(self):
+        """Test that output for early blocks is produced before later input is read."""
+        read = []
+
+        def lines():
+            for n in range(100):
+                read.append(n)
+                yield f"X_{n} = Pravda\n"
+
+        stream = prepis_proud(lines(), velikost_bloku=100)
+        assert next(stream).startswith("X_0 = True")
+        assert len(read) < 100
+
+    def test_error_line_numbers_are_global(self):
+        """Test that errors in later blocks report lines of the whole input."""
+        code = "\n\n" + "".join(f"X_{n} = 1\n" for n in range(50)) + "malá = 2\n"
+        with pytest.raises(ChybaValidace) as whole:
+            prepis_kod(code)
+        with pytest.raises(ChybaValidace) as streamed:
+            "".join(prepis_proud(io.StringIO(code), velikost_bloku=50))
+        assert str(streamed.value) == str(whole.value)
+        assert streamed.value.radek == whole.value.radek
+
+    def test_misplaced_split_is_retried(self):
+        """Test that a block cut inside an unterminated construct is merged with the next one."""
+        code = 'X = """\n' + "Y = 1\n" * 40 + '"""\nZ = Pravda\n'
+        assert "".join(prepis_proud(io.StringIO(code), velikost_bloku=20)) == prepis_kod(code)
+
+
+class TestDecoding:
+    """Tests for the incremental reader."""
+
+    def test_multibyte_and_crlf_split_across_reads(self):
+        """Test that characters and CRLF split between reads decode correctly."""
+        data = "Žluťoučký = 1\r\nKůň = 2\r\n".encode("utf-8")
+        pieces = [data[i:i + 1] for i in range(len(data))]
+        assert list(radky_z_bajtu(pieces)) == ["Žluťoučký = 1\n", "Kůň = 2\n"]
+
+    def test_line_pieces_are_joined_at_newlines(self):
+        """Test lines spread over several reads, empty reads and reads ending in a newline."""
+        pieces = [b"X = ", b"", b"1\n", b"\nY", b" = ", b"2\nZ = 3\n", b"W", b" = 4"]
+        assert list(radky_z_bajtu(pieces)) == ["X = 1\n", "\n", "Y = 2\n", "Z = 3\n", "W = 4"]
+
+    def test_mmap_reader(self, tmp_path):
+        """Test reading a file through mmap, including an empty one."""
+        source = tmp_path / "a.zm"
+        source.write_bytes("X = 1\nY = „ž\"".encode("utf-8"))
+        assert list(cti_radky(str(source))) == ["X = 1\n", "Y = „ž\""]
+        empty = tmp_path / "b.zm"
+        empty.write_bytes(b"")
+        assert list(cti_radky(str(empty))) == []
+
+    def test_failed_write_keeps_previous_output(self, tmp_path):
+        """Test that an error mid-stream leaves the target untouched."""
+        target = tmp_path / "out.py"
+        target.write_text("old", encoding="utf-8")
+
+        def chunks():
+            yield "new"
+            raise ValueError("boom")
+
+        with pytest.raises(ValueError):
+            zapis_proud(chunks(), str(target))
+        assert target.read_text(encoding="utf-8") == "old"
+        assert os.listdir(tmp_path) == ["out.py"]
+
+
+class TestStreamingCli:
+    """Tests for '-' as the source and output of the CLI."""
+
+    def test_stdin_to_stdout(self):
+        """Test using zmije as a filter in a pipeline."""
+        code = "když Pravda:\n    vytiskni(1,5; „a\")\n"
+        result = subprocess.run(
+            [sys.executable, "-m", "zmije", "-"],
+            input=code.encode("utf-8"), capture_output=True, check=True, cwd=ROOT,
+        )
+        assert result.stdout.decode("utf-8") == prepis_kod(code)
+        assert result.stdout.startswith(b"if True:\n    print(1.5")
+
+    def test_file_to_stdout(self, tmp_path):
+        """Test writing a file's output to stdout with -o -."""
+        source = tmp_path / "vstup.zm"
+        source.write_text("X = Nic\n", encoding="utf-8")
+        result = subprocess.run(
+            [sys.executable, "-m", "zmije", str(source), "-o", "-"],
+            capture_output=True, check=True, cwd=ROOT,
+        )
+        assert result.stdout == b"X = None\n"
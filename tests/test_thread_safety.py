@@ -0,0 +1,98 @@
+"""Tests for reentrancy and thread safety of transpiluj."""
+
+import sys
+import threading
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from zmije.main import transpiluj
+
+
+PROGRAMS = [
+    "X = Pravda\nY = 3,14\nSeznam = [1; 2; 3]",
+    'když X > 0:\n    vytiskni("kladné")\njinak:\n    vytiskni("jiné")',
+    "klasa Zvire:\n    def __init__(self; Jméno):\n        self.Jméno = Jméno",
+    "pro I v [1; 2; 3]:\n    pokračovat",
+    "def generátor():\n    vynes 1,5\n    vrať Nic",
+    'zkus:\n    Výsledek = 10 / 0\nkromě:\n    vytiskni("Chyba")',
+]
+
+
+class TestThreadSafety:
+    """Tests that transpiluj can be called concurrently from many threads."""
+
+    def test_parallel_results_match_serial(self):
+        """Test that results from a thread pool match serial transpilation."""
+        expected = [transpiluj(program) for program in PROGRAMS]
+        jobs = PROGRAMS * 50
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            results = list(pool.map(transpiluj, jobs))
+
+        assert results == expected * 50
+
+    def test_parallel_errors_are_isolated(self):
+        """Test that a failing call in one thread does not affect the others."""
+        jobs = ["proměnná = 5", "X = Pravda"] * 100
+
+        def run(code):
+            try:
+                return transpiluj(code)
+            except ValueError as e:
+                return e
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            results = list(pool.map(run, jobs))
+
+        for code, result in zip(jobs, results):
+            if code.startswith("proměnná"):
+                assert isinstance(result, ValueError)
+            else:
+                assert "True" in result
+
+    def test_threads_started_together(self):
+        """Test many threads released at once by a barrier produce the same output."""
+        code = "Data = {„a\": 1,5; „b\": Pravda}\nvytiskni(Data)"
+        expected = transpiluj(code)
+        count = 16
+        barrier = threading.Barrier(count)
+        results = [None] * count
+
+        def run(index):
+            barrier.wait()
+            for _ in range(20):
+                results[index] = transpiluj(code)
+
+        threads = [threading.Thread(target=run, args=(i,)) for i in range(count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert results == [expected] * count
+
+    def test_transpiluj_does_not_print(self, capsys):
+        """Test that transpiluj has no stdout or stderr side effects."""
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            transpiluj("jinak:\n    přejdi")
+        captured = capsys.readouterr()
+        assert captured.out == ""
+        assert captured.err == ""
+
+    def test_syntax_problem_reported_as_warning(self):
+        """Test that suspicious output is reported through the warnings module."""
+        with pytest.warns(SyntaxWarning):
+            transpiluj("jinak:\n    přejdi")
+
+    @pytest.mark.skipif(
+        not hasattr(sys, "_is_gil_enabled"), reason="only meaningful on free-threaded builds"
+    )
+    def test_gil_stays_disabled(self):
+        """Test that importing zmije does not re-enable the GIL on free-threaded builds."""
+        import sysconfig
+
+        if not sysconfig.get_config_var("Py_GIL_DISABLED"):
+            pytest.skip("interpreter built with the GIL")
+        assert not sys._is_gil_enabled()
@@ -0,0 +1,9 @@
+def load_ipython_extension(ipython):
+    from zmije.ipython import nacti_rozsireni
+
+    nacti_rozsireni(ipython)
+
+def unload_ipython_extension(ipython):
+    from zmije.ipython import odeber_rozsireni
+
+    odeber_rozsireni(ipython)
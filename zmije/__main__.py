@@ -1,17 +1,513 @@
-from zmije.main import transpiluj
+from zmije.main import transpiluj, seznam_uprav
+import atexit
+import json
+import os
 import sys
 
+# Soubory od této velikosti se přepisují proudově po blocích, aby se celý
+# zdroj ani výstup nedržel v paměti.
+VELIKOST_PRO_PROUD = 16 * 1024 * 1024
+
+def prikaz_mezipamet(argumenty):
+    from zmije.mezipamet import DRUHY, SqliteMezipamet
+
+    Cesta = None
+    Akce = "statistika"
+    Limit = None
+
+    i = 0
+    while i < len(argumenty):
+        arg = argumenty[i]
+        if arg == "--soubor" and i + 1 < len(argumenty):
+            Cesta = argumenty[i + 1]
+            i += 2
+        elif arg == "zmensi" and i + 1 < len(argumenty):
+            Akce = arg
+            Limit = int(float(argumenty[i + 1]) * 1024 * 1024)
+            i += 2
+        elif arg in ("statistika", "vycisti"):
+            Akce = arg
+            i += 1
+        else:
+            print(f"Chabička se vloudila: Neznámý argument '{arg}'.")
+            sys.exit(1)
+
+    with SqliteMezipamet(Cesta) as Mezipamet:
+        if Akce == "vycisti":
+            print(f"Smazáno záznamů: {Mezipamet.vycisti()}")
+        elif Akce == "zmensi":
+            print(f"Vyřazeno záznamů: {Mezipamet.zmensi(Limit)}")
+        else:
+            Statistika = Mezipamet.statistika()
+            print(f"Soubor:   {Statistika['cesta']}")
+            print(f"Záznamů:  {Statistika['zaznamu']}")
+            print(f"Velikost: {Statistika['velikost'] / 1024 / 1024:.2f} MB z {Statistika['max_velikost'] / 1024 / 1024:.0f} MB")
+            for Druh in DRUHY:
+                Pocet, Velikost = Statistika["druhy"].get(Druh, (0, 0))
+                print(f"  {Druh:<9} {Pocet:8d} záznamů {Velikost / 1024:12.1f} kB")
+
+def prikaz_sestav(argumenty):
+    from zmije.artefakt import cesta_artefaktu, sestav_soubor
+
+    Adresar = None
+    Soubory = []
+
+    i = 0
+    while i < len(argumenty):
+        arg = argumenty[i]
+        if arg == "-d" and i + 1 < len(argumenty):
+            Adresar = argumenty[i + 1]
+            i += 2
+        else:
+            Soubory.append(arg)
+            i += 1
+
+    if not Soubory:
+        print("Chabička se vloudila: Chybí soubor se zdrojovým kódem.")
+        sys.exit(1)
+
+    if Adresar:
+        os.makedirs(Adresar, exist_ok=True)
+
+    for Soubor in Soubory:
+        Cil = cesta_artefaktu(Soubor, Adresar)
+        Cil, Sestaveno = sestav_soubor(Soubor, Cil)
+        print(f"{'Sestaveno' if Sestaveno else 'Aktuální'}: {Cil}")
+
+def prikaz_kompiluj(argumenty):
+    from zmije.kompilace import INVALIDACE, zkompiluj
+
+    Cesty = []
+    Procesy = 1
+    Invalidace = None
+    Vynutit = False
+    Tise = False
+    LimitCasu = None
+    LimitPameti = None
+
+    i = 0
+    while i < len(argumenty):
+        arg = argumenty[i]
+        if arg == "-j" and i + 1 < len(argumenty):
+            Procesy = int(argumenty[i + 1])
+            i += 2
+        elif arg == "--cas" and i + 1 < len(argumenty):
+            LimitCasu = float(argumenty[i + 1])
+            i += 2
+        elif arg == "--pamet" and i + 1 < len(argumenty):
+            LimitPameti = int(float(argumenty[i + 1]) * 1024 * 1024)
+            i += 2
+        elif arg == "--invalidace" and i + 1 < len(argumenty):
+            if argumenty[i + 1] not in INVALIDACE:
+                print(f"Chabička se vloudila: Neznámý druh invalidace '{argumenty[i + 1]}'.")
+                sys.exit(1)
+            Invalidace = INVALIDACE[argumenty[i + 1]]
+            i += 2
+        elif arg == "-f":
+            Vynutit = True
+            i += 1
+        elif arg == "-q":
+            Tise = True
+            i += 1
+        else:
+            Cesty.append(arg)
+            i += 1
+
+    if not Cesty:
+        print("Chabička se vloudila: Chybí soubor nebo adresář se zdrojovým kódem.")
+        sys.exit(1)
+
+    try:
+        Vysledky = zkompiluj(Cesty, Procesy, Invalidace, Vynutit, LimitCasu, LimitPameti)
+    except ValueError as e:
+        print(f"Chabička se vloudila: {e}")
+        sys.exit(1)
+    Chyby = 0
+    for Vysledek in Vysledky:
+        if Vysledek.chyba:
+            print(f"Chabička se vloudila: {Vysledek.chyba}")
+            Chyby += 1
+        elif Vysledek.zkompilovano and not Tise:
+            print(f"Zkompilováno: {Vysledek.cil}")
+    if not Tise:
+        Zkompilovano = sum(Vysledek.zkompilovano for Vysledek in Vysledky)
+        print(f"Zkompilováno {Zkompilovano}, aktuálních {len(Vysledky) - Zkompilovano - Chyby}, chyb {Chyby}.")
+    if Chyby:
+        sys.exit(1)
+
+def prikaz_spust(argumenty):
+    from zmije.artefakt import spust_artefakt
+
+    if not argumenty:
+        print("Chabička se vloudila: Chybí soubor s artefaktem.")
+        sys.exit(1)
+
+    spust_artefakt(argumenty[0], argumenty[1:])
+
+def prikaz_zabal(argumenty):
+    from zmije.zabal import zabal
+
+    Adresar = None
+    Cil = None
+    Hlavni = None
+    Interpret = None
+
+    i = 0
+    while i < len(argumenty):
+        arg = argumenty[i]
+        if arg == "-o" and i + 1 < len(argumenty):
+            Cil = argumenty[i + 1]
+            i += 2
+        elif arg == "-m" and i + 1 < len(argumenty):
+            Hlavni = argumenty[i + 1]
+            i += 2
+        elif arg == "-p" and i + 1 < len(argumenty):
+            Interpret = argumenty[i + 1]
+            i += 2
+        else:
+            Adresar = arg
+            i += 1
+
+    if not Adresar:
+        print("Chabička se vloudila: Chybí adresář s balíčkem.")
+        sys.exit(1)
+
+    Cil = Cil or Adresar.rstrip("/\\") + ".pyz"
+    try:
+        zabal(Adresar, Cil, Hlavni, Interpret)
+    except ValueError as Chyba:
+        print(f"Chabička se vloudila: {Chyba}")
+        sys.exit(1)
+    print(f"Archiv byl uložen do {Cil}.")
+
+def prikaz_slovnik(argumenty):
+    from zmije.slovniky import PRIPONA, ChybaSlovniku, sestav_soubor
+
+    Cil = None
+    Zdroj = None
+
+    i = 0
+    while i < len(argumenty):
+        arg = argumenty[i]
+        if arg == "-o" and i + 1 < len(argumenty):
+            Cil = argumenty[i + 1]
+            i += 2
+        else:
+            Zdroj = arg
+            i += 1
+
+    if not Zdroj:
+        print("Chabička se vloudila: Chybí soubor se slovníkem.")
+        sys.exit(1)
+
+    Cil = Cil or os.path.splitext(Zdroj)[0] + PRIPONA
+    try:
+        sestav_soubor(Zdroj, Cil)
+    except ChybaSlovniku as Chyba:
+        print(f"Chabička se vloudila: {Chyba}")
+        sys.exit(1)
+    print(f"Slovník byl uložen do {Cil}.")
+
+def prikaz_projekt(argumenty):
+    from zmije.kompilace import INVALIDACE
+    from zmije.projekt import sestav_projekt
+
+    Koren = "."
+    Procesy = 1
+    SouborGrafu = None
+    Invalidace = None
+    Vynutit = False
+    Tise = False
+
+    i = 0
+    while i < len(argumenty):
+        arg = argumenty[i]
+        if arg == "-j" and i + 1 < len(argumenty):
+            Procesy = int(argumenty[i + 1])
+            i += 2
+        elif arg == "--graf" and i + 1 < len(argumenty):
+            SouborGrafu = argumenty[i + 1]
+            i += 2
+        elif arg == "--invalidace" and i + 1 < len(argumenty):
+            if argumenty[i + 1] not in INVALIDACE:
+                print(f"Chabička se vloudila: Neznámý druh invalidace '{argumenty[i + 1]}'.")
+                sys.exit(1)
+            Invalidace = INVALIDACE[argumenty[i + 1]]
+            i += 2
+        elif arg == "-f":
+            Vynutit = True
+            i += 1
+        elif arg == "-q":
+            Tise = True
+            i += 1
+        else:
+            Koren = arg
+            i += 1
+
+    if not os.path.isdir(Koren):
+        print(f"Chabička se vloudila: Adresář {Koren} neexistuje.")
+        sys.exit(1)
+
+    Souhrn = sestav_projekt(Koren, Procesy, SouborGrafu, Invalidace, Vynutit)
+    for Chyba in Souhrn.chyby:
+        print(f"Chabička se vloudila: {Chyba}")
+    if not Tise:
+        for Modul in Souhrn.sestaveno:
+            print(f"Sestaveno: {Modul}")
+        for Modul in Souhrn.zkontrolovano:
+            print(f"Zkontrolováno: {Modul}")
+        print(
+            f"Sestaveno {len(Souhrn.sestaveno)}, zkontrolováno {len(Souhrn.zkontrolovano)}, "
+            f"aktuálních {len(Souhrn.aktualni)}, chyb {len(Souhrn.chyby)}."
+        )
+        if Souhrn.kriticka_cesta:
+            print(f"Kritická cesta: {' -> '.join(Souhrn.kriticka_cesta)}")
+    if Souhrn.chyby:
+        sys.exit(1)
+
+def prikaz_server(argumenty):
+    from zmije.server import spust_server, vychozi_socket
+
+    Cesta = None
+    Procesy = None
+    Limity = {}
+    Moduly = None
+
+    i = 0
+    while i < len(argumenty):
+        arg = argumenty[i]
+        if arg == "--socket" and i + 1 < len(argumenty):
+            Cesta = argumenty[i + 1]
+            i += 2
+        elif arg == "-j" and i + 1 < len(argumenty):
+            Procesy = int(argumenty[i + 1])
+            i += 2
+        elif arg in ("--cpu", "--cas") and i + 1 < len(argumenty):
+            Limity[arg[2:]] = float(argumenty[i + 1]) if arg == "--cas" else int(argumenty[i + 1])
+            i += 2
+        elif arg in ("--pamet", "--soubor", "--vystup") and i + 1 < len(argumenty):
+            Limity[arg[2:]] = int(float(argumenty[i + 1]) * 1024 * 1024)
+            i += 2
+        elif arg == "--predehrat" and i + 1 < len(argumenty):
+            Moduly = tuple(Modul for Modul in argumenty[i + 1].split(",") if Modul)
+            i += 2
+        else:
+            print(f"Chabička se vloudila: Neznámý argument '{arg}'.")
+            sys.exit(1)
+
+    Cesta = Cesta or vychozi_socket()
+
+    def Pripraveno():
+        print(f"Server naslouchá na {Cesta}.", flush=True)
+
+    Volby = {"moduly": Moduly} if Moduly is not None else {}
+    spust_server(Cesta, Procesy, Limity, pripraveno=Pripraveno, **Volby)
+
+def prikaz_klient(argumenty):
+    from zmije.server import spust_na_serveru
+
+    Cesta = None
+    Soubor = None
+    Limity = {}
+
+    i = 0
+    while i < len(argumenty) and Soubor is None:
+        arg = argumenty[i]
+        if arg == "--socket" and i + 1 < len(argumenty):
+            Cesta = argumenty[i + 1]
+            i += 2
+        elif arg in ("--cpu", "--cas") and i + 1 < len(argumenty):
+            Limity[arg[2:]] = float(argumenty[i + 1]) if arg == "--cas" else int(argumenty[i + 1])
+            i += 2
+        else:
+            Soubor = arg
+            i += 1
+
+    if not Soubor:
+        print("Chabička se vloudila: Chybí soubor se zdrojovým kódem.")
+        sys.exit(1)
+
+    with open(Soubor, "rb") as f:
+        Zdroj = f.read()
+    Vstup = b"" if sys.stdin is None or sys.stdin.isatty() else sys.stdin.buffer.read()
+    Vysledek = spust_na_serveru(Zdroj, Cesta, Soubor, argumenty[i:], Vstup, Limity)
+
+    sys.stdout.buffer.write(Vysledek.vystup)
+    sys.stdout.flush()
+    sys.stderr.buffer.write(Vysledek.chybovy_vystup)
+    if Vysledek.chyba:
+        sys.stderr.write(f"Chabička se vloudila: {Vysledek.chyba}\n")
+    sys.stderr.flush()
+    if Vysledek.navratovy_kod is None:
+        sys.exit(1)
+    sys.exit(Vysledek.navratovy_kod if Vysledek.navratovy_kod >= 0 else 128 - Vysledek.navratovy_kod)
+
+PRIKAZY = {
+    "klient": prikaz_klient,
+    "kompiluj": prikaz_kompiluj,
+    "mezipamet": prikaz_mezipamet,
+    "sestav": prikaz_sestav,
+    "projekt": prikaz_projekt,
+    "server": prikaz_server,
+    "slovnik": prikaz_slovnik,
+    "spust": prikaz_spust,
+    "zabal": prikaz_zabal,
+}
+
 def hlavni():
-    
+
+    # Volba platí pro všechny příkazy, proto se vyjme dřív, než se argumenty
+    # rozeberou; metriky se zapíšou i při ukončení chybou.
+    SouborMetrik = os.environ.get("ZMIJE_METRIKY")
+    if "--metriky" in sys.argv[1:-1]:
+        i = sys.argv.index("--metriky")
+        SouborMetrik = sys.argv[i + 1]
+        del sys.argv[i:i + 2]
+    if SouborMetrik:
+        from zmije import metriky
+
+        atexit.register(metriky.uloz, SouborMetrik)
+
+    # Slovníky se předávají i procesům -j přes ZMIJE_SLOVNIKY.
+    while "--slovnik" in sys.argv[1:-1]:
+        from zmije.main import SLOVNIKY, zaregistruj_slovnik
+
+        i = sys.argv.index("--slovnik")
+        SouborSlovniku = sys.argv[i + 1]
+        del sys.argv[i:i + 2]
+        if not any(Slovnik.cesta == os.path.abspath(SouborSlovniku) for Slovnik in SLOVNIKY):
+            zaregistruj_slovnik(SouborSlovniku)
+            os.environ["ZMIJE_SLOVNIKY"] = os.pathsep.join(
+                filter(None, [os.environ.get("ZMIJE_SLOVNIKY"), SouborSlovniku])
+            )
+
+    if len(sys.argv) > 1 and sys.argv[1] in PRIKAZY:
+        PRIKAZY[sys.argv[1]](sys.argv[2:])
+        return
+
     if len(sys.argv) == 2 and sys.argv[1] == "--pomoc":
         print("""
 Užití: zmije [command] [options]
 Příkazy:
     (žádný příkaz)    Spustí tlumočník pro převod kódu
     Argumenty:
-        SOUBOR        Cesta k souboru se zdrojovým kódem
+        SOUBOR        Cesta k souboru se zdrojovým kódem; bez něj se
+                      spustí interaktivní konzole, "-" čte standardní vstup
     Možnosti:
-        -o <soubor>   Uloží výstup do zadaného souboru
+        -o <soubor>   Uloží výstup do zadaného souboru, "-" zapisuje na
+                      standardní výstup; se "-" na vstupu či výstupu a
+                      u souborů nad 16 MB se přepisuje proudově po blocích;
+                      výstup se zapisuje atomicky a beze změny obsahu se
+                      nepřepisuje, razítko vedle něj přeskočí nezměněný zdroj
+        --znovu       Přetlumočí zdroj, i když razítko hlásí aktuální výstup
+        -j <počet>    Přepisuje velký soubor po blocích v zadaném počtu procesů
+        --upravy      Místo kódu vypíše jen seznam úprav, jednu na řádek
+                      jako JSON pole [řádek, sloupec, původní, nové]
+        --mezipamet <soubor>
+                      Sdílí výsledky přes mezipaměť SQLite (také proměnná
+                      prostředí ZMIJE_MEZIPAMET); na síťovém disku se
+                      místo WAL použije klasický žurnál, režim lze vynutit
+                      proměnnou ZMIJE_MEZIPAMET_ZURNAL (wal, delete, ...)
+        --metriky <soubor>
+                      Při skončení zapíše počítadla ve formátu Prometheus
+                      (také proměnná prostředí ZMIJE_METRIKY); platí
+                      i pro ostatní příkazy
+        --slovnik <soubor>
+                      Načte externí slovník klíčových slov (JSON nebo
+                      předkompilovaný .zsl), lze opakovat; také proměnná
+                      prostředí ZMIJE_SLOVNIKY se seznamem cest
+
+    mezipamet         Zobrazí nebo vyčistí sdílenou mezipaměť
+    Argumenty:
+        statistika    Vypíše počet a velikost záznamů (výchozí)
+        vycisti       Smaže všechny záznamy
+        zmensi <MB>   Vyřadí nejdéle nepoužité záznamy nad zadanou velikost
+    Možnosti:
+        --soubor <soubor>
+                      Cesta k souboru mezipaměti
+
+    kompiluj          Zapíše bajtkód modulů .zm do __pycache__, odkud ho
+                      načte importní hák bez transpilace
+    Argumenty:
+        CESTA...      Zdrojové soubory .zm nebo adresáře, které se projdou
+    Možnosti:
+        -j <počet>    Počet procesů, 0 znamená všechna jádra
+        --invalidace <druh>
+                      timestamp, checked-hash nebo unchecked-hash (výchozí
+                      timestamp, s SOURCE_DATE_EPOCH checked-hash)
+        -f            Zkompiluje i moduly s aktuálním bajtkódem
+        -q            Vypíše jen chyby
+        --cas <s>     Limit času překladu jednoho souboru (pouze Unix)
+        --pamet <MB>  Kolik paměti smí překlad jednoho souboru přidat
+                      k adresnímu prostoru procesu (pouze Unix)
+
+    sestav            Předkompiluje moduly do artefaktů .zmc
+    Argumenty:
+        SOUBOR...     Cesty ke zdrojovým souborům .zm
+    Možnosti:
+        -d <adresář>  Uloží artefakty do zadaného adresáře místo vedle zdroje
+
+    projekt           Sestaví projekt .zm podle grafu dovozů: moduly
+                      přetlumočí, zkompiluje do __pycache__ a zkontroluje
+                      názvy v "od ... dovézt"; znovu sestaví jen změněné
+                      moduly a zkontroluje jen moduly, které je dovážejí
+    Argumenty:
+        ADRESÁŘ       Kořen projektu (výchozí aktuální adresář)
+    Možnosti:
+        -j <počet>    Počet procesů, 0 znamená všechna jádra
+        --graf <soubor>
+                      Kam uložit graf mezi běhy (výchozí
+                      ADRESÁŘ/.zmije-projekt.json)
+        --invalidace <druh>
+                      Druh invalidace .pyc jako u příkazu kompiluj
+        -f            Sestaví všechny moduly znovu
+        -q            Vypíše jen chyby
+
+    server            Spustí server, který předem načte Zmiji a pro každý
+                      skript se jen rozvětví (pouze Unix)
+    Možnosti:
+        --socket <cesta>
+                      Unixový soket (výchozí $ZMIJE_SERVER, jinak
+                      $XDG_RUNTIME_DIR/zmije-UID.sock)
+        -j <počet>    Nejvyšší počet současně běžících skriptů
+        --cpu <s>     Limit procesorového času skriptu (výchozí 10)
+        --cas <s>     Limit času běhu skriptu (výchozí 30)
+        --pamet <MB>  Limit adresního prostoru skriptu (výchozí 512)
+        --soubor <MB> Limit velikosti souboru, který skript zapíše
+        --vystup <MB> Kolik výstupu skriptu se vrátí (výchozí 1)
+        --predehrat <modul,...>
+                      Moduly, které se načtou předem místo výchozích
+
+    klient            Spustí skript na serveru a vypíše jeho výstup
+    Argumenty:
+        SOUBOR        Cesta ke skriptu, za ní argumenty programu;
+                      standardní vstup se předá skriptu
+    Možnosti:
+        --socket <cesta>
+                      Unixový soket serveru
+        --cpu <s>, --cas <s>
+                      Přísnější limity pro tento skript
+
+    slovnik           Předkompiluje slovník JSON do tabulky .zsl
+    Argumenty:
+        SOUBOR        Cesta ke slovníku JSON
+    Možnosti:
+        -o <soubor>   Cesta k tabulce (výchozí SOUBOR s příponou .zsl)
+
+    spust             Spustí artefakt .zmc bez transpilace
+    Argumenty:
+        SOUBOR        Cesta k artefaktu, za ní argumenty programu
+
+    zabal             Zabalí strom modulů do spustitelného archivu zip
+                      s předkompilovaným bajtkódem
+    Argumenty:
+        ADRESÁŘ       Kořen archivu s moduly .zm a .py
+    Možnosti:
+        -o <soubor>   Cesta k archivu (výchozí ADRESÁŘ.pyz)
+        -m <modul:funkce>
+                      Vstupní bod, pokud strom nemá __main__
+        -p <interpret>
+                      Přidá na začátek řádek #! s interpretem
               
     --pomoc            Zobrazí tuto nápovědu""")
         
@@ -19,6 +515,10 @@ Příkazy:
 
     SouborZdroje = None
     SouborVystupu = None
+    Procesy = 1
+    JenUpravy = False
+    Znovu = False
+    SouborMezipameti = os.environ.get("ZMIJE_MEZIPAMET")
 
     argumenty = sys.argv[1:]
     i = 0
@@ -28,28 +528,104 @@ Příkazy:
         if arg == "-o" and i + 1 < len(argumenty):
             SouborVystupu = argumenty[i + 1]
             i += 2
+        elif arg == "--upravy":
+            JenUpravy = True
+            i += 1
+        elif arg == "--znovu":
+            Znovu = True
+            i += 1
+        elif arg == "--mezipamet" and i + 1 < len(argumenty):
+            SouborMezipameti = argumenty[i + 1]
+            i += 2
+        elif arg == "-j" and i + 1 < len(argumenty):
+            Procesy = int(argumenty[i + 1])
+            i += 2
         else:
             SouborZdroje = arg
             i += 1
 
     if not SouborZdroje:
-        print("Chabička se vloudila: Chybí soubor se zdrojovým kódem.")
-        sys.exit(1)
+        if SouborVystupu or JenUpravy:
+            print("Chabička se vloudila: Chybí soubor se zdrojovým kódem.")
+            sys.exit(1)
 
-    with open(SouborZdroje, "r", encoding="utf-8") as f:
-        KodZdroje = f.read()
+        from zmije.konzole import spust_konzoli
 
-    PrepisujtecKod = transpiluj(KodZdroje)
+        spust_konzoli()
+        return
 
-    if SouborVystupu:
-        with open(SouborVystupu, "w", encoding="utf-8") as f:
-            f.write(PrepisujtecKod)
-    
-        print(f"Přetlumočený kód byl uložen do {SouborVystupu}.")
+    Razitko = bool(SouborVystupu) and SouborVystupu != "-" and SouborZdroje != "-" and not JenUpravy
+    if Razitko:
+        from zmije.razitko import je_aktualni, otisk_dat, otisk_souboru, stav_souboru, uloz_razitko
+
+        if not Znovu and je_aktualni(SouborZdroje, SouborVystupu):
+            print(f"Výstup {SouborVystupu} je aktuální.")
+            return
+        # Stav se bere před čtením zdroje, aby razítko nespojilo otisk
+        # jednoho obsahu se stavem souboru změněného během tlumočení.
+        StavZdroje = stav_souboru(SouborZdroje)
 
+    Proudove = not JenUpravy and not SouborMezipameti and (
+        SouborZdroje == "-" or SouborVystupu == "-" or
+        (Procesy == 1 and os.path.getsize(SouborZdroje) >= VELIKOST_PRO_PROUD)
+    )
+
+    if Proudove:
+        from zmije.main import prepis_proud
+        from zmije.proud import cti_zdroj, zapis_proud
+
+        if Razitko:
+            OtiskZdroje = otisk_souboru(SouborZdroje)
+        Kodovani, Radky = cti_zdroj(SouborZdroje)
+        Zmeneno = zapis_proud(prepis_proud(Radky), SouborVystupu or "-", Kodovani)
+        if Razitko:
+            uloz_razitko(SouborZdroje, SouborVystupu, OtiskZdroje, StavZdroje)
+        if SouborVystupu and SouborVystupu != "-":
+            print(f"Přetlumočený kód byl uložen do {SouborVystupu}." if Zmeneno else f"Výstup {SouborVystupu} se nezměnil.")
+        return
+
+    from zmije.main import dekoduj_zdroj, kodovani_zdroje
+    from zmije.proud import cti_bajty
+
+    # Zdroj se čte jako bajty a dekóduje podle PEP 263 (deklarace kódování
+    # nebo BOM); přetlumočený kód se zapisuje ve stejném kódování.
+    DataZdroje = cti_bajty(SouborZdroje)
+    if Razitko:
+        OtiskZdroje = otisk_dat(DataZdroje)
+
+    if JenUpravy:
+        KodZdroje, _ = dekoduj_zdroj(DataZdroje)
+        Kodovani = "utf-8"
+        PrepisujtecKod = "\n".join(
+            json.dumps(list(Uprava), ensure_ascii=False) for Uprava in seznam_uprav(KodZdroje)
+        ).encode("utf-8")
+    elif SouborMezipameti:
+        from zmije.mezipamet import SqliteMezipamet, transpiluj_s_mezipameti
+
+        KodZdroje, Kodovani = dekoduj_zdroj(DataZdroje)
+        with SqliteMezipamet(SouborMezipameti) as Mezipamet:
+            PrepisujtecKod = transpiluj_s_mezipameti(KodZdroje, Mezipamet).encode(Kodovani)
     else:
-        print(PrepisujtecKod)
+        Kodovani = kodovani_zdroje(DataZdroje)
+        PrepisujtecKod = transpiluj(DataZdroje, procesy=Procesy)
+    del DataZdroje
 
+    if SouborVystupu == "-":
+        sys.stdout.flush()
+        sys.stdout.buffer.write(PrepisujtecKod)
+        sys.stdout.buffer.flush()
+
+    elif SouborVystupu:
+        from zmije.razitko import zapis_atomicky
+
+        Zmeneno = zapis_atomicky(SouborVystupu, PrepisujtecKod)
+        if Razitko:
+            uloz_razitko(SouborZdroje, SouborVystupu, OtiskZdroje, StavZdroje)
+    
+        print(f"Přetlumočený kód byl uložen do {SouborVystupu}." if Zmeneno else f"Výstup {SouborVystupu} se nezměnil.")
+
+    else:
+        print(PrepisujtecKod.decode(Kodovani))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,190 @@
+import _imp
+import hashlib
+import importlib.abc
+import importlib.util
+import marshal
+import os
+import py_compile
+import struct
+import sys
+import types
+from collections import namedtuple
+
+from zmije.main import dekoduj_zdroj, otisk_prepisu, transpiluj
+
+# Formát .zmc: pevná hlavička a za ní bajtkód uložený modulem marshal.
+#   4 B  magie "ZMC\0"
+#   2 B  verze formátu (little endian)
+#   4 B  magické číslo Pythonu, pro který je bajtkód určen
+#  32 B  SHA-256 zdrojového kódu
+#  32 B  otisk tabulky klíčových slov
+MAGIE = b"ZMC\0"
+VERZE_FORMATU = 1
+HLAVICKA = struct.Struct("<4sH4s32s32s")
+PRIPONA = ".zmc"
+
+Hlavicka = namedtuple("Hlavicka", ["verze", "magie_pythonu", "otisk_zdroje", "otisk_slov"])
+
+class ChybaArtefaktu(ValueError):
+    pass
+
+def otisk_zdroje(zdroj):
+    if isinstance(zdroj, str):
+        zdroj = zdroj.encode("utf-8", "surrogatepass")
+    return hashlib.sha256(zdroj).digest()
+
+def sestav_artefakt(kod, nazev_souboru="<zmije>"):
+    # Zdroj v bajtech se otiskne tak, jak leží na disku, a dekóduje se podle
+    # PEP 263 (deklarace kódování nebo BOM) jako při importu.
+    otisk = otisk_zdroje(kod)
+    if not isinstance(kod, str):
+        kod, _ = dekoduj_zdroj(kod)
+    kod_objekt = compile(transpiluj(kod), nazev_souboru, "exec", dont_inherit=True)
+    hlavicka = HLAVICKA.pack(
+        MAGIE, VERZE_FORMATU, importlib.util.MAGIC_NUMBER,
+        otisk, bytes.fromhex(otisk_prepisu()),
+    )
+    return hlavicka + marshal.dumps(kod_objekt)
+
+def precti_hlavicku(data):
+    if len(data) < HLAVICKA.size:
+        raise ChybaArtefaktu("Artefakt je kratší než jeho hlavička.")
+    magie, verze, magie_pythonu, zdroj, slova = HLAVICKA.unpack_from(data)
+    if magie != MAGIE:
+        raise ChybaArtefaktu("Soubor není artefakt Zmije (.zmc).")
+    if verze != VERZE_FORMATU:
+        raise ChybaArtefaktu(f"Nepodporovaná verze formátu artefaktu: {verze}.")
+    return Hlavicka(verze, magie_pythonu, zdroj.hex(), slova.hex())
+
+def nacti_kod(data):
+    hlavicka = precti_hlavicku(data)
+    if hlavicka.magie_pythonu != importlib.util.MAGIC_NUMBER:
+        raise ChybaArtefaktu(
+            "Artefakt byl sestaven pro jinou verzi Pythonu; sestavte jej znovu."
+        )
+    return marshal.loads(memoryview(data)[HLAVICKA.size:])
+
+def nacti_artefakt(cesta):
+    with open(cesta, "rb") as f:
+        return nacti_kod(f.read())
+
+def cesta_artefaktu(cesta_zdroje, adresar=None):
+    nazev = os.path.splitext(os.path.basename(cesta_zdroje))[0] + PRIPONA
+    return os.path.join(adresar if adresar is not None else os.path.dirname(cesta_zdroje), nazev)
+
+def je_aktualni(cesta_artefaktu_, zdroj):
+    # Artefakt platí, jen když sedí zdroj, slovník i verze Pythonu.
+    try:
+        with open(cesta_artefaktu_, "rb") as f:
+            hlavicka = precti_hlavicku(f.read(HLAVICKA.size))
+    except (OSError, ChybaArtefaktu):
+        return False
+    return (
+        hlavicka.magie_pythonu == importlib.util.MAGIC_NUMBER and
+        hlavicka.otisk_zdroje == otisk_zdroje(zdroj).hex() and
+        hlavicka.otisk_slov == otisk_prepisu()
+    )
+
+def sestav_soubor(cesta_zdroje, cil=None):
+    # Vrací cestu k artefaktu a informaci, zda byl skutečně znovu sestaven.
+    cil = cil or cesta_artefaktu(cesta_zdroje)
+    with open(cesta_zdroje, "rb") as f:
+        zdroj = f.read()
+    if je_aktualni(cil, zdroj):
+        return cil, False
+
+    data = sestav_artefakt(zdroj, os.path.abspath(cesta_zdroje))
+    docasny = f"{cil}.{os.getpid()}.tmp"
+    with open(docasny, "wb") as f:
+        f.write(data)
+    os.replace(docasny, cil)
+    return cil, True
+
+class ZmcLoader(importlib.abc.Loader):
+    # Spouští předkompilovaný modul bez zdrojového kódu a bez transpilace.
+    def __init__(self, fullname, path):
+        self.name = fullname
+        self.path = path
+
+    def create_module(self, spec):
+        return None
+
+    def exec_module(self, module):
+        module.__file__ = self.path
+        exec(nacti_artefakt(self.path), module.__dict__)
+
+    def get_filename(self, fullname):
+        return self.path
+
+def spust_artefakt(cesta, argumenty=None):
+    modul = types.ModuleType("__main__")
+    modul.__file__ = cesta
+    puvodni_hlavni = sys.modules.get("__main__")
+    puvodni_argv = sys.argv
+    sys.modules["__main__"] = modul
+    sys.argv = [cesta] + list(argumenty or [])
+    try:
+        exec(nacti_artefakt(cesta), modul.__dict__)
+    finally:
+        sys.argv = puvodni_argv
+        if puvodni_hlavni is not None:
+            sys.modules["__main__"] = puvodni_hlavni
+    return modul
+
+def sestav_pyc(kod_objekt, zdroj, invalidace=py_compile.PycInvalidationMode.TIMESTAMP, mtime=0):
+    # Stejné rozložení jako soubory .pyc z py_compile (PEP 552): magie,
+    # příznaky a buď čas a velikost zdroje, nebo jeho hash.
+    if invalidace == py_compile.PycInvalidationMode.TIMESTAMP:
+        hlavicka = struct.pack("<4sIII", importlib.util.MAGIC_NUMBER, 0, int(mtime) & 0xFFFFFFFF, len(zdroj) & 0xFFFFFFFF)
+    else:
+        priznaky = 0b01 | (0b10 if invalidace == py_compile.PycInvalidationMode.CHECKED_HASH else 0)
+        hlavicka = struct.pack("<4sI8s", importlib.util.MAGIC_NUMBER, priznaky, importlib.util.source_hash(zdroj))
+    return hlavicka + marshal.dumps(kod_objekt)
+
+def cesta_pyc(cesta_zdroje):
+    # Soubor v __pycache__ jako u modulů Pythonu. Štítek s otiskem přepisu
+    # odliší bajtkód sestavený s jinou tabulkou klíčových slov či slovníky,
+    # protože hlavička .pyc hlídá jen zdroj.
+    return importlib.util.cache_from_source(cesta_zdroje, optimization="zm" + otisk_prepisu()[:16])
+
+def druh_invalidace(data):
+    if len(data) < 16 or data[:4] != importlib.util.MAGIC_NUMBER:
+        return None
+    priznaky = int.from_bytes(data[4:8], "little")
+    if priznaky == 0:
+        return py_compile.PycInvalidationMode.TIMESTAMP
+    if priznaky == 0b01:
+        return py_compile.PycInvalidationMode.UNCHECKED_HASH
+    if priznaky == 0b11:
+        return py_compile.PycInvalidationMode.CHECKED_HASH
+    return None
+
+def pyc_je_aktualni(data, cesta_zdroje, zdroj=None, kontrola=None):
+    # Stejná pravidla jako import .pyc (PEP 552) včetně volby
+    # --check-hash-based-pycs; zdroj se čte jen tehdy, když je potřeba hash.
+    # kontrola="always" porovná hash i u nekontrolovaných .pyc: kompilátor
+    # musí poznat změněný zdroj bez ohledu na to, co pak dělá import.
+    invalidace = druh_invalidace(data)
+    if invalidace is None:
+        return False
+    if invalidace == py_compile.PycInvalidationMode.TIMESTAMP:
+        stat = os.stat(cesta_zdroje)
+        return data[8:16] == struct.pack("<II", int(stat.st_mtime) & 0xFFFFFFFF, stat.st_size & 0xFFFFFFFF)
+    kontrola = kontrola or _imp.check_hash_based_pycs
+    if kontrola == "never" or (kontrola == "default" and invalidace == py_compile.PycInvalidationMode.UNCHECKED_HASH):
+        return True
+    if zdroj is None:
+        with open(cesta_zdroje, "rb") as f:
+            zdroj = f.read()
+    return data[8:16] == importlib.util.source_hash(zdroj)
+
+def nacti_pyc(cesta_zdroje):
+    # Kód z aktuálního .pyc v __pycache__, jinak None.
+    try:
+        with open(cesta_pyc(cesta_zdroje), "rb") as f:
+            data = f.read()
+        if pyc_je_aktualni(data, cesta_zdroje):
+            return marshal.loads(memoryview(data)[16:])
+    except (OSError, ValueError, EOFError, TypeError):
+        pass
+    return None
@@ -0,0 +1,202 @@
+import importlib.abc
+import importlib.machinery
+import importlib.util
+import os
+import sys
+import zipfile
+import zipimport
+
+from zmije.artefakt import PRIPONA as PRIPONA_ARTEFAKTU, ZmcLoader, nacti_kod, nacti_pyc
+from zmije.main import transpiluj
+
+PRIPONA = ".zm"
+
+# Balíky, jejichž moduly se načítají líně (importlib.util.LazyLoader):
+# dovoz vytvoří jen prázdný modul a přetlumočí a spustí ho až první přístup
+# k atributu. Týká se balíku i všech jeho podmodulů; dovoz podmodulu ale
+# balík načte, protože potřebuje jeho __path__. "od M dovézt X" modul načte
+# hned, takže se hodí hlavně "dovézt M" a přístup přes M.X až při použití.
+LINE_BALIKY = set()
+
+def line_nacitani(*baliky):
+    LINE_BALIKY.update(baliky)
+
+def bez_lineho_nacitani(*baliky):
+    # Bez argumentů vypne líné načítání úplně.
+    if baliky:
+        LINE_BALIKY.difference_update(baliky)
+    else:
+        LINE_BALIKY.clear()
+
+def je_liny(nazev):
+    return any(nazev == balik or nazev.startswith(balik + ".") for balik in LINE_BALIKY)
+
+def liny(loader):
+    # Nenačtený modul má za loader LazyLoader; po prvním přístupu je loader
+    # zase původní.
+    return importlib.util.LazyLoader(loader) if je_liny(loader.name) else loader
+
+class ZmijeLoader(importlib.abc.InspectLoader):
+    # Načítá modul ze zdroje .zm na disku nebo uvnitř archivu zip.
+    def __init__(self, fullname, path, archiv=None, clen=None):
+        self.name = fullname
+        self.path = path
+        self.archiv = archiv
+        self.clen = clen
+
+    def create_module(self, spec):
+        return None
+
+    def exec_module(self, module):
+        if self.archiv is None:
+            # Stav zdroje před načtením; podle něj zmije.obnova pozná, že se
+            # soubor od importu změnil.
+            stat = os.stat(self.path)
+            self.stav_zdroje = (stat.st_size, stat.st_mtime_ns)
+        exec(self.get_code(module.__name__), module.__dict__)
+
+    def get_filename(self, fullname):
+        return self.path
+
+    def get_data(self, path):
+        if self.archiv is not None and path == self.path:
+            with zipfile.ZipFile(self.archiv) as archiv:
+                return archiv.read(self.clen)
+        with open(path, "rb") as f:
+            return f.read()
+
+    def is_package(self, fullname):
+        return os.path.splitext(os.path.basename(self.path))[0] == "__init__"
+
+    def get_source(self, fullname):
+        return importlib.util.decode_source(self.get_data(self.path))
+
+    def source_to_code(self, data, path="<zmije>"):
+        if isinstance(data, bytes):
+            data = importlib.util.decode_source(data)
+        return compile(transpiluj(data), path, "exec", dont_inherit=True)
+
+    def get_code(self, fullname):
+        # Bajtkód z `zmije kompiluj` má přednost, pokud je aktuální.
+        if self.archiv is None:
+            kod = nacti_pyc(self.path)
+            if kod is not None:
+                return kod
+        return self.source_to_code(self.get_source(fullname), self.path)
+
+def nacitac_zdroje(fullname, path):
+    return liny(ZmijeLoader(fullname, path))
+
+def nacitac_artefaktu(fullname, path):
+    return liny(ZmcLoader(fullname, path))
+
+class ZipZmcLoader(ZmcLoader):
+    def __init__(self, fullname, path, archiv, clen):
+        super().__init__(fullname, path)
+        self.archiv = archiv
+        self.clen = clen
+
+    def exec_module(self, module):
+        with zipfile.ZipFile(self.archiv) as archiv:
+            kod = nacti_kod(archiv.read(self.clen))
+        exec(kod, module.__dict__)
+
+def nacitace():
+    # Stejné pořadí jako výchozí FileFinder; moduly Pythonu mají přednost.
+    return [
+        (importlib.machinery.ExtensionFileLoader, importlib.machinery.EXTENSION_SUFFIXES),
+        (importlib.machinery.SourceFileLoader, importlib.machinery.SOURCE_SUFFIXES),
+        (importlib.machinery.SourcelessFileLoader, importlib.machinery.BYTECODE_SUFFIXES),
+        (nacitac_zdroje, [PRIPONA]),
+        (nacitac_artefaktu, [PRIPONA_ARTEFAKTU]),
+    ]
+
+HAK_ADRESARU = importlib.machinery.FileFinder.path_hook(*nacitace())
+
+def rozdel_cestu_do_zipu(cesta):
+    # "/a/b.zip/balik/modul" -> ("/a/b.zip", "balik/modul/"), jinak None.
+    archiv = cesta
+    vnitrni = []
+    while archiv and not os.path.isfile(archiv):
+        archiv, cast = os.path.split(archiv)
+        if not cast:
+            return None
+        vnitrni.append(cast)
+    if not archiv or not zipfile.is_zipfile(archiv):
+        return None
+    prefix = "/".join(reversed(vnitrni))
+    return archiv, prefix + "/" if prefix else ""
+
+class ZipHledac:
+    # Hledač pro položky sys.path uvnitř archivů zip. Moduly Pythonu přenechá
+    # standardnímu zipimporteru a sám doplní jen moduly .zm a .zmc.
+    def __init__(self, cesta):
+        rozdeleni = rozdel_cestu_do_zipu(cesta)
+        if rozdeleni is None:
+            raise ImportError("Cesta nevede do archivu zip.", path=cesta)
+        self.cesta = cesta
+        self.archiv, self.prefix = rozdeleni
+        self.zipimporter = zipimport.zipimporter(cesta)
+        self.nacti_jmena()
+
+    def nacti_jmena(self):
+        with zipfile.ZipFile(self.archiv) as archiv:
+            self.jmena = frozenset(archiv.namelist())
+        # Adresáře včetně těch, které archiv nemá jako samostatné položky.
+        self.adresare = frozenset(
+            jmeno[:konec + 1] for jmeno in self.jmena for konec in range(len(jmeno)) if jmeno[konec] == "/"
+        )
+
+    def invalidate_caches(self):
+        self.nacti_jmena()
+        if hasattr(self.zipimporter, "invalidate_caches"):
+            self.zipimporter.invalidate_caches()
+
+    def spec_pythonu(self, fullname, target):
+        if hasattr(self.zipimporter, "find_spec"):
+            return self.zipimporter.find_spec(fullname, target)
+        loader = self.zipimporter.find_module(fullname)
+        return importlib.util.spec_from_loader(fullname, loader) if loader is not None else None
+
+    def find_spec(self, fullname, target=None):
+        spec = self.spec_pythonu(fullname, target)
+        if spec is not None and spec.loader is not None:
+            return spec
+
+        nazev = fullname.rpartition(".")[2]
+        clen = f"{self.prefix}{nazev}/__init__{PRIPONA}"
+        if clen in self.jmena:
+            cesta = os.path.join(self.archiv, *clen.split("/"))
+            return importlib.util.spec_from_file_location(
+                fullname, cesta, loader=liny(ZmijeLoader(fullname, cesta, self.archiv, clen)),
+                submodule_search_locations=[os.path.join(self.cesta, nazev)],
+            )
+        for pripona, trida in ((PRIPONA, ZmijeLoader), (PRIPONA_ARTEFAKTU, ZipZmcLoader)):
+            clen = self.prefix + nazev + pripona
+            if clen in self.jmena:
+                cesta = os.path.join(self.archiv, *clen.split("/"))
+                return importlib.util.spec_from_file_location(
+                    fullname, cesta, loader=liny(trida(fullname, cesta, self.archiv, clen))
+                )
+        if spec is None and f"{self.prefix}{nazev}/" in self.adresare:
+            spec = importlib.machinery.ModuleSpec(fullname, None, is_package=True)
+            spec.submodule_search_locations = [os.path.join(self.cesta, nazev)]
+        # Část jmenného balíčku, nebo nic.
+        return spec
+
+def instaluj(line=()):
+    # line: balíky, které se mají načítat líně (viz line_nacitani).
+    line_nacitani(*line)
+    if ZipHledac not in sys.path_hooks:
+        sys.path_hooks.insert(0, ZipHledac)
+    if HAK_ADRESARU not in sys.path_hooks:
+        sys.path_hooks.insert(1, HAK_ADRESARU)
+    sys.path_importer_cache.clear()
+    importlib.invalidate_caches()
+
+def odinstaluj():
+    for hak in (ZipHledac, HAK_ADRESARU):
+        if hak in sys.path_hooks:
+            sys.path_hooks.remove(hak)
+    sys.path_importer_cache.clear()
+    importlib.invalidate_caches()
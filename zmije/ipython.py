@@ -0,0 +1,67 @@
+import hashlib
+from collections import OrderedDict
+
+from zmije.main import otisk_prepisu, ChybaValidace, transpiluj
+
+MAX_BUNEK = 1024
+
+NAZEV_BUNKY = "<zmije-buňka>"
+
+class PrevodBunek:
+    # Vstupní transformátor IPythonu. Výsledky drží podle otisku buňky, takže
+    # opakované spuštění nezměněné buňky transpilaci vůbec nevolá.
+    def __init__(self, max_bunek=MAX_BUNEK):
+        self.max_bunek = max_bunek
+        self.mezipamet = OrderedDict()
+        self.zasahy = 0
+        self.minuti = 0
+
+    def __call__(self, radky):
+        bunka = "".join(radky)
+        klic = hashlib.sha256(bunka.encode("utf-8", "surrogatepass")).hexdigest() + otisk_prepisu()
+
+        vysledek = self.mezipamet.get(klic)
+        if vysledek is not None:
+            self.mezipamet.move_to_end(klic)
+            self.zasahy += 1
+            return vysledek.splitlines(True)
+
+        self.minuti += 1
+        vysledek = self.prepis(bunka)
+        self.mezipamet[klic] = vysledek
+        if len(self.mezipamet) > self.max_bunek:
+            self.mezipamet.popitem(last=False)
+        return vysledek.splitlines(True)
+
+    def prepis(self, bunka):
+        # Validace počítá řádky až od prvního neprázdného, proto úvodní prázdné
+        # řádky odložíme a přičteme je k pozici chyby i vrátíme do výstupu.
+        telo = bunka.lstrip("\r\n\t ")
+        telo = bunka[bunka.rfind("\n", 0, len(bunka) - len(telo)) + 1:]
+        posun = bunka.count("\n", 0, len(bunka) - len(telo))
+
+        try:
+            return "\n" * posun + transpiluj(telo)
+        except ChybaValidace as e:
+            radek = e.radek + posun if e.radek is not None else None
+            text = bunka.splitlines()[radek - 1] if radek and radek <= bunka.count("\n") + 1 else None
+            sloupec = e.sloupec + 1 if e.sloupec is not None else None
+            raise SyntaxError(str(e), (NAZEV_BUNKY, radek, sloupec, text)) from None
+
+    def vycisti(self):
+        self.mezipamet.clear()
+
+def najdi_prevod(ipython):
+    for transformator in ipython.input_transformers_post:
+        if isinstance(transformator, PrevodBunek):
+            return transformator
+    return None
+
+def nacti_rozsireni(ipython):
+    if najdi_prevod(ipython) is None:
+        ipython.input_transformers_post.append(PrevodBunek())
+
+def odeber_rozsireni(ipython):
+    prevod = najdi_prevod(ipython)
+    if prevod is not None:
+        ipython.input_transformers_post.remove(prevod)
@@ -0,0 +1,157 @@
+import os
+import py_compile
+import signal
+import warnings
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+from zmije.artefakt import cesta_pyc, druh_invalidace, pyc_je_aktualni, sestav_pyc
+from zmije.dovoz import PRIPONA
+from zmije.main import dekoduj_zdroj, transpiluj
+from zmije.razitko import zapis_atomicky
+
+# Obdoba compileall pro stromy Zmije: ze zdrojů .zm zapíše bajtkód do
+# __pycache__ (viz artefakt.cesta_pyc), odkud ho načte importní hák
+# z zmije.dovoz bez transpilace. Soubory se překládají paralelně a ty,
+# jejichž .pyc je aktuální a má požadovaný druh invalidace, se přeskočí.
+INVALIDACE = {
+    "timestamp": py_compile.PycInvalidationMode.TIMESTAMP,
+    "checked-hash": py_compile.PycInvalidationMode.CHECKED_HASH,
+    "unchecked-hash": py_compile.PycInvalidationMode.UNCHECKED_HASH,
+}
+
+Vysledek = namedtuple("Vysledek", ["zdroj", "cil", "zkompilovano", "chyba"])
+
+class VyprselCas(Exception):
+    pass
+
+def adresni_prostor():
+    # Velikost adresního prostoru procesu v bajtech, nebo 0, kde ji nejde
+    # zjistit (mimo Linux je pak limit paměti absolutní).
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[0]) * resource.getpagesize()
+    except (OSError, ValueError):
+        return 0
+
+@contextmanager
+def limity_souboru(cas=None, pamet=None):
+    # Limity pro překlad jednoho souboru, aby jeden záludný vstup nezdržel
+    # dávku (pouze Unix). cas v sekundách hlídá SIGALRM, a proto jen
+    # v hlavním vlákně; signál se obslouží mezi instrukcemi bajtkódu, takže
+    # dlouhé volání v C se přeruší až po návratu. pamet v bajtech se přidá
+    # k současnému adresnímu prostoru jako RLIMIT_AS a překročení skončí
+    # výjimkou MemoryError. Po souboru se vše vrátí.
+    if not cas and not pamet:
+        yield
+        return
+
+    def vyprselo(cislo, ramec):
+        raise VyprselCas()
+
+    puvodni_signal = signal.signal(signal.SIGALRM, vyprselo) if cas else None
+    puvodni_limit = resource.getrlimit(resource.RLIMIT_AS) if pamet else None
+    try:
+        if pamet:
+            mekky, tvrdy = adresni_prostor() + pamet, puvodni_limit[1]
+            # Přísnější limit, který proces už má, zůstává.
+            if puvodni_limit[0] != resource.RLIM_INFINITY:
+                mekky = min(mekky, puvodni_limit[0])
+            resource.setrlimit(resource.RLIMIT_AS, (mekky, tvrdy))
+        if cas:
+            signal.setitimer(signal.ITIMER_REAL, cas)
+        yield
+    finally:
+        # Signál, který dorazil těsně před zastavením časovače, může vyhodit
+        # výjimku ještě tady; obnova proto běží ve vnořeném finally.
+        try:
+            if cas:
+                signal.setitimer(signal.ITIMER_REAL, 0)
+        finally:
+            if cas:
+                signal.signal(signal.SIGALRM, puvodni_signal)
+            if pamet:
+                resource.setrlimit(resource.RLIMIT_AS, puvodni_limit)
+
+def vychozi_invalidace():
+    # Jako py_compile: reprodukovatelné sestavení (SOURCE_DATE_EPOCH)
+    # nesmí do bajtkódu zapsat čas změny zdroje.
+    if os.environ.get("SOURCE_DATE_EPOCH"):
+        return py_compile.PycInvalidationMode.CHECKED_HASH
+    return py_compile.PycInvalidationMode.TIMESTAMP
+
+def najdi_zdroje(cesty):
+    # Moduly .zm v zadaných souborech a adresářích; modul, který má vedle
+    # sebe stejnojmenný .py, by v __pycache__ kolidoval a importuje se .py.
+    for cesta in cesty:
+        if not os.path.isdir(cesta):
+            yield cesta
+            continue
+        for koren, adresare, soubory in os.walk(cesta):
+            adresare[:] = sorted(d for d in adresare if d != "__pycache__" and not d.startswith("."))
+            for soubor in sorted(soubory):
+                zaklad, pripona = os.path.splitext(soubor)
+                if pripona == PRIPONA and zaklad + ".py" not in soubory:
+                    yield os.path.join(koren, soubor)
+
+def zapis_pyc(cesta, data, prelozeny, invalidace):
+    # prelozeny je přetlumočený kód jako text nebo strom ast; data jsou
+    # bajty zdroje, ze kterých se počítá hash v hlavičce.
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", SyntaxWarning)
+        kod = compile(prelozeny, cesta, "exec", dont_inherit=True)
+    mtime = os.stat(cesta).st_mtime if invalidace == py_compile.PycInvalidationMode.TIMESTAMP else 0
+    cil = cesta_pyc(cesta)
+    os.makedirs(os.path.dirname(cil), exist_ok=True)
+    zapis_atomicky(cil, sestav_pyc(kod, data, invalidace, mtime))
+    return cil
+
+def zkompiluj_soubor(cesta, invalidace=None, vynutit=False, limit_casu=None, limit_pameti=None):
+    invalidace = invalidace or vychozi_invalidace()
+    cil = cesta_pyc(cesta)
+    try:
+        with open(cesta, "rb") as f:
+            data = f.read()
+        if not vynutit:
+            try:
+                with open(cil, "rb") as f:
+                    hlavicka = f.read(16)
+                if druh_invalidace(hlavicka) == invalidace and pyc_je_aktualni(hlavicka, cesta, data, kontrola="always"):
+                    return Vysledek(cesta, cil, False, None)
+            except OSError:
+                pass
+
+        with limity_souboru(limit_casu, limit_pameti):
+            zapis_pyc(cesta, data, transpiluj(dekoduj_zdroj(data)[0]), invalidace)
+        return Vysledek(cesta, cil, True, None)
+    except VyprselCas:
+        return Vysledek(cesta, cil, False, f"{cesta}: Překročen časový limit {limit_casu:g} s.")
+    except MemoryError:
+        return Vysledek(cesta, cil, False, f"{cesta}: Překročen limit paměti {limit_pameti / 1024 / 1024:g} MB.")
+    except (OSError, ValueError, SyntaxError) as e:
+        return Vysledek(cesta, cil, False, f"{cesta}: {e}")
+
+def zkompiluj_jeden(argumenty):
+    return zkompiluj_soubor(*argumenty)
+
+def zkompiluj(cesty, procesy=1, invalidace=None, vynutit=False, limit_casu=None, limit_pameti=None):
+    # Vrací Vysledek pro každý nalezený zdroj ve stejném pořadí.
+    # procesy=0 použije všechna jádra. Limity platí pro každý soubor
+    # zvlášť (viz limity_souboru); soubor, který je překročí, skončí chybou
+    # a dávka pokračuje dalším.
+    if (limit_casu or limit_pameti) and resource is None:
+        raise ValueError("Limity souborů jsou dostupné jen na Unixu.")
+    invalidace = invalidace or vychozi_invalidace()
+    zdroje = list(najdi_zdroje(cesty))
+    procesy = procesy or os.cpu_count() or 1
+    ulohy = [(zdroj, invalidace, vynutit, limit_casu, limit_pameti) for zdroj in zdroje]
+    if procesy > 1 and len(zdroje) > 1:
+        with ProcessPoolExecutor(max_workers=min(procesy, len(zdroje))) as fond:
+            return list(fond.map(zkompiluj_jeden, ulohy, chunksize=max(len(ulohy) // (procesy * 4), 1)))
+    return [zkompiluj_jeden(uloha) for uloha in ulohy]
@@ -0,0 +1,56 @@
+import code
+import sys
+import tokenize
+
+from zmije.main import SkenerRadku, prepis_kod
+
+class ZmijeKonzole(code.InteractiveConsole):
+    # Interaktivní konzole. Fyzické řádky se skládají do logického řádku podle
+    # stavu skeneru (závorky, řetězce, zpětné lomítko) a každý logický řádek se
+    # transpiluje jen jednou; na rozpracovaný blok se už hotové řádky znovu
+    # nepřepisují, dál je skládá a kompiluje samotná konzole Pythonu.
+    def __init__(self, locals=None, filename="<zmije>"):
+        super().__init__(locals, filename)
+        self.vynuluj()
+
+    def vynuluj(self):
+        self.skener = SkenerRadku()
+        self.logicky_radek = []
+
+    def resetbuffer(self):
+        super().resetbuffer()
+        self.vynuluj()
+
+    def push(self, line):
+        self.logicky_radek.append(line)
+        self.skener.zpracuj(line + "\n")
+        if not self.skener.uzavreno:
+            return True
+
+        zdroj = "\n".join(self.logicky_radek) + "\n"
+        self.logicky_radek = []
+        try:
+            prepsany = prepis_kod(zdroj)
+        except (ValueError, SyntaxError, tokenize.TokenError) as e:
+            self.write(f"Chyba: {e}\n")
+            self.resetbuffer()
+            return False
+
+        vic = False
+        for radek in prepsany.splitlines() or [""]:
+            vic = super().push(radek)
+        return vic
+
+def spust_konzoli(locals=None):
+    try:
+        import readline  # noqa: F401
+    except ImportError:
+        pass
+
+    konzole = ZmijeKonzole(locals)
+    # Zahřátí: první volání zkompiluje regulární výrazy tokenizeru.
+    prepis_kod("Pravda\n")
+    konzole.interact(
+        banner=f"Zmije na Pythonu {sys.version.split()[0]}. Konec pomocí Ctrl-D.",
+        exitmsg="",
+    )
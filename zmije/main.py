@@ -1,222 +1,857 @@
+import codecs
+import hashlib
 import io
+import os
+import pickle
+import re
 import tokenize
 import keyword
+import warnings
+from collections import deque, namedtuple
+from itertools import islice
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 
+from zmije import metriky
 from zmije.internal.data import KEYWORD_MAP
+from zmije.slovniky import Slovnik
 
 NEJEDNOZNACNA_KLICOVA_SLOVA = {("a",)}
 
-def prepis_tokeny(tokeny):
-    vyrovnavaci_pamet = []
-    vystup = []
-    hloubka_zavorek = 0
-    po_def = False
-    v_def_zavorkach = False
-    po_tecce = False
-
-    for tok in tokeny:
-        if tok.type == tokenize.NAME and tok.string == "def":
-            po_def = True
-            v_def_zavorkach = False
-        
+# Předpočítané tabulky jsou neměnné, takže je mohou sdílet všechna vlákna
+# bez zámků a transpiluj() nemá žádný sdílený měnitelný stav.
+NEJEDNOZNACNA_KLICOVA_SLOVA_MALA = tuple(
+    tuple(k.lower() for k in klicove_slovo) for klicove_slovo in NEJEDNOZNACNA_KLICOVA_SLOVA
+)
+
+KLICOVA_SLOVA_PODLE_DELKY = tuple(
+    (tuple(k.lower() for k in sekvence), KEYWORD_MAP[sekvence])
+    for sekvence in sorted(KEYWORD_MAP.keys(), key=len, reverse=True)
+)
+
+PYTHON_KLICOVA_SLOVA = frozenset(keyword.kwlist)
+
+CESKA_KLICOVA_SLOVA = frozenset(
+    klic[0] if isinstance(klic, tuple) else klic for klic in KEYWORD_MAP.keys()
+)
+
+ANGLICKA_KLICOVA_SLOVA = frozenset(KEYWORD_MAP.values())
+
+VESTAVENE_NAZVY = frozenset(dir(__builtins__))
+
+# Otisk tabulky klíčových slov; výsledky uložené v mezipaměti s jiným
+# otiskem vznikly s jiným slovníkem a nesmí se použít.
+OTISK_KLICOVYCH_SLOV = hashlib.sha256(
+    repr((KLICOVA_SLOVA_PODLE_DELKY, NEJEDNOZNACNA_KLICOVA_SLOVA_MALA)).encode("utf-8")
+).hexdigest()
+
+class ChybaValidace(ValueError):
+    # Nese pozici (stejnou jako ve zprávě) a název porušeného pravidla,
+    # aby nástroje nemusely rozebírat text zprávy.
+    def __init__(self, zprava, radek=None, sloupec=None, pravidlo=None):
+        super().__init__(zprava)
+        self.radek = radek
+        self.sloupec = sloupec
+        self.pravidlo = pravidlo
+
+# Index klíčových slov podle posledního slova sekvence. Pořadí kandidátů
+# zachovává KLICOVA_SLOVA_PODLE_DELKY, takže vyhrává nejdelší shoda.
+INDEX_KLICOVYCH_SLOV = {}
+for _sekvence, _nahrada in KLICOVA_SLOVA_PODLE_DELKY:
+    INDEX_KLICOVYCH_SLOV.setdefault(_sekvence[-1], []).append((_sekvence, _nahrada))
+INDEX_KLICOVYCH_SLOV = {slovo: tuple(kandidati) for slovo, kandidati in INDEX_KLICOVYCH_SLOV.items()}
+del _sekvence, _nahrada
+
+# Externí slovníky (zmije.slovniky) v pořadí načtení. Při shodné délce
+# sekvence má přednost vestavěný slovník, pak dřív načtený externí.
+SLOVNIKY = []
+
+class Pruchod:
+    # Přepisovací průchod pro spust_pruchody(). Deklaruje typy tokenů (a
+    # případně jejich řetězce), na které reaguje, a kolik tokenů dopředu
+    # potřebuje vidět. zpracuj() dostane okno, kde okno[0] je aktuální token,
+    # a vrátí počet spotřebovaných tokenů; 0 znamená, že token nechává dalším
+    # průchodům. Výstup smí měnit jen na konci. dokonci() se volá jednou po
+    # posledním tokenu, např. pro předání počítadel do zmije.metriky.
+    nazev = None
+    verze = 1
+    typy = ()
+    retezce = None
+    vyhled = 0
+
+    def novy_stav(self):
+        return None
+
+    def zpracuj(self, stav, okno, vystup):
+        return 0
+
+    def dokonci(self, stav):
+        pass
+
+class StavKlicovychSlov:
+    __slots__ = ("hloubka_zavorek", "po_def", "v_def_zavorkach", "po_tecce", "nahrady")
+
+    def __init__(self):
+        self.hloubka_zavorek = 0
+        self.po_def = False
+        self.v_def_zavorkach = False
+        self.po_tecce = False
+        self.nahrady = {}
+
+class PruchodKlicovychSlov(Pruchod):
+    # Místo samostatné vyrovnávací paměti se díváme zpět na souvislý běh
+    # tokenů NAME na konci výstupu, nejvýše na délku nejdelšího klíčového slova.
+    nazev = "klicova_slova"
+    typy = (tokenize.NAME, tokenize.OP)
+
+    def __init__(self, index=INDEX_KLICOVYCH_SLOV, nejednoznacna=NEJEDNOZNACNA_KLICOVA_SLOVA_MALA, slovniky=SLOVNIKY):
+        self.index = index
+        self.nejednoznacna = nejednoznacna
+        self.slovniky = slovniky
+        self.max_delka = max(
+            [len(sekvence) for kandidati in index.values() for sekvence, _ in kandidati] +
+            [len(sekvence) for sekvence in nejednoznacna] + [1]
+        )
+
+    def novy_stav(self):
+        return StavKlicovychSlov()
+
+    def zpracuj(self, stav, okno, vystup):
+        tok = okno[0]
+
         if tok.type == tokenize.OP:
             if tok.string == "(":
-                if po_def:
-                    v_def_zavorkach = True
-                hloubka_zavorek += 1
+                if stav.po_def:
+                    stav.v_def_zavorkach = True
+                stav.hloubka_zavorek += 1
             elif tok.string == ")":
-                hloubka_zavorek -= 1
-                if hloubka_zavorek == 0 and po_def:
-                    v_def_zavorkach = False
-                    po_def = False
+                stav.hloubka_zavorek -= 1
+                if stav.hloubka_zavorek == 0 and stav.po_def:
+                    stav.v_def_zavorkach = False
+                    stav.po_def = False
             elif tok.string == ".":
-                po_tecce = True
+                stav.po_tecce = True
             elif tok.string not in (",", " "):
-                po_tecce = False
-        
-        if tok.type == tokenize.NAME:
-            vyrovnavaci_pamet.append(tok)
-            
-            mel_nahradit = True
-            
-            if v_def_zavorkach:
-                mel_nahradit = False
-            
-            if po_tecce:
-                mel_nahradit = False
-                po_tecce = False
-            
-            if mel_nahradit:
-                for klicove_slovo in NEJEDNOZNACNA_KLICOVA_SLOVA:
-                    if len(vyrovnavaci_pamet) >= len(klicove_slovo) and [t.string.lower() for t in vyrovnavaci_pamet[-len(klicove_slovo):]] == [k.lower() for k in klicove_slovo]:
-                        mel_nahradit = False
-                        break
-            
-            if mel_nahradit:
-                for sekvence in sorted(KEYWORD_MAP.keys(), key=len, reverse=True):
-                    if len(vyrovnavaci_pamet) >= len(sekvence):
-                        okno = vyrovnavaci_pamet[-len(sekvence):]
-                        if [t.string.lower() for t in okno] == [k.lower() for k in sekvence]:
-                            nahrady = KEYWORD_MAP[sekvence]
-                            novy = okno[0]._replace(string=nahrady)
-                            vyrovnavaci_pamet = vyrovnavaci_pamet[:-len(sekvence)] + [novy]
-                            break
-            continue
+                stav.po_tecce = False
+            return 0
+
+        if tok.string == "def":
+            stav.po_def = True
+            stav.v_def_zavorkach = False
 
-        while vyrovnavaci_pamet:
-            vystup.append(vyrovnavaci_pamet.pop(0))
         vystup.append(tok)
 
-    while vyrovnavaci_pamet:
-        vystup.append(vyrovnavaci_pamet.pop(0))
-    
-    return vystup
+        mel_nahradit = not stav.v_def_zavorkach
+        if stav.po_tecce:
+            mel_nahradit = False
+            stav.po_tecce = False
+        if not mel_nahradit:
+            return 1
 
-def nahrad_oddelovac_desetinnych(tokeny):
-    vystup = []
-    i = 0
-    while i < len(tokeny):
-        tok = tokeny[i]
-        
-        if tok.type == tokenize.NUMBER and i + 2 < len(tokeny):
-            dalsi_tok = tokeny[i + 1]
-            dalsi_dalsi_tok = tokeny[i + 2]
-            
-            if (dalsi_tok.type == tokenize.OP and dalsi_tok.string == "," and
+        slovniky = self.slovniky
+        max_delka = self.max_delka
+        if slovniky:
+            max_delka = max([max_delka] + [slovnik.nejdelsi_sekvence() for slovnik in slovniky])
+
+        beh = 1
+        while beh < max_delka and beh < len(vystup) and vystup[-beh - 1].type == tokenize.NAME:
+            beh += 1
+        slova = tuple(t.string.lower() for t in vystup[-beh:])
+
+        for klicove_slovo in self.nejednoznacna:
+            if len(klicove_slovo) <= beh and slova[-len(klicove_slovo):] == klicove_slovo:
+                return 1
+
+        kandidati = self.index.get(slova[-1], ())
+        if slovniky:
+            doplnky = [kandidat for slovnik in slovniky for kandidat in slovnik.kandidati(slova[-1])]
+            if doplnky:
+                kandidati = sorted(kandidati + tuple(doplnky), key=lambda kandidat: -len(kandidat[0]))
+
+        for sekvence, nahrada in kandidati:
+            if len(sekvence) <= beh and slova[-len(sekvence):] == sekvence:
+                novy = vystup[-len(sekvence)]._replace(string=nahrada)
+                del vystup[-len(sekvence):]
+                vystup.append(novy)
+                stav.nahrady[sekvence] = stav.nahrady.get(sekvence, 0) + 1
+                break
+        return 1
+
+    def dokonci(self, stav):
+        metriky.pridej_podle(
+            "zmije_klicova_slova_celkem", "klicove_slovo",
+            {" ".join(sekvence): pocet for sekvence, pocet in stav.nahrady.items()},
+        )
+
+class PruchodDesetinneCarky(Pruchod):
+    nazev = "desetinna_carka"
+    typy = (tokenize.NUMBER,)
+    vyhled = 2
+
+    def zpracuj(self, stav, okno, vystup):
+        if len(okno) < 3:
+            return 0
+        tok, dalsi_tok, dalsi_dalsi_tok = okno[0], okno[1], okno[2]
+        if (dalsi_tok.type == tokenize.OP and dalsi_tok.string == "," and
                 dalsi_dalsi_tok.type == tokenize.NUMBER):
-                
-                kombinovany_retezec = tok.string + "." + dalsi_dalsi_tok.string
-                novy_tok = tok._replace(string=kombinovany_retezec)
-                vystup.append(novy_tok)
-                i += 3
-                continue
-        
-        vystup.append(tok)
-        i += 1
-    
-    return vystup
+            vystup.append(tok._replace(string=tok.string + "." + dalsi_dalsi_tok.string))
+            return 3
+        return 0
 
-def nahrad_oddelovace_seznamu(tokeny):
+class PruchodOddelovaceSeznamu(Pruchod):
+    nazev = "oddelovac_seznamu"
+    typy = (tokenize.OP,)
+    retezce = frozenset([";"])
+
+    def zpracuj(self, stav, okno, vystup):
+        vystup.append(okno[0]._replace(string=","))
+        return 1
+
+PRUCHOD_KLICOVYCH_SLOV = PruchodKlicovychSlov()
+PRUCHOD_DESETINNE_CARKY = PruchodDesetinneCarky()
+PRUCHOD_ODDELOVACE_SEZNAMU = PruchodOddelovaceSeznamu()
+
+# Registr průchodů v pořadí, v jakém dostávají token. Rozšíření dialektu
+# přidávají své průchody přes zaregistruj_pruchod(), nikoli dalším během.
+REGISTR_PRUCHODU = [PRUCHOD_KLICOVYCH_SLOV, PRUCHOD_DESETINNE_CARKY, PRUCHOD_ODDELOVACE_SEZNAMU]
+
+def zaregistruj_pruchod(pruchod, index=None):
+    if pruchod.nazev is None:
+        raise ValueError("Průchod musí mít název.")
+    if any(p.nazev == pruchod.nazev for p in REGISTR_PRUCHODU):
+        raise ValueError(f"Průchod '{pruchod.nazev}' už je zaregistrovaný.")
+    REGISTR_PRUCHODU.insert(len(REGISTR_PRUCHODU) if index is None else index, pruchod)
+
+def odregistruj_pruchod(nazev):
+    REGISTR_PRUCHODU[:] = [p for p in REGISTR_PRUCHODU if p.nazev != nazev]
+
+def zaregistruj_slovnik(cesta, mezipamet=None):
+    # Slovník se jen zaeviduje; tabulka se sestaví nebo namapuje až při
+    # prvním dotazu. mezipamet je adresář pro sestavené tabulky .zsl.
+    slovnik = Slovnik(cesta, mezipamet)
+    if any(s.cesta == slovnik.cesta for s in SLOVNIKY):
+        raise ValueError(f"Slovník '{cesta}' už je zaregistrovaný.")
+    SLOVNIKY.append(slovnik)
+    return slovnik
+
+def odregistruj_slovnik(cesta):
+    cesta = os.path.abspath(cesta)
+    SLOVNIKY[:] = [s for s in SLOVNIKY if s.cesta != cesta]
+
+def je_slovo_slovniku(slovo):
+    # Začíná slovo některou sekvenci z externích slovníků?
+    slovo = slovo.lower()
+    return any(slovnik.je_prvni_slovo(slovo) for slovnik in SLOVNIKY)
+
+# Slovníky z proměnné prostředí platí i v procesech, které si spustí
+# prepis_paralelne() nebo sestavení balíčku.
+for _cesta in os.environ.get("ZMIJE_SLOVNIKY", "").split(os.pathsep):
+    if _cesta and not any(s.cesta == os.path.abspath(_cesta) for s in SLOVNIKY):
+        zaregistruj_slovnik(_cesta)
+
+def otisk_prepisu(pruchody=None):
+    # Otisk slovníku, externích slovníků i sady průchodů; výsledky uložené
+    # s jiným otiskem vznikly s jinými pravidly a nesmí se použít.
+    pruchody = REGISTR_PRUCHODU if pruchody is None else pruchody
+    popis = (
+        OTISK_KLICOVYCH_SLOV +
+        "".join(f"|slovnik:{s.otisk_slovniku()}" for s in SLOVNIKY) +
+        "".join(f"|{p.nazev}:{p.verze}" for p in pruchody)
+    )
+    return hashlib.sha256(popis.encode("utf-8")).hexdigest()
+
+def spust_pruchody(tokeny, pruchody=None):
+    # Jediný běh přes tokeny se sdíleným oknem dopředu pro všechny průchody.
+    pruchody = tuple(REGISTR_PRUCHODU if pruchody is None else pruchody)
+    vyhled = max([p.vyhled for p in pruchody] + [0])
+
+    podle_typu = {}
+    stavy = []
+    for pruchod in pruchody:
+        stav = pruchod.novy_stav()
+        stavy.append(stav)
+        for typ in pruchod.typy:
+            podle_typu.setdefault(typ, []).append((pruchod, pruchod.retezce, stav))
+
+    zdroj = iter(tokeny)
+    okno = deque(islice(zdroj, vyhled + 1))
     vystup = []
-    for tok in tokeny:
-        if tok.type == tokenize.OP and tok.string == ";":
-            novy_tok = tok._replace(string=",")
-            vystup.append(novy_tok)
-        else:
+    tokenu = 0
+
+    while okno:
+        tok = okno[0]
+        spotrebovano = 0
+        for pruchod, retezce, stav in podle_typu.get(tok.type, ()):
+            if retezce is None or tok.string in retezce:
+                spotrebovano = pruchod.zpracuj(stav, okno, vystup)
+                if spotrebovano:
+                    break
+        if not spotrebovano:
             vystup.append(tok)
-    
+            spotrebovano = 1
+        tokenu += spotrebovano
+        for _ in range(spotrebovano):
+            okno.popleft()
+            dalsi = next(zdroj, None)
+            if dalsi is not None:
+                okno.append(dalsi)
+
+    for pruchod, stav in zip(pruchody, stavy):
+        pruchod.dokonci(stav)
+    metriky.pridej("zmije_tokeny_celkem", tokenu)
     return vystup
 
+def prepis_tokeny(tokeny):
+    return spust_pruchody(tokeny, (PRUCHOD_KLICOVYCH_SLOV,))
+
+def nahrad_oddelovac_desetinnych(tokeny):
+    return spust_pruchody(tokeny, (PRUCHOD_DESETINNE_CARKY,))
+
+def nahrad_oddelovace_seznamu(tokeny):
+    return spust_pruchody(tokeny, (PRUCHOD_ODDELOVACE_SEZNAMU,))
+
+def radky_textu(kod, zacatek=0, konec=None, normalizovat=False):
+    # Řádky úseku řetězce jako io.StringIO(kod).readline, ale bez kopie
+    # celého textu (StringIO drží 4 bajty na znak). České uvozovky umí
+    # nahradit po řádcích; náhrada je znak za znak, pozice se nemění.
+    konec = len(kod) if konec is None else konec
+    while zacatek < konec:
+        konec_radku = kod.find("\n", zacatek, konec)
+        konec_radku = konec if konec_radku == -1 else konec_radku + 1
+        radek = kod[zacatek:konec_radku]
+        yield radek.replace('„', '"').replace('‟', '"') if normalizovat else radek
+        zacatek = konec_radku
+
+def ctecka_radku(kod, zacatek=0, konec=None, normalizovat=False):
+    radky = radky_textu(kod, zacatek, konec, normalizovat)
+    return lambda: next(radky, "")
+
+def meze_bez_okraju(kod):
+    # Meze, které by ponechalo kod.strip(), bez vytváření kopie.
+    zacatek = 0
+    konec = len(kod)
+    while zacatek < konec and kod[zacatek].isspace():
+        zacatek += 1
+    while konec > zacatek and kod[konec - 1].isspace():
+        konec -= 1
+    return zacatek, konec
+
 def validuj_promenne_velkymi_pismeny(kod):
-    python_klicova_slova = set(keyword.kwlist)
-    
-    ceska_klicova_slova = set()
-    for klic in KEYWORD_MAP.keys():
-        if isinstance(klic, tuple):
-            ceska_klicova_slova.add(klic[0])
-        else:
-            ceska_klicova_slova.add(klic)
+    # Tokeny se procházejí jednou a bez seznamu, s oknem tří tokenů. Pořadí
+    # hlášení zůstává: nejdřív chyba tokenizace kdekoli v kódu, pak první
+    # číslo před názvem a teprve potom první proměnná s malým písmenem.
+    python_klicova_slova = PYTHON_KLICOVA_SLOVA
+    ceska_klicova_slova = CESKA_KLICOVA_SLOVA
+    vstavene_nazvy = VESTAVENE_NAZVY
+    slovniky = SLOVNIKY
     
-    vstavene_nazvy = set(dir(__builtins__) if isinstance(__builtins__, dict) else dir(__builtins__))
-    
-    kod_normalizovany = kod.replace('„', '"').replace('‟', '"')
-    kod_normalizovany = kod_normalizovany.strip()
+    zacatek, konec = meze_bez_okraju(kod)
     
+    chyba_cisla = None
+    chyba_promenne = None
+    predchozi = None
+    tok = None
     try:
-        tokeny = list(tokenize.generate_tokens(io.StringIO(kod_normalizovany).readline))
+        for dalsi_tok in tokenize.generate_tokens(ctecka_radku(kod, zacatek, konec, normalizovat=True)):
+            if tok is not None:
+                if (chyba_cisla is None and
+                    tok.type == tokenize.NUMBER and dalsi_tok.type == tokenize.NAME and
+                    dalsi_tok.string.lower() not in ceska_klicova_slova and
+                    dalsi_tok.string not in python_klicova_slova and
+                    not (slovniky and je_slovo_slovniku(dalsi_tok.string))):
+                    chyba_cisla = ChybaValidace(
+                        f"Neplatný kód: nelze mít číselný literál bezprostředně následovaný jiným názvem proměnné "
+                        f"na řádku {dalsi_tok.start[0]}, sloupci {dalsi_tok.start[1]}",
+                        dalsi_tok.start[0], dalsi_tok.start[1], "cislo_pred_nazvem"
+                    )
+                
+                if (chyba_promenne is None and
+                    tok.type == tokenize.NAME and
+                    dalsi_tok.type == tokenize.OP and
+                    dalsi_tok.string == "="):
+                    
+                    je_atribut = predchozi is not None and predchozi.type == tokenize.OP and predchozi.string == "."
+                    
+                    nazev_promenne = tok.string
+                    if (not je_atribut and
+                        nazev_promenne not in python_klicova_slova and
+                        nazev_promenne not in ceska_klicova_slova and
+                        nazev_promenne not in vstavene_nazvy and
+                        nazev_promenne and
+                        not nazev_promenne[0].isupper() and
+                        not (slovniky and je_slovo_slovniku(nazev_promenne))):
+                        chyba_promenne = ChybaValidace(
+                            f"Proměnná '{nazev_promenne}' musí začínat velkým písmenem na řádku {tok.start[0]}, sloupci {tok.start[1]}",
+                            tok.start[0], tok.start[1], "velke_pismeno"
+                        )
+            
+            predchozi = tok
+            tok = dalsi_tok
     except tokenize.TokenError as e:
-        raise ValueError(f"Neplatný kód: {e}")
+        pozice = e.args[1] if len(e.args) > 1 else (None, None)
+        raise ChybaValidace(f"Neplatný kód: {e}", pozice[0], pozice[1], "tokenizace")
     
-    i = 0
-    while i < len(tokeny) - 1:
-        tok = tokeny[i]
-        dalsi_tok = tokeny[i + 1]
-        
-        if (tok.type == tokenize.NUMBER and dalsi_tok.type == tokenize.NAME and
-            dalsi_tok.string.lower() not in ceska_klicova_slova and
-            dalsi_tok.string not in python_klicova_slova):
-            raise ValueError(
-                f"Neplatný kód: nelze mít číselný literál bezprostředně následovaný jiným názvem proměnné "
-                f"na řádku {dalsi_tok.start[0]}, sloupci {dalsi_tok.start[1]}"
-            )
-        
-        i += 1
-    
-    i = 0
-    while i < len(tokeny):
-        tok = tokeny[i]
-        
-        if (tok.type == tokenize.NAME and 
-            i + 1 < len(tokeny) and 
-            tokeny[i + 1].type == tokenize.OP and 
-            tokeny[i + 1].string == "="):
-            
-            je_atribut = False
-            if i > 0 and tokeny[i - 1].type == tokenize.OP and tokeny[i - 1].string == ".":
-                je_atribut = True
-            
-            if je_atribut:
-                i += 1
-                continue
-            
-            nazev_promenne = tok.string
-            if (nazev_promenne not in python_klicova_slova and
-                nazev_promenne not in ceska_klicova_slova and
-                nazev_promenne not in vstavene_nazvy and
-                nazev_promenne and
-                not nazev_promenne[0].isupper()):
-                raise ValueError(
-                    f"Proměnná '{nazev_promenne}' musí začínat velkým písmenem na řádku {tok.start[0]}, sloupci {tok.start[1]}"
-                )
-        
-        i += 1
+    if chyba_cisla is not None:
+        raise chyba_cisla
+    if chyba_promenne is not None:
+        raise chyba_promenne
 
 def validuj_zadna_anglicka_klicova_slova(kod):
-    anglicka_klicova_slova = set(value for value in KEYWORD_MAP.values())
+    # Jako výše: chyba tokenizace má přednost před nalezeným slovem.
+    anglicka_klicova_slova = ANGLICKA_KLICOVA_SLOVA
     
-    kod_normalizovany = kod.replace('„', '"').replace('‟', '"')
-    tokeny = list(tokenize.generate_tokens(io.StringIO(kod_normalizovany).readline))
-    
-    for tok in tokeny:
-        if tok.type == tokenize.NAME and tok.string in anglicka_klicova_slova:
-            raise ValueError(
+    chyba = None
+    for tok in tokenize.generate_tokens(ctecka_radku(kod, normalizovat=True)):
+        if chyba is None and tok.type == tokenize.NAME and tok.string in anglicka_klicova_slova:
+            chyba = ChybaValidace(
                 f"Nalezeno anglické klíčové slovo '{tok.string}' na řádku {tok.start[0]}, sloupci {tok.start[1]}. "
                 f"Toto klíčové slovo má český překlad. Použijte českou verzi. "
-                f"Zdrojový kód by měl být psán vždy v češtině vole."
+                f"Zdrojový kód by měl být psán vždy v češtině vole.",
+                tok.start[0], tok.start[1], "anglicke_klicove_slovo"
             )
+    
+    if chyba is not None:
+        raise chyba
 
-def transpiluj(kod):
-    try:
+VZOR_RADKU = re.compile(r"""(#)|(\"\"\"|'''|"|')|([(\[{])|([)\]}])""")
+
+KONCE_RETEZCU = {
+    '"""': re.compile(r'(?:[^"\\]|\\.|"(?!""))*"""', re.S),
+    "'''": re.compile(r"(?:[^'\\]|\\.|'(?!''))*'''", re.S),
+    '"': re.compile(r'(?:[^"\\\n]|\\.)*"', re.S),
+    "'": re.compile(r"(?:[^'\\\n]|\\.)*'", re.S),
+}
+
+class SkenerRadku:
+    # Sleduje po řádcích hloubku závorek, neuzavřené řetězce a pokračování
+    # zpětným lomítkem. Nenahrazuje tokenizer, jen levně odhaduje, kde končí
+    # logický řádek; místa, kde se spletl, odhalí až samotné tokenizování.
+    def __init__(self):
+        self.hloubka = 0
+        self.otevreny_retezec = None
+        self.pokracovani = False
+
+    @property
+    def uzavreno(self):
+        return self.hloubka == 0 and self.otevreny_retezec is None and not self.pokracovani
+
+    def zpracuj(self, radek):
+        pozice = 0
+        delka = len(radek)
+        self.pokracovani = False
+
+        if self.otevreny_retezec is not None:
+            pozice = self.dokonci_retezec(radek, 0)
+            if pozice is None:
+                return
+
+        while pozice < delka:
+            shoda = VZOR_RADKU.search(radek, pozice)
+            if shoda is None:
+                break
+            if shoda.group(1):
+                return
+            if shoda.group(2):
+                self.otevreny_retezec = shoda.group(2)
+                pozice = self.dokonci_retezec(radek, shoda.end())
+                if pozice is None:
+                    return
+                continue
+            if shoda.group(3):
+                self.hloubka += 1
+            elif self.hloubka > 0:
+                self.hloubka -= 1
+            pozice = shoda.end()
+
+        self.pokracovani = radek.rstrip("\r\n").endswith("\\")
+
+    def dokonci_retezec(self, radek, pozice):
+        shoda = KONCE_RETEZCU[self.otevreny_retezec].match(radek, pozice)
+        if shoda is not None:
+            self.otevreny_retezec = None
+            return shoda.end()
+        # Jednoduchý řetězec pokračuje na dalším řádku jen za zpětným lomítkem,
+        # jinak je neukončený a chybu ohlásí až tokenizer.
+        if len(self.otevreny_retezec) == 1 and not radek.rstrip("\r\n").endswith("\\"):
+            self.otevreny_retezec = None
+        return None
+
+def rozdel_na_bloky(kod, velikost_bloku):
+    # Dělí kód jen před příkazy na nejvyšší úrovni (sloupec 0, mimo závorky
+    # a víceřádkové řetězce), kde přepisovací průchody nemají žádný stav.
+    bloky = []
+    skener = SkenerRadku()
+    zacatek_bloku = 0
+    zacatek = 0
+    delka = len(kod)
+
+    while zacatek < delka:
+        konec = kod.find("\n", zacatek)
+        konec = delka if konec == -1 else konec + 1
+
+        if (zacatek - zacatek_bloku >= velikost_bloku and skener.uzavreno and
+                kod[zacatek] not in " \t\f\r\n#"):
+            bloky.append(kod[zacatek_bloku:zacatek])
+            zacatek_bloku = zacatek
+
+        skener.zpracuj(kod[zacatek:konec])
+        zacatek = konec
+
+    bloky.append(kod[zacatek_bloku:])
+    return bloky
+
+def prepis_na_tokeny(kod):
+    validuj_promenne_velkymi_pismeny(kod)
+
+    validuj_zadna_anglicka_klicova_slova(kod)
+
+    tokeny = list(tokenize.generate_tokens(ctecka_radku(kod, normalizovat=True)))
+
+    prepisane = spust_pruchody(tokeny)
+
+    return tokeny, prepisane
+
+# Levné předběžné síto: když v kódu není žádné klíčové slovo (stačí první
+# slovo víceslovných), česká uvozovka, středník ani číslo, za kterým může
+# přes mezery a pokračování řádku následovat čárka a další číslo, nemůže
+# se uplatnit žádný přepis. Síto smí hlásit planý poplach, nikdy ne naopak.
+# Číslo se hledá jen od začátku souvislého běhu znaků [0-9A-Za-z_.] a běh se
+# pohltí bez návratu (lookahead se zpětným odkazem), jinak by vstup jako
+# "1.1.1.1…" zkoušel každou číslici zvlášť až do konce běhu, tedy
+# kvadraticky. Číslo v běhu musí začínat na hranici slova jako dřív.
+# Klíčové slovo může být přilepené k číslu ("1nebo", ".5Klasa", "0xanebo",
+# "1.e5v", "1.jv"), tokenizer je pak rozdělí na číslo a název. Takové slovo
+# se hledá v běhu znaků [\w.] od prvního místa, kde v něm začíná číslo;
+# to se najde jednou a bez návratu stejně jako u čísel, takže ani dlouhý
+# běh "1.1.1…" se neprochází od každé číslice znovu.
+KLICOVA_SLOVA_VZORU = "(?:" + "|".join(
+    re.escape(slovo) for slovo in sorted({sekvence[0] for sekvence, _ in KLICOVA_SLOVA_PODLE_DELKY}, key=lambda slovo: (-len(slovo), slovo))
+) + ")"
+VZOR_MOZNEHO_PREPISU = re.compile(
+    r"[„‟;]"
+    r"|(?<![0-9A-Za-z_.])(?=[0-9A-Za-z_.]*?(?<!\w)[0-9])(?=([0-9A-Za-z_.]*))\1[ \t\f]*(?:\\\r?\n[ \t\f]*)*,[ \t\f]*(?:\\\r?\n[ \t\f]*)*\.?[0-9]"
+    r"|(?<!\w)" + KLICOVA_SLOVA_VZORU + r"(?!\w)"
+    r"|(?<![\w.])(?=([\w.]*?(?<!\w)[0-9]))\2[\w.]*?" + KLICOVA_SLOVA_VZORU + r"(?!\w)",
+    re.IGNORECASE,
+)
+
+# Znaky, které tokenize.untokenize() nevrací beze změny (tabulátory mezi tokeny,
+# konce řádků CR, pokračování zpětným lomítkem, poslední řádek bez konce
+# řádku jen z mezer, který se zahodí). Bez nich je zpětný převod přesný.
+VZOR_NEPRESNEHO_ZPETNEHO_PREVODU = re.compile(r"[\t\f\r]|\\\n|(?:^|\n) +\Z")
+
+VESTAVENE_PRUCHODY = tuple(REGISTR_PRUCHODU)
+
+def potrebuje_prepis(kod):
+    # Předfiltr zná jen vestavěné průchody a vestavěný slovník; s vlastními
+    # průchody nebo externími slovníky jde kód vždy plnou cestou.
+    if SLOVNIKY or len(REGISTR_PRUCHODU) != len(VESTAVENE_PRUCHODY):
+        return True
+    return VZOR_MOZNEHO_PREPISU.search(kod) is not None
+
+# Větší zdroje se přepisují po blocích, aby seznamy tokenů a mezivýsledky
+# existovaly vždy jen pro jeden blok a ne pro celý vstup.
+VELIKOST_BLOKU_PAMETI = 1 << 15
+
+def prepis_overeneho(kod):
+    if potrebuje_prepis(kod):
+        tokeny = tokenize.generate_tokens(ctecka_radku(kod, normalizovat=True))
+        return tokenize.untokenize(spust_pruchody(tokeny))
+
+    if VZOR_NEPRESNEHO_ZPETNEHO_PREVODU.search(kod) is None:
+        return kod
+    return tokenize.untokenize(tokenize.generate_tokens(ctecka_radku(kod)))
+
+def prepis_po_kusech(kod):
+    # Ověří celý kód a vrátí iterátor kusů výstupu; přepisuje se až při
+    # procházení, takže volající může kusy rovnou kódovat nebo zapisovat.
+    with metriky.mereni("validace"):
+        validuj_promenne_velkymi_pismeny(kod)
+
+        validuj_zadna_anglicka_klicova_slova(kod)
+
+    if len(kod) > VELIKOST_BLOKU_PAMETI:
+        return prepis_proud(radky_textu(kod), VELIKOST_BLOKU_PAMETI, validace=False)
+    return map(prepis_overeneho, (kod,))
+
+def prepis_kod(kod):
+    kusy = prepis_po_kusech(kod)
+    with metriky.mereni("prepis"):
+        return "".join(kusy)
+
+VZOR_KONCE_RADKU = re.compile(rb"\n")
+
+def kodovani_zdroje(data):
+    # Kódování podle PEP 263 (BOM nebo deklarace v prvních dvou řádcích).
+    # Řádky se vyříznou z bufferu, takže memoryview se nekopíruje do BytesIO.
+    pozice = 0
+
+    def cti_radek():
+        nonlocal pozice
+        shoda = VZOR_KONCE_RADKU.search(data, pozice)
+        konec = len(data) if shoda is None else shoda.end()
+        radek = bytes(data[pozice:konec])
+        pozice = konec
+        return radek
+
+    return tokenize.detect_encoding(cti_radek)[0]
+
+def dekoduj_zdroj(data):
+    # Jako importlib.util.decode_source(): vrátí (text, kódování) s konci
+    # řádků převedenými na "\n". Dekóduje se přímo z bufferu bez mezikopie.
+    data = memoryview(data).cast("B")
+    kodovani = kodovani_zdroje(data)
+    dekoder = io.IncrementalNewlineDecoder(codecs.getincrementaldecoder(kodovani)(), translate=True)
+    return dekoder.decode(data, final=True), kodovani
+
+def zakoduj_kusy(kusy, kodovani):
+    # Inkrementální kodér zapíše případný BOM (utf-8-sig) jen jednou.
+    koder = codecs.getincrementalencoder(kodovani)()
+    return b"".join([koder.encode(kus) for kus in kusy] + [koder.encode("", final=True)])
+
+Uprava = namedtuple("Uprava", ["radek", "sloupec", "stary", "novy"])
+
+def seznam_uprav(kod):
+    # Vrátí jen místa, která by transpiluj() přepsal, seřazená podle pozice.
+    # Řádky se číslují od 1 a sloupce od 0 stejně jako v modulu tokenize.
+    if not potrebuje_prepis(kod):
         validuj_promenne_velkymi_pismeny(kod)
-        
         validuj_zadna_anglicka_klicova_slova(kod)
-        
-        kod_normalizovany = kod.replace('„', '"').replace('‟', '"')
-        
-        tokeny = list(tokenize.generate_tokens(io.StringIO(kod_normalizovany).readline))
-        
-        prepisane = prepis_tokeny(tokeny)
-        prepisane = nahrad_oddelovac_desetinnych(prepisane)
-        prepisane = nahrad_oddelovace_seznamu(prepisane)
-        
-        vysledek = tokenize.untokenize(prepisane)
-        
+        return []
+
+    tokeny, prepisane = prepis_na_tokeny(kod)
+    upravy = []
+
+    # Řádek a jeho začátek se počítají jen z úseku od předchozí uvozovky,
+    # aby dlouhý řádek s mnoha uvozovkami nebyl kvadratický.
+    radek = 1
+    zacatek_radku = 0
+    predchozi = 0
+    for shoda in re.finditer("[„‟]", kod):
+        pozice = shoda.start()
+        konce = kod.count("\n", predchozi, pozice)
+        if konce:
+            radek += konce
+            zacatek_radku = kod.rfind("\n", predchozi, pozice) + 1
+        predchozi = pozice
+        upravy.append(Uprava(radek, pozice - zacatek_radku, shoda.group(), '"'))
+
+    # Přepisy tokeny jen nahrazují nebo slučují s následujícími, takže přepsaný
+    # seznam je podposloupností původního a zahozené tokeny patří k předchozí úpravě.
+    indexy = []
+    i = 0
+    for tok in prepisane:
+        while tokeny[i].start != tok.start or tokeny[i].type != tok.type:
+            i += 1
+        indexy.append(i)
+        i += 1
+    indexy.append(len(tokeny))
+
+    radky = None
+    for k, tok in enumerate(prepisane):
+        prvni = tokeny[indexy[k]]
+        posledni = tokeny[indexy[k + 1] - 1]
+        if tok.string == prvni.string and prvni is posledni:
+            continue
+        (radek_od, sloupec_od), (radek_do, sloupec_do) = prvni.start, posledni.end
+        if radek_od == radek_do:
+            stary = prvni.line[sloupec_od:sloupec_do]
+        else:
+            if radky is None:
+                # Řádky jako u tokenizéru: str.splitlines() by dělil i na \f,
+                # \v, \x1c-\x1e, \x85 a \u2028/\u2029 a posunul čísla řádků.
+                radky = list(radky_textu(kod))
+            stary = "".join(radky[radek_od - 1:radek_do])
+            stary = stary[sloupec_od:len(stary) - len(radky[radek_do - 1]) + sloupec_do]
+        upravy.append(Uprava(radek_od, sloupec_od, stary, tok.string))
+
+    upravy.sort()
+    return upravy
+
+def nastav_pracovnika(pruchody, slovniky):
+    # Pracovník prepis_paralelne() převezme průchody a slovníky rodiče; při
+    # spawn či forkserver by jinak znal jen vestavěné průchody a slovníky
+    # z ZMIJE_SLOVNIKY. Vestavěné průchody přicházejí jen jako názvy.
+    vestavene = {pruchod.nazev: pruchod for pruchod in VESTAVENE_PRUCHODY}
+    REGISTR_PRUCHODU[:] = [vestavene[p] if isinstance(p, str) else p for p in pruchody]
+    SLOVNIKY[:] = [Slovnik(cesta, mezipamet) for cesta, mezipamet in slovniky]
+
+def prepis_bloku(blok):
+    # Vrací i přírůstky počítadel, které rodič přičte ke svým.
+    pred = metriky.METRIKY.snimek()
+    return prepis_kod(blok), metriky.METRIKY.rozdil(pred)
+
+def prepis_paralelne(kod, procesy, velikost_bloku=None):
+    kod_normalizovany = kod.replace('„', '"').replace('‟', '"')
+    if velikost_bloku is None:
+        velikost_bloku = max(len(kod_normalizovany) // (procesy * 4), 1 << 16)
+
+    bloky = rozdel_na_bloky(kod_normalizovany, velikost_bloku)
+    if len(bloky) < 2:
+        return prepis_kod(kod)
+
+    pruchody = [p.nazev if any(p is v for v in VESTAVENE_PRUCHODY) else p for p in REGISTR_PRUCHODU]
+    try:
+        pickle.dumps(pruchody)
+    except (pickle.PicklingError, TypeError, AttributeError):
+        # Průchod, který nejde předat pracovníkům, by tam chyběl.
+        return prepis_kod(kod)
+    slovniky = [(slovnik.cesta, slovnik.mezipamet) for slovnik in SLOVNIKY]
+
+    try:
+        with ProcessPoolExecutor(
+            max_workers=procesy, initializer=nastav_pracovnika, initargs=(pruchody, slovniky),
+        ) as fond:
+            vysledky = list(fond.map(prepis_bloku, bloky))
+    except (ValueError, SyntaxError, tokenize.TokenError, BrokenProcessPool):
+        # Chybu (i případné špatné rozdělení) necháme ohlásit sériovou cestou,
+        # aby zpráva i čísla řádků byly stejné jako bez paralelizace. Sériově
+        # doběhne i převod, když pracovník nemohl převzít průchody rodiče.
+        return prepis_kod(kod)
+    for _, prirustky in vysledky:
+        metriky.METRIKY.sluc(prirustky)
+    return "".join(vystup for vystup, _ in vysledky)
+
+# Pozice ve zprávách validace: "na řádku N" nebo "(N, S))" z TokenError.
+VZOR_POZICE_VE_ZPRAVE = re.compile(r"(na řádku |\()(\d+)(?=, )")
+
+def posun_chybu(chyba, posun):
+    # Převede čísla řádků chyby z bloku na čísla v celém souboru.
+    if isinstance(chyba, ChybaValidace):
+        if chyba.radek is None or not posun:
+            return chyba
+        zprava = VZOR_POZICE_VE_ZPRAVE.sub(lambda m: f"{m.group(1)}{int(m.group(2)) + posun}", str(chyba), count=1)
+        return ChybaValidace(zprava, chyba.radek + posun, chyba.sloupec, chyba.pravidlo)
+    if isinstance(chyba, SyntaxError) and chyba.lineno is not None:
+        chyba.lineno += posun
+    return chyba
+
+def prepis_proud(radky, velikost_bloku=1 << 20, validace=True):
+    # Přepisuje proud řádků po blocích stejně jako prepis_paralelne() a každý
+    # blok vydá hned, jak je hotový, takže v paměti je vždy nejvýš jeden blok.
+    # Chyba tokenizace může znamenat, že skener blok utnul na špatném místě,
+    # proto se takový blok zkusí znovu spojený s dalšími, než dvakrát
+    # naroste; ostatní chyby se hlásí hned s čísly řádků v celém vstupu.
+    # Bloky se validují samostatně, takže ze vstupu s více chybami se ohlásí
+    # ta v prvním chybném bloku. S validace=False musí volající celý vstup
+    # ověřit předem. Výstup se nekompiluje.
+    prepis = prepis_kod if validace else prepis_overeneho
+    skener = SkenerRadku()
+    blok = []
+    delka = 0
+    limit = velikost_bloku
+    radek_bloku = 0
+    radku = 0
+    uvodni = 0
+    chyba = None
+
+    def prepis_bloku():
+        nonlocal chyba
+        kod = "".join(blok)
+        # validuj_promenne_velkymi_pismeny čísluje řádky kódu bez úvodních
+        # prázdných řádků, ostatní kontroly čísla řádků ve vstupu.
         try:
-            compile(vysledek, '<transpiluj>', 'exec')
+            vysledek = prepis(kod)
+            if validace:
+                metriky.pridej("zmije_bajty_celkem", metriky.bajtu_utf8(kod))
+        except ChybaValidace as e:
+            posun = radek_bloku if e.pravidlo == "anglicke_klicove_slovo" else radek_bloku - uvodni
+            chyba = posun_chybu(e, posun)
+            return None if e.pravidlo == "tokenizace" else chyba
+        except tokenize.TokenError as e:
+            chyba = e
+            return None
         except SyntaxError as e:
-            print(f"Varování: Transpiliovaný kód může obsahovat chyby v syntaxi: {e}")
-            print(f"Řádek {e.lineno}: {e.text}")
-        
+            return posun_chybu(e, radek_bloku - uvodni)
+        chyba = None
         return vysledek
-    
-    except ValueError as e:
-        raise
-    except tokenize.TokenError as e:
-        print(f"Chyba: Selhalo tokenizování kódu: {e}")
-        raise
-    except Exception as e:
-        print(f"Chyba při tlumočení: {e}")
+
+    def nahlas(chyba):
+        if validace and isinstance(chyba, ChybaValidace):
+            metriky.pridej("zmije_chyby_validace_celkem", pravidlo=chyba.pravidlo)
+        return chyba
+
+    for radek in radky:
+        radek = radek.replace('„', '"').replace('‟', '"')
+        if (delka >= limit and skener.uzavreno and radek and
+                radek[0] not in " \t\f\r\n#"):
+            vysledek = prepis_bloku()
+            if isinstance(vysledek, Exception):
+                raise nahlas(vysledek)
+            if vysledek is None:
+                limit = delka * 2
+            else:
+                if radek_bloku == 0:
+                    kod = "".join(blok)
+                    uvodni = kod[:len(kod) - len(kod.lstrip())].count("\n")
+                yield vysledek
+                blok = []
+                delka = 0
+                limit = velikost_bloku
+                radek_bloku = radku
+
+        skener.zpracuj(radek)
+        blok.append(radek)
+        delka += len(radek)
+        radku += 1
+
+    if blok or radku == 0:
+        vysledek = prepis_bloku()
+        if isinstance(vysledek, Exception):
+            raise nahlas(vysledek)
+        if vysledek is None:
+            raise nahlas(chyba)
+        if validace:
+            metriky.pridej("zmije_zdroje_celkem")
+        yield vysledek
+
+def transpiluj(kod, procesy=1, velikost_bloku=None, kontrola_syntaxe=True):
+    # Funkce je reentrantní: pracuje jen s lokálními proměnnými a neměnnými
+    # tabulkami výše a nic nevypisuje; jediným sdíleným stavem jsou počítadla
+    # zmije.metriky za zámkem. Chyby propadají volajícímu, podezřelý
+    # výsledek hlásí varováním, které si volající může odchytit. Kontrola
+    # syntaxe překládá celý výstup a paměťově je nejdražší fází; kdo výstup
+    # stejně hned kompiluje, ji může vypnout.
+    #
+    # Zdroj v bytes, bytearray nebo memoryview se dekóduje podle PEP 263
+    # jako při importu a výsledek se vrátí jako bytes ve stejném kódování
+    # (včetně BOM), poskládaný z kusů bez mezilehlého řetězce celého výstupu.
+    kodovani = None
+    if not isinstance(kod, str):
+        bajtu = memoryview(kod).nbytes
+        kod, kodovani = dekoduj_zdroj(kod)
+
+    try:
+        if procesy > 1:
+            vysledek = prepis_paralelne(kod, procesy, velikost_bloku)
+            if kodovani is not None:
+                vysledek = zakoduj_kusy((vysledek,), kodovani)
+        elif kodovani is not None:
+            kusy = prepis_po_kusech(kod)
+            with metriky.mereni("prepis"):
+                vysledek = zakoduj_kusy(kusy, kodovani)
+        else:
+            vysledek = prepis_kod(kod)
+    except ChybaValidace as e:
+        metriky.pridej("zmije_chyby_validace_celkem", pravidlo=e.pravidlo)
         raise
+    metriky.pridej("zmije_zdroje_celkem")
+    metriky.pridej("zmije_bajty_celkem", metriky.bajtu_utf8(kod) if kodovani is None else bajtu)
+
+    if not kontrola_syntaxe:
+        return vysledek
+
+    try:
+        with metriky.mereni("kontrola_syntaxe"):
+            compile(vysledek, '<transpiluj>', 'exec')
+    except SyntaxError as e:
+        warnings.warn(
+            f"Transpiliovaný kód může obsahovat chyby v syntaxi: {e} (řádek {e.lineno}: {e.text})",
+            SyntaxWarning,
+            stacklevel=2,
+        )
+    
+    return vysledek
 
 if __name__ == "__main__":
     with open("example.zm", "r", encoding="utf-8") as f:
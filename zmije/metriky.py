@@ -0,0 +1,138 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# Počítadla pro celý proces ve formátu Prometheus. Zvyšují se jen na hranicích
+# volání (jednou za zdroj, blok nebo běh průchodů), nikoli za každý token,
+# takže zámek nestojí v cestě tlumočení. Pracovníci prepis_paralelne()
+# (transpilace s -j) vracejí rodiči své přírůstky (rozdil a sluc); ostatní
+# fondy procesů mají vlastní počítadla, která se do rodiče nepřenášejí.
+
+POPISY = {
+    "zmije_zdroje_celkem": ("counter", "Počet úspěšně přetlumočených zdrojů."),
+    "zmije_bajty_celkem": ("counter", "Bajty přetlumočených zdrojů v UTF-8."),
+    "zmije_tokeny_celkem": ("counter", "Tokeny, které prošly přepisovacími průchody."),
+    "zmije_faze_sekundy_celkem": ("counter", "Celkový čas strávený ve fázi převodu."),
+    "zmije_faze_volani_celkem": ("counter", "Počet běhů fáze převodu."),
+    "zmije_klicova_slova_celkem": ("counter", "Nahrazení podle položky slovníku klíčových slov."),
+    "zmije_chyby_validace_celkem": ("counter", "Zdroje odmítnuté validací podle pravidla."),
+    "zmije_mezipamet_zasahy_celkem": ("counter", "Záznamy nalezené v mezipaměti podle druhu."),
+    "zmije_mezipamet_minuti_celkem": ("counter", "Záznamy v mezipaměti nenalezené podle druhu."),
+}
+
+BEZ_STITKU = frozenset(["zmije_zdroje_celkem", "zmije_bajty_celkem", "zmije_tokeny_celkem"])
+
+def bajtu_utf8(text):
+    # Kódování celého textu by jen kvůli počítadlu zdvojilo paměť.
+    if text.isascii():
+        return len(text)
+    return sum(len(text[i:i + (1 << 16)].encode("utf-8", "surrogatepass")) for i in range(0, len(text), 1 << 16))
+
+def escapuj(hodnota):
+    return str(hodnota).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def formatuj_cislo(hodnota):
+    if isinstance(hodnota, float):
+        return repr(hodnota)
+    return str(hodnota)
+
+class Metriky:
+    def __init__(self):
+        self.zamek = threading.Lock()
+        self.hodnoty = {}
+
+    def pridej(self, nazev, hodnota=1, **stitky):
+        klic = (nazev, tuple(sorted(stitky.items())))
+        with self.zamek:
+            self.hodnoty[klic] = self.hodnoty.get(klic, 0) + hodnota
+
+    def pridej_podle(self, nazev, stitek, hodnoty):
+        # Sloučí celý slovník {hodnota štítku: přírůstek} pod jedním zámkem.
+        if not hodnoty:
+            return
+        with self.zamek:
+            for hodnota_stitku, prirustek in hodnoty.items():
+                klic = (nazev, ((stitek, hodnota_stitku),))
+                self.hodnoty[klic] = self.hodnoty.get(klic, 0) + prirustek
+
+    def hodnota(self, nazev, **stitky):
+        with self.zamek:
+            return self.hodnoty.get((nazev, tuple(sorted(stitky.items()))), 0)
+
+    def snimek(self):
+        with self.zamek:
+            return dict(self.hodnoty)
+
+    def rozdil(self, predchozi):
+        # Přírůstky od snímku predchozi, např. pro předání z pracovního procesu.
+        return {
+            klic: hodnota - predchozi.get(klic, 0)
+            for klic, hodnota in self.snimek().items() if hodnota != predchozi.get(klic, 0)
+        }
+
+    def sluc(self, prirustky):
+        with self.zamek:
+            for klic, prirustek in prirustky.items():
+                self.hodnoty[klic] = self.hodnoty.get(klic, 0) + prirustek
+
+    def vynuluj(self):
+        with self.zamek:
+            self.hodnoty.clear()
+
+    @contextmanager
+    def mereni(self, faze):
+        zacatek = time.perf_counter()
+        try:
+            yield
+        finally:
+            trvani = time.perf_counter() - zacatek
+            klic = (("faze", faze),)
+            with self.zamek:
+                for nazev, prirustek in (("zmije_faze_sekundy_celkem", trvani), ("zmije_faze_volani_celkem", 1)):
+                    self.hodnoty[(nazev, klic)] = self.hodnoty.get((nazev, klic), 0) + prirustek
+
+    def export(self):
+        # Textový formát pro expozici Prometheus (verze 0.0.4). Metriky bez
+        # štítků se vypisují i s nulou, ty se štítky až s prvním vzorkem.
+        podle_nazvu = {}
+        for (nazev, stitky), hodnota in self.snimek().items():
+            podle_nazvu.setdefault(nazev, []).append((stitky, hodnota))
+
+        radky = []
+        for nazev in sorted(set(POPISY) | set(podle_nazvu)):
+            typ, napoveda = POPISY.get(nazev, ("untyped", ""))
+            vzorky = sorted(podle_nazvu.get(nazev, ()))
+            if not vzorky:
+                if nazev not in BEZ_STITKU:
+                    continue
+                vzorky = [((), 0)]
+            radky.append(f"# HELP {nazev} {napoveda}")
+            radky.append(f"# TYPE {nazev} {typ}")
+            for stitky, hodnota in vzorky:
+                text_stitku = ",".join(f'{klic}="{escapuj(h)}"' for klic, h in stitky)
+                radky.append(f"{nazev}{{{text_stitku}}} {formatuj_cislo(hodnota)}" if stitky else f"{nazev} {formatuj_cislo(hodnota)}")
+        return "\n".join(radky) + "\n"
+
+    def uloz(self, cesta):
+        # Atomicky, aby sběrač (např. textfile collector node_exporteru)
+        # nikdy nepřečetl napůl zapsaný soubor.
+        docasny = f"{cesta}.{os.getpid()}.tmp"
+        try:
+            with open(docasny, "w", encoding="utf-8") as f:
+                f.write(self.export())
+            os.replace(docasny, cesta)
+        except BaseException:
+            if os.path.exists(docasny):
+                os.remove(docasny)
+            raise
+
+METRIKY = Metriky()
+
+pridej = METRIKY.pridej
+pridej_podle = METRIKY.pridej_podle
+hodnota = METRIKY.hodnota
+mereni = METRIKY.mereni
+export = METRIKY.export
+uloz = METRIKY.uloz
+vynuluj = METRIKY.vynuluj
@@ -0,0 +1,268 @@
+import hashlib
+import importlib.util
+import json
+import marshal
+import os
+import sqlite3
+import threading
+import time
+
+from zmije import metriky
+from zmije.main import ChybaValidace, otisk_prepisu, transpiluj, validuj_promenne_velkymi_pismeny, validuj_zadna_anglicka_klicova_slova
+
+VYCHOZI_MAX_VELIKOST = 256 * 1024 * 1024
+
+# Čas posledního použití se při čtení jen zapamatuje a zapíše najednou po
+# tolika zásazích nebo sekundách, aby čtení nebylo zápisovou transakcí.
+ZAPIS_POUZITI_PO = 64
+ZAPIS_POUZITI_PO_SEKUNDACH = 30
+
+# Celková velikost se počítá dotazem přes celou tabulku jen tehdy, když ji
+# odhad z vlastních zápisů přesáhne, a jinak jednou za tolik zápisů, aby se
+# započítaly i zápisy ostatních procesů.
+KONTROLA_VELIKOSTI_PO = 256
+
+# Souborové systémy, na kterých WAL nefunguje: potřebuje sdílenou paměť
+# (soubor -shm namapovaný všemi procesy), a tedy jediný počítač.
+SITOVE_SOUBOROVE_SYSTEMY = frozenset([
+    "nfs", "nfs4", "cifs", "smb3", "smbfs", "afs", "9p", "ceph", "glusterfs", "lustre",
+    "gpfs", "beegfs", "ncpfs", "fuse.sshfs", "fuse.glusterfs", "fuse.cephfs", "fuse.davfs2",
+])
+
+DRUHY = ("py", "validace", "kod")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS zaznamy (
+    klic TEXT NOT NULL,
+    druh TEXT NOT NULL,
+    data BLOB NOT NULL,
+    velikost INTEGER NOT NULL,
+    pouzito REAL NOT NULL,
+    PRIMARY KEY (klic, druh)
+);
+CREATE INDEX IF NOT EXISTS zaznamy_pouzito ON zaznamy (pouzito);
+"""
+
+def vychozi_cesta():
+    cesta = os.environ.get("ZMIJE_MEZIPAMET")
+    if cesta:
+        return cesta
+    koren = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(koren, "zmije", "mezipamet.sqlite")
+
+def typ_souboroveho_systemu(cesta):
+    # Typ souborového systému podle /proc/mounts, nebo None, kde ho nejde
+    # zjistit (mimo Linux). Vyhrává nejdelší přípojný bod nad cestou.
+    cesta = os.path.realpath(cesta)
+    nejlepsi = None
+    try:
+        with open("/proc/mounts", encoding="utf-8", errors="replace") as f:
+            for radek in f:
+                casti = radek.split()
+                if len(casti) < 3:
+                    continue
+                bod = casti[1].replace("\\040", " ").replace("\\011", "\t").replace("\\012", "\n").replace("\\134", "\\")
+                if (cesta == bod or cesta.startswith(bod.rstrip("/") + "/")) and (nejlepsi is None or len(bod) >= len(nejlepsi[0])):
+                    nejlepsi = (bod, casti[2])
+    except OSError:
+        return None
+    return nejlepsi[1] if nejlepsi else None
+
+def vychozi_zurnal(cesta):
+    # WAL jen na místním disku; jinde klasický žurnál se zámky souboru.
+    # Proměnná ZMIJE_MEZIPAMET_ZURNAL režim vynutí (např. "wal", "delete").
+    zurnal = os.environ.get("ZMIJE_MEZIPAMET_ZURNAL")
+    if zurnal:
+        return zurnal.upper()
+    if typ_souboroveho_systemu(os.path.dirname(os.path.abspath(cesta))) in SITOVE_SOUBOROVE_SYSTEMY:
+        return "DELETE"
+    return "WAL"
+
+def klic_zdroje(kod):
+    otisk = hashlib.sha256(kod.encode("utf-8", "surrogatepass")).hexdigest()
+    return f"{otisk}:{otisk_prepisu()}"
+
+class SqliteMezipamet:
+    # Sdílená mezipaměť v jediném souboru SQLite. Na místním disku běží
+    # v režimu WAL, kdy čtenáři neblokují zapisujícího. WAL ale potřebuje
+    # sdílenou paměť, takže na síťovém disku (NFS, SMB) nebo při sdílení
+    # souboru více počítači se použije klasický žurnál se zámky souboru,
+    # které pak musí souborový systém podporovat; viz vychozi_zurnal.
+    def __init__(self, cesta=None, max_velikost=VYCHOZI_MAX_VELIKOST, zurnal=None):
+        self.cesta = cesta or vychozi_cesta()
+        self.max_velikost = max_velikost
+        self.zamek = threading.Lock()
+
+        adresar = os.path.dirname(os.path.abspath(self.cesta))
+        os.makedirs(adresar, exist_ok=True)
+        self.zurnal = (zurnal or vychozi_zurnal(self.cesta)).upper()
+
+        self.spojeni = sqlite3.connect(self.cesta, timeout=30, isolation_level=None, check_same_thread=False)
+        self.spojeni.execute(f"PRAGMA journal_mode={self.zurnal}")
+        if self.zurnal == "WAL":
+            self.spojeni.execute("PRAGMA synchronous=NORMAL")
+        self.spojeni.executescript(SCHEMA)
+
+        # (klíč, druh) -> čas použití, který ještě není v databázi.
+        self.pouzite = {}
+        self.zasahu = 0
+        self.posledni_zapis_pouziti = time.monotonic()
+        # Odhad celkové velikosti: přesný součet při otevření a poslední
+        # kontrole plus vlastní zápisy od té doby.
+        self.odhad_velikosti = self._celkova_velikost()
+        self.zapisu_od_kontroly = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.zavri()
+
+    def zavri(self):
+        with self.zamek:
+            self._zapis_pouziti()
+            self.spojeni.close()
+
+    def nacti(self, klic, druh):
+        with self.zamek:
+            radek = self.spojeni.execute(
+                "SELECT data FROM zaznamy WHERE klic = ? AND druh = ?", (klic, druh)
+            ).fetchone()
+            if radek is not None:
+                self.pouzite[(klic, druh)] = time.time()
+                self.zasahu += 1
+                if (self.zasahu >= ZAPIS_POUZITI_PO or
+                        time.monotonic() - self.posledni_zapis_pouziti >= ZAPIS_POUZITI_PO_SEKUNDACH):
+                    self._zapis_pouziti()
+        if radek is None:
+            metriky.pridej("zmije_mezipamet_minuti_celkem", druh=druh)
+            return None
+        metriky.pridej("zmije_mezipamet_zasahy_celkem", druh=druh)
+        return bytes(radek[0])
+
+    def uloz(self, klic, druh, data):
+        with self.zamek:
+            self.spojeni.execute(
+                "INSERT OR REPLACE INTO zaznamy (klic, druh, data, velikost, pouzito) VALUES (?, ?, ?, ?, ?)",
+                (klic, druh, data, len(data), time.time()),
+            )
+            self.pouzite.pop((klic, druh), None)
+            # Přepsaný záznam se započítá dvakrát; odhad tak může jen
+            # přestřelit a vynutit přesnou kontrolu dřív.
+            self.odhad_velikosti += len(data)
+            self.zapisu_od_kontroly += 1
+            if self.odhad_velikosti > self.max_velikost or self.zapisu_od_kontroly >= KONTROLA_VELIKOSTI_PO:
+                self._vyrad(self.max_velikost)
+
+    def zmensi(self, max_velikost):
+        with self.zamek:
+            return self._vyrad(max_velikost)
+
+    def _zapis_pouziti(self):
+        if self.pouzite:
+            zaznamy = [(pouzito, klic, druh) for (klic, druh), pouzito in self.pouzite.items()]
+            self.pouzite = {}
+            self.spojeni.execute("BEGIN")
+            try:
+                self.spojeni.executemany("UPDATE zaznamy SET pouzito = ? WHERE klic = ? AND druh = ?", zaznamy)
+            except BaseException:
+                self.spojeni.execute("ROLLBACK")
+                raise
+            self.spojeni.execute("COMMIT")
+        self.zasahu = 0
+        self.posledni_zapis_pouziti = time.monotonic()
+
+    def _celkova_velikost(self):
+        return self.spojeni.execute("SELECT COALESCE(SUM(velikost), 0) FROM zaznamy").fetchone()[0]
+
+    def _vyrad(self, max_velikost):
+        # Vyřazuje nejdéle nepoužité záznamy, dokud se celek nevejde do limitu.
+        # Odložené časy použití se zapíšou předem, aby se nevyřadily
+        # záznamy, které se právě čtou.
+        self._zapis_pouziti()
+        celkem = self._celkova_velikost()
+        self.zapisu_od_kontroly = 0
+        self.odhad_velikosti = celkem
+        if celkem <= max_velikost:
+            return 0
+
+        vyrazeno = 0
+        kurzor = self.spojeni.execute("SELECT klic, druh, velikost FROM zaznamy ORDER BY pouzito")
+        ke_smazani = []
+        for klic, druh, velikost in kurzor:
+            if celkem <= max_velikost:
+                break
+            ke_smazani.append((klic, druh))
+            celkem -= velikost
+            vyrazeno += 1
+        self.spojeni.executemany("DELETE FROM zaznamy WHERE klic = ? AND druh = ?", ke_smazani)
+        self.odhad_velikosti = celkem
+        return vyrazeno
+
+    def vycisti(self):
+        with self.zamek:
+            pocet = self.spojeni.execute("DELETE FROM zaznamy").rowcount
+            self.spojeni.execute("VACUUM")
+            return pocet
+
+    def statistika(self):
+        with self.zamek:
+            druhy = {
+                druh: (pocet, velikost)
+                for druh, pocet, velikost in self.spojeni.execute(
+                    "SELECT druh, COUNT(*), SUM(velikost) FROM zaznamy GROUP BY druh"
+                )
+            }
+        return {
+            "cesta": self.cesta,
+            "max_velikost": self.max_velikost,
+            "zaznamu": sum(pocet for pocet, _ in druhy.values()),
+            "velikost": sum(velikost for _, velikost in druhy.values()),
+            "druhy": druhy,
+        }
+
+def validuj_s_mezipameti(kod, mezipamet, klic=None):
+    klic = klic or klic_zdroje(kod)
+    chyba = mezipamet.nacti(klic, "validace")
+    if chyba is None:
+        try:
+            validuj_promenne_velkymi_pismeny(kod)
+            validuj_zadna_anglicka_klicova_slova(kod)
+        except ValueError as e:
+            # Uloží se i pozice a pravidlo, aby chyba z mezipaměti byla
+            # stejná jako při novém běhu.
+            zaznam = {
+                "zprava": str(e), "radek": getattr(e, "radek", None),
+                "sloupec": getattr(e, "sloupec", None), "pravidlo": getattr(e, "pravidlo", None),
+            }
+            mezipamet.uloz(klic, "validace", json.dumps(zaznam, ensure_ascii=False).encode("utf-8"))
+            raise
+        mezipamet.uloz(klic, "validace", b"")
+    elif chyba:
+        zaznam = json.loads(chyba.decode("utf-8"))
+        raise ChybaValidace(zaznam["zprava"], zaznam["radek"], zaznam["sloupec"], zaznam["pravidlo"])
+
+def transpiluj_s_mezipameti(kod, mezipamet):
+    klic = klic_zdroje(kod)
+    data = mezipamet.nacti(klic, "py")
+    if data is not None:
+        return data.decode("utf-8")
+
+    validuj_s_mezipameti(kod, mezipamet, klic)
+    vysledek = transpiluj(kod)
+    mezipamet.uloz(klic, "py", vysledek.encode("utf-8"))
+    return vysledek
+
+def zkompiluj_s_mezipameti(kod, mezipamet, nazev_souboru="<zmije>"):
+    # Bajtkód závisí i na verzi interpretu a na jméně souboru uloženém v kódu.
+    klic = "{}:{}:{}".format(
+        klic_zdroje(kod), importlib.util.MAGIC_NUMBER.hex(),
+        hashlib.sha256(nazev_souboru.encode("utf-8", "surrogatepass")).hexdigest()[:16],
+    )
+    data = mezipamet.nacti(klic, "kod")
+    if data is not None:
+        return marshal.loads(data)
+
+    kod_objekt = compile(transpiluj_s_mezipameti(kod, mezipamet), nazev_souboru, "exec")
+    mezipamet.uloz(klic, "kod", marshal.dumps(kod_objekt))
+    return kod_objekt
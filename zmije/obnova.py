@@ -0,0 +1,189 @@
+import importlib
+import os
+import sys
+import threading
+import traceback
+from collections import namedtuple
+
+from zmije.dovoz import ZmijeLoader
+from zmije.main import dekoduj_zdroj
+from zmije.projekt import dovozy_zdroje, silne_komponenty, zavisle_moduly, zavislosti_modulu
+from zmije.razitko import otisk_souboru
+
+# Obnova změněných modulů .zm v běžícím procesu bez restartu. Změna se pozná
+# podle velikosti a času změny zdroje, potvrdí se otiskem obsahu (pouhé
+# "touch" nic neobnoví) a přetlumočí se jen změněné moduly. Obnovují se na
+# místě přes importlib.reload, takže kdo drží odkaz na modul, uvidí nový
+# obsah. Moduly, které změněný modul dovážejí, drží přes "od M dovézt X"
+# staré objekty; ve výchozím stavu se proto spustí znovu i ony, v pořadí
+# závislostí. Háky zaregistrované přes pri_obnove dostanou po každé obnově
+# Vysledek se seznamem obnovených i závislých modulů a mohou třeba zahodit
+# vlastní mezipaměti.
+#
+#   from zmije import obnova
+#   obnova.sleduj(interval=0.5)     # vlákno na pozadí
+#   obnova.obnov()                  # nebo ručně, např. na signál
+
+Vysledek = namedtuple("Vysledek", ["obnoveno", "zavisle", "chyby"])
+
+def moduly_zmije():
+    # {název: modul} pro načtené moduly ze zdrojů .zm na disku.
+    moduly = {}
+    for nazev, modul in list(sys.modules.items()):
+        try:
+            # Obyčejný getattr by líně načítaný modul (dovoz.line_nacitani)
+            # načetl; ten se do prvního přístupu nesleduje.
+            spec = object.__getattribute__(modul, "__spec__")
+        except AttributeError:
+            continue
+        loader = getattr(spec, "loader", None)
+        if isinstance(loader, ZmijeLoader) and loader.archiv is None and hasattr(loader, "stav_zdroje"):
+            moduly[nazev] = modul
+    return moduly
+
+def stav_souboru(cesta):
+    stat = os.stat(cesta)
+    return stat.st_size, stat.st_mtime_ns
+
+class Obnova:
+    def __init__(self, obnovit_zavisle=True):
+        self.obnovit_zavisle = obnovit_zavisle
+        self.zamek = threading.RLock()
+        # název -> (velikost, čas změny, otisk obsahu nebo None)
+        self.stav = {}
+        # název -> (velikost, čas změny, dovozy zdroje)
+        self.dovozy = {}
+        self.haky = []
+        self.vlakno = None
+        self.konec = threading.Event()
+
+    def pri_obnove(self, hak):
+        # Jde použít i jako dekorátor.
+        self.haky.append(hak)
+        return hak
+
+    def odeber_hak(self, hak):
+        self.haky.remove(hak)
+
+    def zmenene(self):
+        with self.zamek:
+            zmenene = []
+            for nazev, modul in moduly_zmije().items():
+                loader = modul.__spec__.loader
+                try:
+                    velikost, cas_zmeny = stav_souboru(loader.path)
+                except OSError:
+                    # Smazaný zdroj nechá běžící modul být.
+                    continue
+                if nazev not in self.stav:
+                    # Výchozí stav je stav zdroje při importu.
+                    self.stav[nazev] = getattr(loader, "stav_zdroje", (velikost, cas_zmeny)) + (None,)
+                if (velikost, cas_zmeny) == self.stav[nazev][:2]:
+                    continue
+                otisk = otisk_souboru(loader.path)
+                if otisk == self.stav[nazev][2]:
+                    self.stav[nazev] = (velikost, cas_zmeny, otisk)
+                    continue
+                zmenene.append(nazev)
+            return sorted(zmenene)
+
+    def zavislosti(self, moduly):
+        # {název: závislosti} mezi načtenými moduly Zmije podle jejich dovozů;
+        # znovu se čtou jen zdroje, které se od minula změnily.
+        cesty = {nazev: modul.__spec__.loader.path for nazev, modul in moduly.items()}
+        graf = {}
+        for nazev, cesta in cesty.items():
+            try:
+                stav = stav_souboru(cesta)
+                if self.dovozy.get(nazev, (None, None))[:2] != stav:
+                    with open(cesta, "rb") as f:
+                        kod = dekoduj_zdroj(f.read())[0]
+                    # Tokenizace je drahá; zdroj bez dovozů se nečte.
+                    self.dovozy[nazev] = stav + (dovozy_zdroje(kod) if "dovézt" in kod else [],)
+            except (OSError, SyntaxError):
+                graf[nazev] = []
+                continue
+            graf[nazev] = zavislosti_modulu(nazev, cesta, self.dovozy[nazev][2], cesty)[0]
+        return graf
+
+    def obnov(self, nazvy=None):
+        # Obnoví zadané moduly, nebo všechny změněné, a podle nastavení
+        # i moduly, které je dovážejí. Modul, který nejde přetlumočit, zůstane
+        # beze změny; chyba při spuštění ho nechá obnovený jen zčásti jako
+        # u importlib.reload. Chyby jsou ve výsledku a moduly, které na
+        # selhaném modulu závisí, se neobnoví.
+        with self.zamek:
+            moduly = moduly_zmije()
+            zmenene = self.zmenene() if nazvy is None else sorted(set(nazvy) & moduly.keys())
+            if not zmenene:
+                return Vysledek([], [], {})
+
+            graf = self.zavislosti(moduly)
+            zavisle = zavisle_moduly(graf, zmenene)
+            k_obnove = set(zmenene) | (zavisle if self.obnovit_zavisle else set())
+            poradi = silne_komponenty({nazev: [z for z in graf[nazev] if z in k_obnove] for nazev in k_obnove})
+
+            obnoveno = []
+            chyby = {}
+            selhane = set()
+            for komponenta in poradi:
+                for nazev in komponenta:
+                    if any(z in selhane for z in graf[nazev]):
+                        selhane.add(nazev)
+                        continue
+                    modul = moduly[nazev]
+                    cesta = modul.__spec__.loader.path
+                    try:
+                        # Stav se čte před načtením, aby se změna během obnovy
+                        # projevila při další kontrole.
+                        self.stav[nazev] = stav_souboru(cesta) + (otisk_souboru(cesta),)
+                        importlib.reload(modul)
+                    except Exception as e:
+                        chyby[nazev] = e
+                        selhane.add(nazev)
+                    else:
+                        obnoveno.append(nazev)
+            vysledek = Vysledek(obnoveno, sorted(zavisle), chyby)
+
+        for hak in list(self.haky):
+            hak(vysledek)
+        return vysledek
+
+    def sleduj(self, interval=1.0):
+        # Spustí vlákno, které každých interval sekund obnoví změněné moduly.
+        if self.vlakno is not None and self.vlakno.is_alive():
+            return self.vlakno
+        self.konec.clear()
+        self.vlakno = threading.Thread(target=self.smycka, args=(interval,), name="zmije-obnova", daemon=True)
+        self.vlakno.start()
+        return self.vlakno
+
+    def smycka(self, interval):
+        # Výchozí stav a dovozy se načtou hned, aby první obnova nemusela
+        # číst všechny zdroje.
+        with self.zamek:
+            self.zmenene()
+            self.zavislosti(moduly_zmije())
+        while not self.konec.wait(interval):
+            try:
+                vysledek = self.obnov()
+            except Exception:
+                traceback.print_exc()
+                continue
+            for nazev, chyba in vysledek.chyby.items():
+                print(f"Chabička se vloudila: Modul {nazev} nelze obnovit: {chyba}", file=sys.stderr)
+
+    def zastav(self):
+        self.konec.set()
+        if self.vlakno is not None:
+            self.vlakno.join()
+            self.vlakno = None
+
+OBNOVA = Obnova()
+
+zmenene = OBNOVA.zmenene
+obnov = OBNOVA.obnov
+pri_obnove = OBNOVA.pri_obnove
+odeber_hak = OBNOVA.odeber_hak
+sleduj = OBNOVA.sleduj
+zastav = OBNOVA.zastav
@@ -0,0 +1,478 @@
+import ast
+import hashlib
+import heapq
+import importlib.util
+import json
+import os
+import py_compile
+import struct
+import time
+import tokenize
+import warnings
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from contextlib import nullcontext
+
+from zmije.artefakt import cesta_pyc, druh_invalidace, pyc_je_aktualni
+from zmije.dovoz import PRIPONA
+from zmije.kompilace import vychozi_invalidace, zapis_pyc
+from zmije.main import ctecka_radku, dekoduj_zdroj, otisk_prepisu, transpiluj
+from zmije.razitko import zapis_atomicky
+
+# Inkrementální sestavení projektu Zmije podle grafu závislostí. Z příkazů
+# dovézt a od ... dovézt se sestaví graf modulů projektu a moduly se pak
+# přetlumočí, zkompilují do __pycache__ a zkontrolují v pořadí závislostí:
+# kontrola "od M dovézt X" potřebuje znát názvy, které modul M definuje.
+# Z připravených modulů se jako první spouští ty na nejdelší zbývající
+# cestě grafem (odhad podle časů z minulého běhu), aby na konci nečekal
+# jediný dlouhý řetězec.
+#
+# Graf se ukládá do JSON vedle projektu. Při dalším běhu se sestaví jen
+# změněné moduly; moduly, které je dovážejí, se znovu zkontrolují, jen
+# když se změnily názvy, které změněný modul definuje. Cykly dovozů se
+# sestavují jako jeden celek.
+VERZE_GRAFU = 1
+NAZEV_GRAFU = ".zmije-projekt.json"
+
+# Odhad ceny modulu bez předchozího měření, v sekundách na bajt zdroje.
+CENA_BAJTU = 1e-6
+
+Souhrn = namedtuple("Souhrn", ["sestaveno", "zkontrolovano", "aktualni", "chyby", "kriticka_cesta"])
+
+def najdi_moduly(koren):
+    # {název modulu: cesta relativní ke kořeni} pro všechny moduly .zm.
+    moduly = {}
+    for adresar, adresare, soubory in os.walk(koren):
+        adresare[:] = sorted(d for d in adresare if d != "__pycache__" and not d.startswith("."))
+        relativni = os.path.relpath(adresar, koren)
+        casti = [] if relativni == "." else relativni.split(os.sep)
+        for soubor in sorted(soubory):
+            zaklad, pripona = os.path.splitext(soubor)
+            if pripona != PRIPONA or zaklad + ".py" in soubory:
+                continue
+            nazev = ".".join(casti if zaklad == "__init__" else casti + [zaklad])
+            if nazev:
+                moduly[nazev] = os.path.join(*casti, soubor)
+    return moduly
+
+def precti_nazev(tokeny, i):
+    casti = []
+    while i < len(tokeny) and tokeny[i].type == tokenize.NAME and tokeny[i].string.lower() != "dovézt":
+        casti.append(tokeny[i].string)
+        if i + 1 < len(tokeny) and tokeny[i + 1].string == ".":
+            i += 2
+        else:
+            i += 1
+            break
+    return ".".join(casti), i
+
+ZACATKY_PRIKAZU = (tokenize.NEWLINE, tokenize.INDENT, tokenize.DEDENT, tokenize.ENCODING)
+
+def dovozy_zdroje(kod):
+    # Seznam [úroveň, modul, jména] pro každý příkaz dovozu ve zdroji .zm;
+    # jména jsou None u "dovézt modul". Úroveň je počet teček relativního
+    # dovozu. Zdroj, který nejde rozdělit na tokeny, dovozy nemá; chybu
+    # ohlásí až jeho sestavení.
+    dovozy = []
+    try:
+        tokeny = [
+            token for token in tokenize.generate_tokens(ctecka_radku(kod, normalizovat=True))
+            if token.type not in (tokenize.COMMENT, tokenize.NL)
+        ]
+    except (tokenize.TokenError, SyntaxError):
+        return dovozy
+
+    i = 0
+    zacatek = True
+    while i < len(tokeny):
+        slovo = tokeny[i].string.lower() if tokeny[i].type == tokenize.NAME else None
+        if zacatek and slovo == "dovézt":
+            i += 1
+            while True:
+                nazev, i = precti_nazev(tokeny, i)
+                if nazev:
+                    dovozy.append([0, nazev, None])
+                if i < len(tokeny) and tokeny[i].string.lower() == "jako":
+                    i += 2
+                if i < len(tokeny) and tokeny[i].string == ",":
+                    i += 1
+                    continue
+                break
+            continue
+        if zacatek and slovo == "od":
+            i += 1
+            uroven = 0
+            while i < len(tokeny) and tokeny[i].string in (".", "..."):
+                uroven += len(tokeny[i].string)
+                i += 1
+            nazev, i = precti_nazev(tokeny, i)
+            if i < len(tokeny) and tokeny[i].string.lower() == "dovézt":
+                i += 1
+                jmena = []
+                while i < len(tokeny) and tokeny[i].type not in (tokenize.NEWLINE, tokenize.ENDMARKER) and tokeny[i].string != ";":
+                    if tokeny[i].string.lower() == "jako":
+                        i += 2
+                        continue
+                    if tokeny[i].type == tokenize.NAME or tokeny[i].string == "*":
+                        jmena.append(tokeny[i].string)
+                    i += 1
+                dovozy.append([uroven, nazev, jmena])
+            continue
+        zacatek = tokeny[i].type in ZACATKY_PRIKAZU or tokeny[i].string in (";", ":")
+        i += 1
+    return dovozy
+
+def vyres_dovoz(nazev_modulu, je_balik, uroven, modul):
+    # Absolutní název dovezeného modulu, nebo None, když relativní dovoz
+    # míří nad kořen projektu.
+    if not uroven:
+        return modul
+    balik = nazev_modulu.split(".") if je_balik else nazev_modulu.split(".")[:-1]
+    if uroven - 1 > len(balik):
+        return None
+    zaklad = balik[:len(balik) - (uroven - 1)]
+    return ".".join(zaklad + ([modul] if modul else [])) or None
+
+def je_balik(cesta):
+    return os.path.splitext(os.path.basename(cesta))[0] == "__init__"
+
+def zavislosti_modulu(nazev, cesta, dovozy, moduly):
+    # Moduly projektu, které se spustí při dovozu: všechny nadřazené balíky
+    # a u "od M dovézt X" i podmodul M.X, pokud existuje. Nadřazené balíky
+    # modulu se spouštějí před ním vždy.
+    casti = nazev.split(".")
+    zavislosti = {".".join(casti[:k]) for k in range(1, len(casti))}
+    od = []
+    for uroven, modul, jmena in dovozy:
+        zaklad = vyres_dovoz(nazev, je_balik(cesta), uroven, modul)
+        if zaklad is None:
+            continue
+        casti = zaklad.split(".")
+        zavislosti.update(".".join(casti[:k]) for k in range(1, len(casti) + 1))
+        if jmena is not None:
+            zavislosti.update(f"{zaklad}.{jmeno}" for jmeno in jmena)
+            od.append((zaklad, jmena))
+    zavislosti.discard(nazev)
+    return sorted(zavislosti & moduly.keys()), od
+
+# Vzory příkazu match existují až od Pythonu 3.10; isinstance s prázdnou
+# n-ticí je vždy nepravda.
+VZORY_SE_JMENEM = tuple(getattr(ast, nazev) for nazev in ("MatchAs", "MatchStar") if hasattr(ast, nazev))
+VZOR_MAPOVANI = getattr(ast, "MatchMapping", ())
+
+def vazane_nazvy(uzel, nazvy):
+    if isinstance(uzel, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+        nazvy.add(uzel.name)
+        return
+    if isinstance(uzel, (ast.Lambda, ast.ListComp, ast.SetComp, ast.DictComp, ast.GeneratorExp)):
+        return
+    if isinstance(uzel, ast.Name) and isinstance(uzel.ctx, ast.Store):
+        nazvy.add(uzel.id)
+    elif isinstance(uzel, (ast.Import, ast.ImportFrom)):
+        for alias in uzel.names:
+            nazvy.add(alias.asname or alias.name.split(".")[0])
+    elif isinstance(uzel, ast.ExceptHandler) and uzel.name:
+        nazvy.add(uzel.name)
+    elif isinstance(uzel, VZORY_SE_JMENEM) and uzel.name:
+        nazvy.add(uzel.name)
+    elif isinstance(uzel, VZOR_MAPOVANI) and uzel.rest:
+        nazvy.add(uzel.rest)
+    for dite in ast.iter_child_nodes(uzel):
+        vazane_nazvy(dite, nazvy)
+
+def exportovane_nazvy(strom):
+    # Názvy, které modul definuje na nejvyšší úrovni, nebo None, když je
+    # nejde určit staticky (dovoz * nebo __getattr__ modulu).
+    nazvy = set()
+    for prikaz in strom.body:
+        if isinstance(prikaz, ast.ImportFrom) and any(alias.name == "*" for alias in prikaz.names):
+            return None
+        vazane_nazvy(prikaz, nazvy)
+    if "__getattr__" in nazvy:
+        return None
+    for uzel in ast.walk(strom):
+        if isinstance(uzel, ast.Global):
+            nazvy.update(uzel.names)
+    return sorted(nazvy)
+
+def otisk_rozhrani(exporty):
+    if exporty is None:
+        return "dynamicke"
+    return hashlib.sha256("\n".join(exporty).encode("utf-8")).hexdigest()
+
+def sestav_uzel(ulohy):
+    # Běží v pracovním procesu: přetlumočí a zkompiluje moduly jednoho uzlu
+    # grafu. Vrací pro každý modul (název, exporty, čas, chyba).
+    vysledky = []
+    for nazev, cesta, invalidace in ulohy:
+        zacatek = time.perf_counter()
+        try:
+            with open(cesta, "rb") as f:
+                data = f.read()
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore", SyntaxWarning)
+                strom = ast.parse(transpiluj(dekoduj_zdroj(data)[0], kontrola_syntaxe=False), cesta)
+            zapis_pyc(cesta, data, strom, invalidace)
+            vysledky.append((nazev, exportovane_nazvy(strom), time.perf_counter() - zacatek, None))
+        except (OSError, ValueError, SyntaxError) as e:
+            vysledky.append((nazev, None, time.perf_counter() - zacatek, f"{cesta}: {e}"))
+    return vysledky
+
+def silne_komponenty(zavislosti):
+    # Tarjanův algoritmus bez rekurze. Komponenty vrací v topologickém
+    # pořadí: závislosti dřív než moduly, které je dovážejí.
+    index = {}
+    nejnizsi = {}
+    zasobnik = []
+    na_zasobniku = set()
+    komponenty = []
+    for koren in sorted(zavislosti):
+        if koren in index:
+            continue
+        prace = [(koren, iter(zavislosti[koren]))]
+        index[koren] = nejnizsi[koren] = len(index)
+        zasobnik.append(koren)
+        na_zasobniku.add(koren)
+        while prace:
+            uzel, dalsi = prace[-1]
+            for soused in dalsi:
+                if soused not in index:
+                    index[soused] = nejnizsi[soused] = len(index)
+                    zasobnik.append(soused)
+                    na_zasobniku.add(soused)
+                    prace.append((soused, iter(zavislosti[soused])))
+                    break
+                if soused in na_zasobniku:
+                    nejnizsi[uzel] = min(nejnizsi[uzel], index[soused])
+            else:
+                prace.pop()
+                if prace:
+                    nejnizsi[prace[-1][0]] = min(nejnizsi[prace[-1][0]], nejnizsi[uzel])
+                if nejnizsi[uzel] == index[uzel]:
+                    komponenta = []
+                    while True:
+                        clen = zasobnik.pop()
+                        na_zasobniku.discard(clen)
+                        komponenta.append(clen)
+                        if clen == uzel:
+                            break
+                    komponenty.append(tuple(sorted(komponenta)))
+    return komponenty
+
+def nacti_graf(cesta):
+    try:
+        with open(cesta, "r", encoding="utf-8") as f:
+            graf = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(graf, dict) or graf.get("verze") != VERZE_GRAFU:
+        return None
+    return graf
+
+def uloz_graf(cesta, graf):
+    zapis_atomicky(cesta, json.dumps(graf, ensure_ascii=False, indent=1, sort_keys=True))
+
+def zkontroluj(nazev, zaznam, zaznamy, moduly):
+    # Chyby "od M dovézt X", kde modul projektu M název X nedefinuje.
+    chyby = []
+    for zaklad, jmena in zaznam["od"]:
+        if zaklad not in zaznamy or zaznamy[zaklad].get("exporty") is None:
+            continue
+        exporty = set(zaznamy[zaklad]["exporty"])
+        for jmeno in jmena:
+            if jmeno != "*" and jmeno not in exporty and f"{zaklad}.{jmeno}" not in moduly:
+                chyby.append(f"{zaznam['cesta']}: modul {zaklad} nedefinuje název {jmeno}.")
+    return chyby
+
+def pyc_odpovida(cesta, invalidace, data, stary_stav):
+    # Zda .pyc modulu se stejným obsahem jako při minulém sestavení sedí se
+    # zdrojem. data jsou bajty zdroje, pokud se četly (změnil se stav).
+    # Při touch nebo git checkout se mění jen čas změny; .pyc z minulého
+    # sestavení pak stačí opravit v hlavičce, jinak by jej import odmítal.
+    cil = cesta_pyc(cesta)
+    try:
+        with open(cil, "rb") as f:
+            pyc = f.read()
+    except OSError:
+        return False
+    if druh_invalidace(pyc) != invalidace:
+        return False
+    if invalidace != py_compile.PycInvalidationMode.TIMESTAMP:
+        return data is None or pyc[8:16] == importlib.util.source_hash(data)
+    if pyc_je_aktualni(pyc, cesta):
+        return True
+    velikost, cas_zmeny = stary_stav
+    if velikost is None or cas_zmeny is None:
+        return False
+    if pyc[8:16] != struct.pack("<II", (cas_zmeny // 10 ** 9) & 0xFFFFFFFF, velikost & 0xFFFFFFFF):
+        return False
+    stat = os.stat(cesta)
+    hlavicka = struct.pack("<II", int(stat.st_mtime) & 0xFFFFFFFF, stat.st_size & 0xFFFFFFFF)
+    zapis_atomicky(cil, pyc[:8] + hlavicka + pyc[16:])
+    return True
+
+def sestav_projekt(koren, procesy=1, cesta_grafu=None, invalidace=None, vynutit=False):
+    koren = os.path.abspath(koren)
+    cesta_grafu = cesta_grafu or os.path.join(koren, NAZEV_GRAFU)
+    invalidace = invalidace or vychozi_invalidace()
+    procesy = procesy or os.cpu_count() or 1
+    moduly = najdi_moduly(koren)
+
+    stary = nacti_graf(cesta_grafu)
+    platny = (
+        stary is not None and not vynutit and
+        stary.get("otisk_prepisu") == otisk_prepisu() and stary.get("invalidace") == invalidace.name
+    )
+    stare_zaznamy = (stary or {}).get("moduly", {})
+    struktura_zmenena = not platny or sorted(stare_zaznamy) != sorted(moduly)
+
+    zaznamy = {}
+    spinave = set()
+    for nazev, relativni in moduly.items():
+        cesta = os.path.join(koren, relativni)
+        stat = os.stat(cesta)
+        zaznam = dict(stare_zaznamy.get(nazev) or {})
+        stary_stav = (zaznam.get("velikost"), zaznam.get("cas_zmeny"))
+        data = None
+        if stary_stav != (stat.st_size, stat.st_mtime_ns):
+            with open(cesta, "rb") as f:
+                data = f.read()
+            otisk = hashlib.sha256(data).hexdigest()
+            if otisk != zaznam.get("otisk"):
+                zaznam["dovozy"] = dovozy_zdroje(dekoduj_zdroj(data)[0])
+                zaznam["otisk"] = otisk
+                spinave.add(nazev)
+        zaznam.update(cesta=relativni, velikost=stat.st_size, cas_zmeny=stat.st_mtime_ns)
+        zaznam.setdefault("cena", stat.st_size * CENA_BAJTU)
+        if not platny or zaznam.get("chyba") or "dovozy" not in zaznam:
+            spinave.add(nazev)
+        elif nazev not in spinave and not pyc_odpovida(cesta, invalidace, data, stary_stav):
+            spinave.add(nazev)
+        if "dovozy" not in zaznam:
+            with open(cesta, "rb") as f:
+                zaznam["dovozy"] = dovozy_zdroje(dekoduj_zdroj(f.read())[0])
+        zaznam["zavislosti"], zaznam["od"] = zavislosti_modulu(nazev, relativni, zaznam["dovozy"], moduly)
+        zaznamy[nazev] = zaznam
+
+    uzly = silne_komponenty({nazev: zaznam["zavislosti"] for nazev, zaznam in zaznamy.items()})
+    uzel_modulu = {nazev: i for i, uzel in enumerate(uzly) for nazev in uzel}
+    zavislosti_uzlu = [
+        {uzel_modulu[z] for nazev in uzel for z in zaznamy[nazev]["zavislosti"]} - {i}
+        for i, uzel in enumerate(uzly)
+    ]
+    zavisle_uzly = [[] for _ in uzly]
+    for i, zavislosti in enumerate(zavislosti_uzlu):
+        for j in zavislosti:
+            zavisle_uzly[j].append(i)
+
+    # Priorita uzlu je délka nejdelší cesty od něj k modulům, které už nikdo
+    # nedováží; komponenty jsou v topologickém pořadí, takže stačí jeden
+    # průchod odzadu.
+    priorita = [0.0] * len(uzly)
+    for i in reversed(range(len(uzly))):
+        cena = sum(zaznamy[nazev]["cena"] for nazev in uzly[i])
+        priorita[i] = cena + max((priorita[j] for j in zavisle_uzly[i]), default=0.0)
+    kriticka_cesta = []
+    kandidati = [i for i in range(len(uzly)) if not zavislosti_uzlu[i]]
+    while kandidati:
+        i = max(kandidati, key=lambda k: priorita[k])
+        kriticka_cesta.extend(uzly[i])
+        kandidati = zavisle_uzly[i]
+
+    sestaveno, zkontrolovano, aktualni, chyby = [], [], [], []
+    zmenene_rozhrani = set()
+    selhane = set()
+    zbyva = [len(zavislosti) for zavislosti in zavislosti_uzlu]
+    pripravene = [(-priorita[i], i) for i in range(len(uzly)) if not zbyva[i]]
+    heapq.heapify(pripravene)
+
+    def dokonci(i, vysledky):
+        uzel = uzly[i]
+        for nazev, exporty, cas, chyba in vysledky or ():
+            zaznam = zaznamy[nazev]
+            zaznam["cena"] = cas
+            zaznam["chyba"] = chyba
+            if chyba:
+                chyby.append(chyba)
+                selhane.add(i)
+                continue
+            if otisk_rozhrani(exporty) != zaznam.get("rozhrani"):
+                zmenene_rozhrani.add(i)
+            zaznam["exporty"] = exporty
+            zaznam["rozhrani"] = otisk_rozhrani(exporty)
+            sestaveno.append(nazev)
+
+        kontrolovat = (
+            vysledky is not None or struktura_zmenena or
+            any(j in zmenene_rozhrani for j in zavislosti_uzlu[i]) or
+            any(zaznamy[nazev].get("kontrola") for nazev in uzel)
+        )
+        for nazev in uzel:
+            zaznam = zaznamy[nazev]
+            if zaznam.get("chyba"):
+                continue
+            if kontrolovat:
+                zaznam["kontrola"] = zkontroluj(nazev, zaznam, zaznamy, moduly)
+                chyby.extend(zaznam["kontrola"])
+                if vysledky is None:
+                    zkontrolovano.append(nazev)
+            elif vysledky is None:
+                aktualni.append(nazev)
+
+        for j in zavisle_uzly[i]:
+            zbyva[j] -= 1
+            if not zbyva[j]:
+                heapq.heappush(pripravene, (-priorita[j], j))
+
+    def preskoc(i):
+        # Závislost se nesestavila; změněný modul počká na další běh.
+        selhana = next(j for j in zavislosti_uzlu[i] if j in selhane)
+        for nazev in uzly[i]:
+            zaznamy[nazev]["chyba"] = f"{zaznamy[nazev]['cesta']}: nesestaveno, protože selhal modul {uzly[selhana][0]}."
+            chyby.append(zaznamy[nazev]["chyba"])
+        selhane.add(i)
+        dokonci(i, ())
+
+    bezici = {}
+    with ProcessPoolExecutor(max_workers=procesy) if procesy > 1 else nullcontext() as fond:
+        while pripravene or bezici:
+            while pripravene and len(bezici) < procesy:
+                _, i = heapq.heappop(pripravene)
+                if not any(nazev in spinave for nazev in uzly[i]):
+                    dokonci(i, None)
+                elif any(j in selhane for j in zavislosti_uzlu[i]):
+                    preskoc(i)
+                else:
+                    ulohy = [(nazev, os.path.join(koren, zaznamy[nazev]["cesta"]), invalidace) for nazev in uzly[i]]
+                    if fond is None:
+                        dokonci(i, sestav_uzel(ulohy))
+                    else:
+                        bezici[fond.submit(sestav_uzel, ulohy)] = i
+            if bezici:
+                hotove, _ = wait(bezici, return_when=FIRST_COMPLETED)
+                for budouci in hotove:
+                    dokonci(bezici.pop(budouci), budouci.result())
+
+    uloz_graf(cesta_grafu, {
+        "verze": VERZE_GRAFU,
+        "otisk_prepisu": otisk_prepisu(),
+        "invalidace": invalidace.name,
+        "moduly": zaznamy,
+    })
+    return Souhrn(sestaveno, zkontrolovano, aktualni, chyby, kriticka_cesta)
+
+def zavisle_moduly(zavislosti, nazvy):
+    # Moduly, které zadané moduly dovážejí přímo i přes další moduly;
+    # zavislosti je {název: závislosti}, například z uloženého grafu.
+    zavisle = {}
+    for nazev, primo in zavislosti.items():
+        for zavislost in primo:
+            zavisle.setdefault(zavislost, []).append(nazev)
+    vysledek = set()
+    fronta = list(nazvy)
+    while fronta:
+        for nazev in zavisle.get(fronta.pop(), ()):
+            if nazev not in vysledek:
+                vysledek.add(nazev)
+                fronta.append(nazev)
+    return vysledek - set(nazvy)
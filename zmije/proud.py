@@ -0,0 +1,137 @@
+import codecs
+import hashlib
+import io
+import itertools
+import mmap
+import os
+import sys
+import tokenize
+
+from zmije.razitko import otisk_souboru
+
+# Proudové čtení a zápis pro příkazovou řádku. "-" znamená standardní vstup
+# nebo výstup. Soubory se čtou přes mmap a dekódují po kouscích, takže se
+# zdroj nekopíruje celý do paměti procesu vedle stránkové mezipaměti.
+# Kódování zdroje se určí podle PEP 263 a výstup se zapíše ve stejném.
+VELIKOST_CTENI = 1 << 20
+
+def radky_z_bajtu(kousky, kodovani="utf-8"):
+    # Dekóduje po kouscích a převádí konce řádků stejně jako open()
+    # v textovém režimu; vydává celé řádky včetně "\n".
+    # Rozepsaný řádek se drží jako seznam kousků a spojí se až s koncem
+    # řádku; přilepování ke stále delšímu řetězci by velmi dlouhý řádek
+    # kopírovalo s každým kouskem znovu, tedy kvadraticky.
+    dekoder = io.IncrementalNewlineDecoder(codecs.getincrementaldecoder(kodovani)(), translate=True)
+    rozepsany = []
+    for kousek in kousky:
+        text = dekoder.decode(kousek)
+        if "\n" not in text:
+            if text:
+                rozepsany.append(text)
+            continue
+        radky = text.split("\n")
+        rozepsany.append(radky[0])
+        yield "".join(rozepsany) + "\n"
+        for radek in itertools.islice(radky, 1, len(radky) - 1):
+            yield radek + "\n"
+        rozepsany = [radky[-1]] if radky[-1] else []
+    rozepsany.append(dekoder.decode(b"", final=True))
+    zbytek = "".join(rozepsany)
+    if zbytek:
+        yield zbytek
+
+def kousky_mapy(mapa, velikost=VELIKOST_CTENI):
+    for zacatek in range(0, len(mapa), velikost):
+        yield mapa[zacatek:zacatek + velikost]
+
+def kousky_proudu(proud, velikost=VELIKOST_CTENI):
+    while True:
+        kousek = proud.read(velikost)
+        if not kousek:
+            return
+        yield kousek
+
+def kousky_zdroje(cesta):
+    if cesta == "-":
+        yield from kousky_proudu(sys.stdin.buffer)
+        return
+
+    with open(cesta, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapa:
+            if hasattr(mapa, "madvise"):
+                mapa.madvise(mmap.MADV_SEQUENTIAL)
+            yield from kousky_mapy(mapa)
+
+def rozpoznej_kodovani(kousky):
+    # Přečte z kousků nejvýš dva řádky pro tokenize.detect_encoding() a vrátí
+    # kódování spolu s kousky, které znovu začínají od začátku vstupu.
+    kousky = iter(kousky)
+    prectene = []
+    zbytek = b""
+
+    def cti_radek():
+        nonlocal zbytek
+        while b"\n" not in zbytek:
+            kousek = next(kousky, b"")
+            if not kousek:
+                radek, zbytek = zbytek, b""
+                return radek
+            prectene.append(kousek)
+            zbytek += kousek
+        radek, _, zbytek = zbytek.partition(b"\n")
+        return radek + b"\n"
+
+    kodovani = tokenize.detect_encoding(cti_radek)[0]
+    return kodovani, itertools.chain(prectene, kousky)
+
+def cti_zdroj(cesta):
+    # Vrátí (kódování, řádky); kódování je známé dřív, než se začne psát výstup.
+    kodovani, kousky = rozpoznej_kodovani(kousky_zdroje(cesta))
+    return kodovani, radky_z_bajtu(kousky, kodovani)
+
+def cti_radky(cesta):
+    return cti_zdroj(cesta)[1]
+
+def cti_bajty(cesta):
+    if cesta == "-":
+        return sys.stdin.buffer.read()
+    with open(cesta, "rb") as f:
+        return f.read()
+
+def zapis_proud(kusy, cesta, kodovani="utf-8"):
+    # Zapisuje každý kus hned, jak vznikne. Do souboru se píše přes dočasný
+    # soubor, aby po chybě uprostřed nezůstal napůl přepsaný výstup; má-li
+    # cíl už stejný obsah, zůstane nedotčený a funkce vrátí False.
+    koder = codecs.getincrementalencoder(kodovani)()
+    if cesta == "-":
+        sys.stdout.flush()
+        vystup = sys.stdout.buffer
+        try:
+            for kus in kusy:
+                vystup.write(koder.encode(kus))
+            vystup.write(koder.encode("", final=True))
+        finally:
+            vystup.flush()
+        return True
+
+    docasny = f"{cesta}.{os.getpid()}.tmp"
+    otisk = hashlib.sha256()
+    velikost = 0
+    try:
+        with open(docasny, "wb") as f:
+            for kus in itertools.chain(kusy, [None]):
+                data = koder.encode("", final=True) if kus is None else koder.encode(kus)
+                otisk.update(data)
+                velikost += len(data)
+                f.write(data)
+        if os.path.exists(cesta) and os.path.getsize(cesta) == velikost and otisk_souboru(cesta) == otisk.hexdigest():
+            os.remove(docasny)
+            return False
+        os.replace(docasny, cesta)
+    except BaseException:
+        if os.path.exists(docasny):
+            os.remove(docasny)
+        raise
+    return True
@@ -0,0 +1,97 @@
+import hashlib
+import json
+import os
+
+from zmije.main import otisk_prepisu
+
+# Razítko závislostí pro inkrementální sestavení. Vedle výstupu leží skrytý
+# soubor .<výstup>.razitko s otiskem zdroje, výstupu a pravidel přepisu.
+# Když sedí, je výstup aktuální a zdroj se vůbec nemusí transpilovat.
+# Velikost a čas změny slouží jen jako levná zkratka; při neshodě rozhoduje
+# obsah, takže pouhé "touch" zdroje nic nepřestaví.
+VERZE_RAZITKA = 1
+
+def otisk_dat(data):
+    if isinstance(data, str):
+        data = data.encode("utf-8", "surrogatepass")
+    return hashlib.sha256(data).hexdigest()
+
+def otisk_souboru(cesta):
+    otisk = hashlib.sha256()
+    with open(cesta, "rb") as f:
+        for kousek in iter(lambda: f.read(1 << 20), b""):
+            otisk.update(kousek)
+    return otisk.hexdigest()
+
+def stav_souboru(cesta):
+    stat = os.stat(cesta)
+    return [stat.st_size, stat.st_mtime_ns]
+
+def cesta_razitka(cil):
+    adresar, nazev = os.path.split(cil)
+    return os.path.join(adresar, f".{nazev}.razitko")
+
+def zapis_atomicky(cil, data):
+    # Vrací False, pokud cíl už má stejný obsah; pak se soubor ani jeho čas
+    # změny nemění a navazující kroky sestavení nic nepřestavují.
+    if isinstance(data, str):
+        data = data.encode("utf-8", "surrogatepass")
+    try:
+        if os.path.getsize(cil) == len(data) and otisk_souboru(cil) == otisk_dat(data):
+            return False
+    except OSError:
+        pass
+
+    docasny = f"{cil}.{os.getpid()}.tmp"
+    try:
+        with open(docasny, "wb") as f:
+            f.write(data)
+        os.replace(docasny, cil)
+    except BaseException:
+        if os.path.exists(docasny):
+            os.remove(docasny)
+        raise
+    return True
+
+def nacti_razitko(cil):
+    try:
+        with open(cesta_razitka(cil), "r", encoding="utf-8") as f:
+            razitko = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(razitko, dict) or razitko.get("verze") != VERZE_RAZITKA:
+        return None
+    return razitko
+
+def sedi_soubor(cesta, stav, otisk):
+    try:
+        if stav_souboru(cesta) == stav:
+            return True
+        return otisk_souboru(cesta) == otisk
+    except OSError:
+        return False
+
+def je_aktualni(zdroj, cil):
+    razitko = nacti_razitko(cil)
+    if razitko is None or razitko.get("pravidla") != otisk_prepisu():
+        return False
+    return (
+        sedi_soubor(zdroj, razitko.get("zdroj_stav"), razitko.get("zdroj")) and
+        sedi_soubor(cil, razitko.get("vystup_stav"), razitko.get("vystup"))
+    )
+
+def uloz_razitko(zdroj, cil, otisk_zdroje=None, stav_zdroje=None):
+    # Stav zdroje musí být zjištěný dřív, než se zdroj přečetl a otiskl:
+    # změna mezi tím pak razítko jen zneplatní. Stav zjištěný až po
+    # tlumočení by naopak mohl k novému souboru přiřadit starý otisk.
+    if stav_zdroje is None:
+        stav_zdroje = stav_souboru(zdroj)
+    razitko = {
+        "verze": VERZE_RAZITKA,
+        "pravidla": otisk_prepisu(),
+        "zdroj": otisk_zdroje or otisk_souboru(zdroj),
+        "zdroj_stav": stav_zdroje,
+        "vystup": otisk_souboru(cil),
+        "vystup_stav": stav_souboru(cil),
+    }
+    zapis_atomicky(cesta_razitka(cil), json.dumps(razitko, indent=4, sort_keys=True) + "\n")
@@ -0,0 +1,320 @@
+import builtins
+import gc
+import importlib
+import json
+import os
+import resource
+import selectors
+import signal
+import socket
+import struct
+import sys
+import tempfile
+import time
+import traceback
+from collections import namedtuple
+
+from zmije.main import ChybaValidace, transpiluj
+
+# Server pro spouštění mnoha krátkých skriptů Zmije (pouze Unix). Jednou
+# načte zmije, tabulky klíčových slov a běžné moduly standardní knihovny
+# a rozvětví se na pevný počet pracovních procesů, které spolu přijímají
+# spojení na unixovém soketu. Pracovník přečte úlohu, spustí ji v dalším
+# procesu s limity zdrojů a zachyceným výstupem a pošle výsledek zpět.
+# Úloha tak místo startu interpretu platí jen jeden fork; kód úlohy nikdy
+# neběží v pracovníkovi, takže po sobě nemůže nechat změněný stav.
+#
+# Zprávy v obou směrech: 4 B délka hlavičky (big endian), hlavička JSON
+# a za ní bloby, jejichž délky hlavička uvádí.
+#   požadavek: {"nazev", "argumenty", "limity", "zdroj": n, "vstup": n}
+#   odpověď:   {"navratovy_kod", "signal", "chyba", "cas", "oriznuto",
+#               "vystup": n, "chybovy_vystup": n}
+DELKA_HLAVICKY = struct.Struct("!I")
+MAX_HLAVICKA = 1 << 20
+
+PREDEHRANE_MODULY = (
+    "collections", "datetime", "decimal", "fractions", "functools", "itertools",
+    "json", "math", "random", "re", "statistics", "string", "traceback",
+)
+
+# Výchozí limity úlohy; požadavek si může vyžádat jen přísnější.
+#   cpu     procesorový čas v sekundách (RLIMIT_CPU)
+#   pamet   adresní prostor v bajtech (RLIMIT_AS)
+#   soubor  největší zapsaný soubor v bajtech (RLIMIT_FSIZE)
+#   cas     čas běhu v sekundách, hlídá pracovník
+#   vystup  kolik bajtů stdout a stderr se vrátí, zbytek se zahodí
+VYCHOZI_LIMITY = {"cpu": 10, "pamet": 512 * 1024 * 1024, "soubor": None, "cas": 30, "vystup": 1 << 20}
+
+RLIMITY = {"cpu": resource.RLIMIT_CPU, "pamet": resource.RLIMIT_AS, "soubor": resource.RLIMIT_FSIZE}
+
+Vysledek = namedtuple("Vysledek", ["navratovy_kod", "signal", "vystup", "chybovy_vystup", "chyba", "cas", "oriznuto"])
+
+def vychozi_socket():
+    cesta = os.environ.get("ZMIJE_SERVER")
+    if cesta:
+        return cesta
+    adresar = os.environ.get("XDG_RUNTIME_DIR") or tempfile.gettempdir()
+    return os.path.join(adresar, f"zmije-{os.getuid()}.sock")
+
+def prijmi_presne(spojeni, delka):
+    kusy = []
+    while delka:
+        kus = spojeni.recv(min(delka, 1 << 20))
+        if not kus:
+            raise ConnectionError("Spojení se uzavřelo uprostřed zprávy.")
+        kusy.append(kus)
+        delka -= len(kus)
+    return b"".join(kusy)
+
+def posli_zpravu(spojeni, hlavicka, *bloby):
+    data = json.dumps(hlavicka).encode("utf-8")
+    spojeni.sendall(DELKA_HLAVICKY.pack(len(data)) + data)
+    for blob in bloby:
+        spojeni.sendall(blob)
+
+def prijmi_zpravu(spojeni, nazvy_blobu):
+    delka, = DELKA_HLAVICKY.unpack(prijmi_presne(spojeni, DELKA_HLAVICKY.size))
+    if delka > MAX_HLAVICKA:
+        raise ValueError("Hlavička zprávy je příliš dlouhá.")
+    hlavicka = json.loads(prijmi_presne(spojeni, delka).decode("utf-8"))
+    return hlavicka, [prijmi_presne(spojeni, int(hlavicka.get(nazev, 0))) for nazev in nazvy_blobu]
+
+def spoj_limity(vychozi, pozadovane):
+    limity = dict(vychozi)
+    for klic, hodnota in (pozadovane or {}).items():
+        if klic not in limity or hodnota is None:
+            continue
+        limity[klic] = hodnota if limity[klic] is None else min(limity[klic], hodnota)
+    return limity
+
+def predehrej(moduly=PREDEHRANE_MODULY):
+    for modul in moduly:
+        importlib.import_module(modul)
+    # Jeden převod naplní líně vytvářené struktury tokenize a re, aby je
+    # děti sdílely místo toho, aby je každé stavělo znovu.
+    transpiluj("když Pravda:\n    X = [1; 2,5]\n")
+    # Objekty starého procesu už GC neprochází, takže jejich stránky zůstanou
+    # po forku sdílené a nekopírují se při počítání referencí z cyklu GC.
+    gc.collect()
+    gc.freeze()
+
+def spust_ulohu(zdroj, nazev, argumenty, limity, vstup_fd, vystup_fd, chyba_fd):
+    # Běží v dítěti; nikdy se nevrací.
+    kod = 1
+    try:
+        # Vlastní skupina procesů, aby šlo při vypršení času zabít i procesy,
+        # které si skript spustil a které drží otevřené roury výstupu.
+        os.setpgid(0, 0)
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        os.dup2(vstup_fd, 0)
+        os.dup2(vystup_fd, 1)
+        os.dup2(chyba_fd, 2)
+        for limit, rlimit in RLIMITY.items():
+            if limity.get(limit) is not None:
+                hodnota = int(limity[limit])
+                # U CPU dostane úloha nejdřív SIGXCPU, o sekundu později SIGKILL.
+                resource.setrlimit(rlimit, (hodnota, hodnota + 1 if limit == "cpu" else hodnota))
+
+        sys.argv = [nazev] + list(argumenty)
+        try:
+            prelozeny = compile(transpiluj(zdroj, kontrola_syntaxe=False), nazev, "exec", dont_inherit=True)
+        except (ChybaValidace, ValueError, SyntaxError) as e:
+            print(f"Chabička se vloudila: {e}", file=sys.stderr)
+        else:
+            modul = {"__name__": "__main__", "__file__": nazev, "__builtins__": builtins}
+            try:
+                exec(prelozeny, modul)
+                kod = 0
+            except SystemExit as e:
+                if e.code is None:
+                    kod = 0
+                elif isinstance(e.code, int):
+                    kod = e.code
+                else:
+                    print(e.code, file=sys.stderr)
+                    kod = 1
+            except BaseException:
+                traceback.print_exc()
+                kod = 1
+    finally:
+        try:
+            sys.stdout.flush()
+            sys.stderr.flush()
+        finally:
+            os._exit(kod & 0xFF)
+
+def zabij_skupinu(pid):
+    try:
+        os.killpg(pid, signal.SIGKILL)
+    except ProcessLookupError:
+        pass
+
+def ukonci(cislo, ramec):
+    raise KeyboardInterrupt
+
+def obsluz(spojeni, vychozi_limity, zavrit=()):
+    # Vyřídí jedno spojení v pracovníkovi. zavrit jsou sokety, které dítě
+    # s úlohou nemá zdědit.
+    try:
+        spojeni.settimeout(10)
+        pozadavek, (zdroj, vstup) = prijmi_zpravu(spojeni, ("zdroj", "vstup"))
+        limity = spoj_limity(vychozi_limity, pozadavek.get("limity"))
+        nazev = str(pozadavek.get("nazev") or "<zmije>")
+
+        with tempfile.TemporaryFile() as soubor_vstupu:
+            soubor_vstupu.write(vstup)
+            soubor_vstupu.seek(0)
+            vystup_cti, vystup_pis = os.pipe()
+            chyba_cti, chyba_pis = os.pipe()
+            zacatek = time.monotonic()
+            pid = os.fork()
+            if pid == 0:
+                spojeni.close()
+                for soket in zavrit:
+                    soket.close()
+                os.close(vystup_cti)
+                os.close(chyba_cti)
+                spust_ulohu(zdroj, nazev, pozadavek.get("argumenty") or (), limity,
+                            soubor_vstupu.fileno(), vystup_pis, chyba_pis)
+            try:
+                os.setpgid(pid, pid)
+            except OSError:
+                pass
+            os.close(vystup_pis)
+            os.close(chyba_pis)
+
+        try:
+            vystupy = {vystup_cti: bytearray(), chyba_cti: bytearray()}
+            max_vystup = limity.get("vystup")
+            oriznuto = False
+            zabito = False
+            termin = zacatek + limity["cas"] if limity.get("cas") is not None else None
+            with selectors.DefaultSelector() as vyber:
+                for fd in vystupy:
+                    vyber.register(fd, selectors.EVENT_READ)
+                while vyber.get_map():
+                    zbyva = None if termin is None else max(termin - time.monotonic(), 0)
+                    udalosti = vyber.select(zbyva)
+                    if not udalosti and termin is not None and time.monotonic() >= termin:
+                        zabij_skupinu(pid)
+                        zabito = True
+                        termin = None
+                    for klic, _ in udalosti:
+                        data = os.read(klic.fd, 1 << 16)
+                        if not data:
+                            vyber.unregister(klic.fd)
+                            os.close(klic.fd)
+                            continue
+                        misto = len(data) if max_vystup is None else max(max_vystup - len(vystupy[klic.fd]), 0)
+                        vystupy[klic.fd] += data[:misto]
+                        oriznuto = oriznuto or misto < len(data)
+            _, stav = os.waitpid(pid, 0)
+        except BaseException:
+            # Pracovník končí (SIGTERM serveru); úloha ho nesmí přežít.
+            zabij_skupinu(pid)
+            raise
+        cas = time.monotonic() - zacatek
+
+        odpoved = {
+            # os.waitstatus_to_exitcode je až od Pythonu 3.9.
+            "navratovy_kod": os.WEXITSTATUS(stav) if os.WIFEXITED(stav) else -os.WTERMSIG(stav),
+            "signal": os.WTERMSIG(stav) if os.WIFSIGNALED(stav) else None,
+            "chyba": "Překročen časový limit." if zabito else None,
+            "cas": cas,
+            "oriznuto": oriznuto,
+            "vystup": len(vystupy[vystup_cti]),
+            "chybovy_vystup": len(vystupy[chyba_cti]),
+        }
+        posli_zpravu(spojeni, odpoved, bytes(vystupy[vystup_cti]), bytes(vystupy[chyba_cti]))
+    except Exception as e:
+        try:
+            posli_zpravu(spojeni, {"navratovy_kod": None, "signal": None, "chyba": f"Chybný požadavek: {e}",
+                                   "cas": 0, "oriznuto": False, "vystup": 0, "chybovy_vystup": 0})
+        except OSError:
+            pass
+
+def pracuj(server, vychozi_limity):
+    # Smyčka pracovního procesu; nikdy se nevrací. Při SIGTERM nebo SIGINT
+    # zabije rozběhnutou úlohu a skončí.
+    try:
+        while True:
+            spojeni, _ = server.accept()
+            with spojeni:
+                obsluz(spojeni, vychozi_limity, (server,))
+    finally:
+        os._exit(1)
+
+def spust_server(cesta=None, procesy=None, limity=None, moduly=PREDEHRANE_MODULY, pripraveno=None):
+    # Obsluhuje spojení, dokud nepřijde SIGTERM nebo SIGINT. procesy je počet
+    # pracovníků a tedy současně běžících úloh; další spojení čekají ve
+    # frontě soketu.
+    cesta = cesta or vychozi_socket()
+    procesy = procesy or os.cpu_count() or 1
+    vychozi_limity = spoj_limity(VYCHOZI_LIMITY, None)
+    vychozi_limity.update(limity or {})
+
+    predehrej(moduly)
+
+    if os.path.exists(cesta):
+        os.remove(cesta)
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    puvodni_maska = os.umask(0o077)
+    try:
+        server.bind(cesta)
+    finally:
+        os.umask(puvodni_maska)
+    server.listen(128)
+
+    def novy_pracovnik():
+        sys.stdout.flush()
+        sys.stderr.flush()
+        pid = os.fork()
+        if pid == 0:
+            pracuj(server, vychozi_limity)
+        pracovnici.add(pid)
+
+    puvodni_sigterm = signal.signal(signal.SIGTERM, ukonci)
+    pracovnici = set()
+    try:
+        for _ in range(procesy):
+            novy_pracovnik()
+        if pripraveno is not None:
+            pripraveno()
+        while True:
+            # Pracovník končí jen chybou nebo signálem; nahradí se novým.
+            pid, _ = os.wait()
+            pracovnici.discard(pid)
+            novy_pracovnik()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        signal.signal(signal.SIGTERM, puvodni_sigterm)
+        server.close()
+        if os.path.exists(cesta):
+            os.remove(cesta)
+        for pid in pracovnici:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        for pid in pracovnici:
+            try:
+                os.waitpid(pid, 0)
+            except ChildProcessError:
+                pass
+
+def spust_na_serveru(zdroj, cesta=None, nazev="<zmije>", argumenty=(), vstup=b"", limity=None):
+    # Klient: pošle skript (str nebo bytes) serveru a vrátí Vysledek.
+    if isinstance(zdroj, str):
+        zdroj = zdroj.encode("utf-8")
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as spojeni:
+        spojeni.connect(cesta or vychozi_socket())
+        posli_zpravu(spojeni, {
+            "nazev": nazev, "argumenty": list(argumenty), "limity": limity or {},
+            "zdroj": len(zdroj), "vstup": len(vstup),
+        }, zdroj, vstup)
+        odpoved, (vystup, chybovy_vystup) = prijmi_zpravu(spojeni, ("vystup", "chybovy_vystup"))
+    return Vysledek(
+        odpoved.get("navratovy_kod"), odpoved.get("signal"), vystup, chybovy_vystup,
+        odpoved.get("chyba"), odpoved.get("cas"), odpoved.get("oriznuto", False),
+    )
@@ -0,0 +1,180 @@
+import importlib.util
+import os
+import sqlite3
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+from glob import glob
+
+from setuptools.command.build_py import build_py as _build_py
+
+from zmije.main import dekoduj_zdroj, transpiluj, zakoduj_kusy
+from zmije.razitko import zapis_atomicky
+
+try:
+    from setuptools.errors import CompileError
+except ImportError:
+    from distutils.errors import CompileError
+
+# Příkaz build_py pro setuptools, který při sestavení balíčku přetlumočí
+# moduly .zm na .py. Zapíná se v pyproject.toml projektu:
+#
+#   [build-system]
+#   requires = ["setuptools>=61", "zmije"]
+#
+#   [tool.setuptools.cmdclass]
+#   build_py = "zmije.sestaveni.build_py"
+#
+# Moduly se převádějí paralelně, výsledky se sdílejí přes mezipaměť SQLite
+# (zmije.mezipamet) a nezměněné výstupy se nepřepisují, takže opakované
+# sestavení kola je inkrementální. Bajtkód .pyc vznikne se standardní
+# volbou --compile příkazu build_py.
+
+def nacti_zdroj(cesta):
+    # Vrací (text, kódování) podle PEP 263. Výstup se zapisuje ve stejném
+    # kódování, protože si ponechává deklaraci kódování ze zdroje.
+    with open(cesta, "rb") as f:
+        return dekoduj_zdroj(f.read())
+
+def preved_soubor(cesta):
+    try:
+        kod, kodovani = nacti_zdroj(cesta)
+        with warnings.catch_warnings():
+            warnings.simplefilter("error", SyntaxWarning)
+            return kod, kodovani, transpiluj(kod), None
+    except (ValueError, SyntaxError, SyntaxWarning) as e:
+        return None, None, None, f"{cesta}: {e}"
+
+class build_py(_build_py):
+    user_options = _build_py.user_options + [
+        ("zmije-procesy=", None, "počet procesů pro převod modulů .zm (výchozí: počet jader)"),
+        ("zmije-mezipamet=", None, "soubor mezipaměti SQLite; prázdný řetězec ji vypne"),
+    ]
+
+    def initialize_options(self):
+        super().initialize_options()
+        self.zmije_procesy = None
+        self.zmije_mezipamet = None
+
+    def finalize_options(self):
+        super().finalize_options()
+        self.zmije_procesy = int(self.zmije_procesy or os.cpu_count() or 1)
+
+    def najdi_moduly_zmije(self):
+        # Vrací trojice (balíček, modul, cesta ke zdroji .zm). Modul .py
+        # stejného jména má přednost, stejně jako při importu a v zmije.zabal.
+        moduly = []
+        for balicek in self.packages or ():
+            adresar = self.get_package_dir(balicek)
+            for cesta in sorted(glob(os.path.join(adresar, "*.zm"))):
+                modul = os.path.splitext(os.path.basename(cesta))[0]
+                if os.path.exists(os.path.join(adresar, modul + ".py")):
+                    continue
+                moduly.append((balicek, modul, cesta))
+        return moduly
+
+    def cil_modulu(self, balicek, modul):
+        return self.get_module_outfile(self.build_lib, balicek.split("."), modul)
+
+    def prevod(self, cesty):
+        # Vrací převedený kód pro každou cestu; zásahy v mezipaměti se
+        # nepřevádějí a ostatní moduly se rozdělí mezi procesy. Mezipaměť
+        # drží text v UTF-8, výsledek je v kódování zdroje.
+        vysledky = {}
+        mezipamet = None
+        if self.zmije_mezipamet != "":
+            from zmije.mezipamet import SqliteMezipamet, klic_zdroje
+
+            try:
+                mezipamet = SqliteMezipamet(self.zmije_mezipamet or None)
+            except (sqlite3.Error, OSError) as chyba:
+                # Izolované sestavení mívá domovský adresář jen pro čtení
+                # nebo žádný; převádí se pak bez mezipaměti.
+                mezipamet = self.bez_mezipameti(None, chyba)
+
+        try:
+            chybi = []
+            for cesta in cesty:
+                data = None
+                if mezipamet is not None:
+                    try:
+                        kod, kodovani = nacti_zdroj(cesta)
+                    except (ValueError, SyntaxError):
+                        # Chybu ohlásí až převod.
+                        pass
+                    else:
+                        try:
+                            data = mezipamet.nacti(klic_zdroje(kod), "py")
+                        except (sqlite3.Error, OSError) as chyba:
+                            mezipamet = self.bez_mezipameti(mezipamet, chyba)
+                if data is None:
+                    chybi.append(cesta)
+                else:
+                    vysledky[cesta] = zakoduj_kusy((data.decode("utf-8"),), kodovani)
+
+            if self.zmije_procesy > 1 and len(chybi) > 1:
+                with ProcessPoolExecutor(max_workers=min(self.zmije_procesy, len(chybi))) as fond:
+                    prevedene = list(fond.map(preved_soubor, chybi))
+            else:
+                prevedene = [preved_soubor(cesta) for cesta in chybi]
+
+            chyby = [chyba for _, _, _, chyba in prevedene if chyba]
+            if chyby:
+                raise CompileError("Moduly Zmije nelze přetlumočit:\n" + "\n".join(chyby))
+
+            for cesta, (kod, kodovani, vysledek, _) in zip(chybi, prevedene):
+                vysledky[cesta] = zakoduj_kusy((vysledek,), kodovani)
+                if mezipamet is not None:
+                    try:
+                        mezipamet.uloz(klic_zdroje(kod), "py", vysledek.encode("utf-8"))
+                    except (sqlite3.Error, OSError) as chyba:
+                        mezipamet = self.bez_mezipameti(mezipamet, chyba)
+        finally:
+            if mezipamet is not None:
+                try:
+                    mezipamet.zavri()
+                except (sqlite3.Error, OSError) as chyba:
+                    self.bez_mezipameti(None, chyba)
+        return vysledky
+
+    def bez_mezipameti(self, mezipamet, chyba):
+        # Vadná mezipaměť sestavení nezastaví, jen se dál nepoužívá.
+        self.warn(f"mezipaměť Zmije nelze použít ({chyba}), pokračuje se bez ní")
+        if mezipamet is not None:
+            try:
+                mezipamet.spojeni.close()
+            except sqlite3.Error:
+                pass
+        return None
+
+    def build_zmije_modules(self):
+        moduly = self.najdi_moduly_zmije()
+        if not moduly:
+            return []
+
+        vysledky = self.prevod([cesta for _, _, cesta in moduly])
+        vystupy = []
+        for balicek, modul, cesta in moduly:
+            cil = self.cil_modulu(balicek, modul)
+            self.mkpath(os.path.dirname(cil))
+            if zapis_atomicky(cil, vysledky[cesta]):
+                self.announce(f"přetlumočen {cesta} -> {cil}", level=2)
+            vystupy.append(cil)
+        return vystupy
+
+    def run(self):
+        super().run()
+        vystupy = self.build_zmije_modules()
+        if vystupy:
+            self.byte_compile(vystupy)
+
+    def get_outputs(self, include_bytecode=1):
+        vystupy = super().get_outputs(include_bytecode)
+        for balicek, modul, _ in self.najdi_moduly_zmije():
+            cil = self.cil_modulu(balicek, modul)
+            vystupy.append(cil)
+            if include_bytecode:
+                if self.compile:
+                    vystupy.append(importlib.util.cache_from_source(cil, optimization=""))
+                if self.optimize > 0:
+                    vystupy.append(importlib.util.cache_from_source(cil, optimization=self.optimize))
+        return vystupy
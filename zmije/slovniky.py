@@ -0,0 +1,250 @@
+import hashlib
+import json
+import mmap
+import os
+import struct
+import threading
+import zlib
+
+# Externí slovníky klíčových slov. Zdrojem je soubor JSON
+#
+#   {"nazev": "vestavene", "slova": {"délka": "len", "převeď na text": "str"}}
+#
+# kde klíč je jedno nebo více českých slov oddělených mezerou a hodnota
+# anglický název, kterým se nahradí. Zdroj se při prvním použití přeloží do
+# binární hašovací tabulky .zsl, uloží se do mezipaměti na disku a dál se
+# jen mapuje přes mmap, takže načtení nezávisí na velikosti slovníku
+# a procesy sdílejí stránky tabulky. Soubor .zsl jde načíst i přímo.
+#
+# Formát .zsl:
+#   4 B  magie "ZSL\0"
+#   2 B  verze formátu (little endian)
+#   2 B  délka nejdelší sekvence slov
+#  32 B  SHA-256 zdroje
+#   8 B  velikost zdroje a 8 B jeho čas změny v ns (kontrola aktuálnosti)
+#   4 B  počet slotů (mocnina dvou) a 4 B počet záznamů
+#  sloty po 8 B: CRC-32 klíče a posun záznamu (0 = prázdný slot)
+#  záznamy: 4 B délka, pak "klíč\0příznak\0kandidáti" v UTF-8, kde klíč je
+#  poslední slovo sekvence malými písmeny, příznak "1" znamená, že slovo
+#  začíná některou sekvenci, a kandidáti jsou "sekvence\x1fnáhrada"
+#  oddělení "\x1e", od nejdelší sekvence.
+MAGIE = b"ZSL\0"
+VERZE_FORMATU = 1
+HLAVICKA = struct.Struct("<4sHH32sQqII")
+SLOT = struct.Struct("<II")
+DELKA = struct.Struct("<I")
+PRIPONA = ".zsl"
+
+# Paměť naposledy hledaných slov; identifikátory se v kódu opakují, takže
+# většina dotazů na tabulku vůbec nesáhne.
+VELIKOST_PAMETI = 1 << 14
+
+class ChybaSlovniku(ValueError):
+    pass
+
+def adresar_mezipameti():
+    koren = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(koren, "zmije", "slovniky")
+
+def je_nazev(text):
+    return bool(text) and all(cast.isidentifier() for cast in text.split("."))
+
+def nacti_zdroj(data, cesta="<slovnik>"):
+    # Vrací seznam dvojic (sekvence slov malými písmeny, náhrada).
+    try:
+        obsah = json.loads(data.decode("utf-8"))
+    except (UnicodeDecodeError, ValueError) as e:
+        raise ChybaSlovniku(f"Slovník {cesta} není platný JSON: {e}") from e
+    slova = obsah.get("slova") if isinstance(obsah, dict) else None
+    if not isinstance(slova, dict):
+        raise ChybaSlovniku(f"Slovník {cesta} musí být objekt s položkou 'slova'.")
+
+    polozky = []
+    for klic, nahrada in slova.items():
+        sekvence = tuple(slovo.lower() for slovo in klic.split())
+        if not sekvence or not all(slovo.isidentifier() for slovo in sekvence):
+            raise ChybaSlovniku(f"Slovník {cesta}: '{klic}' není sekvence názvů.")
+        if not isinstance(nahrada, str) or not je_nazev(nahrada):
+            raise ChybaSlovniku(f"Slovník {cesta}: náhrada za '{klic}' musí být název.")
+        polozky.append((sekvence, nahrada))
+    return polozky
+
+def sestav_tabulku(data, velikost=0, cas_zmeny=0, cesta="<slovnik>"):
+    polozky = nacti_zdroj(data, cesta)
+    zaznamy = {}
+    for sekvence, nahrada in polozky:
+        zaznamy.setdefault(sekvence[-1], [False, []])[1].append((sekvence, nahrada))
+        zaznamy.setdefault(sekvence[0], [False, []])[0] = True
+
+    pocet_slotu = 8
+    while pocet_slotu < 2 * len(zaznamy):
+        pocet_slotu *= 2
+    sloty = [(0, 0)] * pocet_slotu
+    telo = bytearray()
+    zacatek = HLAVICKA.size + pocet_slotu * SLOT.size
+
+    for klic in sorted(zaznamy):
+        prvni, kandidati = zaznamy[klic]
+        kandidati.sort(key=lambda k: -len(k[0]))
+        zaznam = "\0".join([
+            klic, "1" if prvni else "0",
+            "\x1e".join(" ".join(sekvence) + "\x1f" + nahrada for sekvence, nahrada in kandidati),
+        ]).encode("utf-8")
+        klic_bajty = klic.encode("utf-8")
+        otisk = zlib.crc32(klic_bajty)
+        i = otisk & (pocet_slotu - 1)
+        while sloty[i][1]:
+            i = (i + 1) & (pocet_slotu - 1)
+        sloty[i] = (otisk, zacatek + len(telo))
+        telo += DELKA.pack(len(zaznam)) + zaznam
+
+    max_delka = max([len(sekvence) for sekvence, _ in polozky] + [1])
+    hlavicka = HLAVICKA.pack(
+        MAGIE, VERZE_FORMATU, max_delka, hashlib.sha256(data).digest(),
+        velikost, cas_zmeny, pocet_slotu, len(zaznamy),
+    )
+    return hlavicka + b"".join(SLOT.pack(*slot) for slot in sloty) + bytes(telo)
+
+def precti_hlavicku(tabulka):
+    if len(tabulka) < HLAVICKA.size:
+        raise ChybaSlovniku("Tabulka slovníku je kratší než její hlavička.")
+    hlavicka = HLAVICKA.unpack_from(tabulka)
+    if hlavicka[0] != MAGIE:
+        raise ChybaSlovniku("Soubor není tabulka slovníku Zmije (.zsl).")
+    if hlavicka[1] != VERZE_FORMATU:
+        raise ChybaSlovniku(f"Nepodporovaná verze formátu slovníku: {hlavicka[1]}.")
+    return hlavicka
+
+def zapis_tabulku(cil, tabulka):
+    docasny = f"{cil}.{os.getpid()}.tmp"
+    try:
+        with open(docasny, "wb") as f:
+            f.write(tabulka)
+        os.replace(docasny, cil)
+    except BaseException:
+        if os.path.exists(docasny):
+            os.remove(docasny)
+        raise
+
+def dekoduj_zaznam(prvni, kandidati):
+    if not kandidati:
+        return prvni == b"1", ()
+    return prvni == b"1", tuple(
+        (tuple(sekvence.split(" ")), nahrada)
+        for sekvence, nahrada in (k.split("\x1f") for k in kandidati.decode("utf-8").split("\x1e"))
+    )
+
+PRAZDNY_ZAZNAM = (False, ())
+
+class Slovnik:
+    # Slovník se připraví až při prvním dotazu; do té doby je to jen cesta.
+    def __init__(self, cesta, mezipamet=None):
+        self.cesta = os.path.abspath(cesta)
+        self.mezipamet = mezipamet
+        self.zamek = threading.Lock()
+        self.tabulka = None
+        self.mapa = None
+        self.pamet = {}
+
+    def cesta_tabulky(self):
+        adresar = self.mezipamet or adresar_mezipameti()
+        nazev = hashlib.sha256(self.cesta.encode("utf-8", "surrogatepass")).hexdigest()[:32]
+        return os.path.join(adresar, nazev + PRIPONA)
+
+    def priprav(self):
+        if self.tabulka is not None:
+            return self.tabulka
+        with self.zamek:
+            if self.tabulka is None:
+                tabulka = self.otevri()
+                hlavicka = precti_hlavicku(tabulka)
+                self.max_delka = hlavicka[2]
+                self.otisk = hlavicka[3].hex()
+                self.pocet_slotu = hlavicka[6]
+                self.tabulka = tabulka
+        return self.tabulka
+
+    def otevri(self):
+        with open(self.cesta, "rb") as f:
+            if f.read(len(MAGIE)) == MAGIE:
+                return self.namapuj(self.cesta)
+
+        stat = os.stat(self.cesta)
+        cil = self.cesta_tabulky()
+        try:
+            tabulka = self.namapuj(cil)
+            _, _, _, _, velikost, cas_zmeny, _, _ = precti_hlavicku(tabulka)
+            if (velikost, cas_zmeny) == (stat.st_size, stat.st_mtime_ns):
+                return tabulka
+        except (OSError, ValueError):
+            pass
+        self.zavri()
+
+        with open(self.cesta, "rb") as f:
+            data = f.read()
+        tabulka = sestav_tabulku(data, stat.st_size, stat.st_mtime_ns, self.cesta)
+        try:
+            os.makedirs(os.path.dirname(cil), exist_ok=True)
+            zapis_tabulku(cil, tabulka)
+            return self.namapuj(cil)
+        except OSError:
+            # Bez zapisovatelné mezipaměti se tabulka drží jen v tomto procesu.
+            return tabulka
+
+    def namapuj(self, cesta):
+        with open(cesta, "rb") as f:
+            self.mapa = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return self.mapa
+
+    def zavri(self):
+        if self.mapa is not None:
+            self.mapa.close()
+            self.mapa = None
+
+    def vyhledej(self, slovo):
+        tabulka = self.priprav()
+        klic = slovo.encode("utf-8", "surrogatepass")
+        otisk = zlib.crc32(klic)
+        maska = self.pocet_slotu - 1
+        i = otisk & maska
+        while True:
+            otisk_slotu, posun = SLOT.unpack_from(tabulka, HLAVICKA.size + i * SLOT.size)
+            if not posun:
+                return PRAZDNY_ZAZNAM
+            if otisk_slotu == otisk:
+                delka, = DELKA.unpack_from(tabulka, posun)
+                nalezeny, prvni, kandidati = tabulka[posun + DELKA.size:posun + DELKA.size + delka].split(b"\0", 2)
+                if nalezeny == klic:
+                    return dekoduj_zaznam(prvni, kandidati)
+            i = (i + 1) & maska
+
+    def zaznam(self, slovo):
+        zaznam = self.pamet.get(slovo)
+        if zaznam is None:
+            zaznam = self.vyhledej(slovo)
+            if len(self.pamet) >= VELIKOST_PAMETI:
+                self.pamet.clear()
+            self.pamet[slovo] = zaznam
+        return zaznam
+
+    def kandidati(self, slovo):
+        # Sekvence končící daným slovem (malými písmeny), od nejdelší.
+        return self.zaznam(slovo)[1]
+
+    def je_prvni_slovo(self, slovo):
+        return self.zaznam(slovo)[0]
+
+    def otisk_slovniku(self):
+        self.priprav()
+        return self.otisk
+
+    def nejdelsi_sekvence(self):
+        self.priprav()
+        return self.max_delka
+
+def sestav_soubor(zdroj, cil):
+    # Předkompiluje slovník pro distribuci; načte se pak bez mezipaměti.
+    with open(zdroj, "rb") as f:
+        data = f.read()
+    zapis_tabulku(cil, sestav_tabulku(data, cesta=zdroj))
+    return cil
@@ -0,0 +1,165 @@
+import ast
+import fnmatch
+import hashlib
+import importlib.util
+import marshal
+import os
+import sys
+import types
+
+import pytest
+
+from zmije.main import ChybaValidace, dekoduj_zdroj, otisk_prepisu, transpiluj, zakoduj_kusy
+
+# Zásuvný modul pro pytest (registrovaný vstupním bodem pytest11), který
+# sbírá testy psané v Zmiji. Moduly odpovídající zmije_files se přetlumočí,
+# jejich assert se přepíše stejně jako v .py testech a výsledný bajtkód se
+# uloží do .pytest_cache/d/zmije pod otiskem obsahu, takže další běhy
+# (i jednotlivé procesy pytest-xdist) už nic netlumočí.
+
+def pytest_addoption(parser):
+    parser.addini(
+        "zmije_files", type="args", default=["test_*.zm", "*_test.zm"],
+        help="vzory jmen testovacích modulů v Zmiji",
+    )
+    parser.addini(
+        "zmije_dovoz", default="auto",
+        help="import modulů .zm z testů (zmije.dovoz): auto (jen když se sbírají "
+        "testy .zm), true (vždy) nebo false",
+    )
+
+# Háky importu jsou globální pro celý proces, takže je zásuvný modul, který
+# se načítá do každého běhu pytest, zapíná jen tam, kde jsou testy v Zmiji.
+DOVOZ_NAINSTALOVAN = pytest.StashKey()
+
+def rezim_dovozu(config):
+    rezim = str(config.getini("zmije_dovoz")).strip().lower()
+    if rezim in ("true", "1", "yes", "on", "ano"):
+        return True
+    if rezim in ("false", "0", "no", "off", "ne"):
+        return False
+    return None
+
+def zapni_dovoz(config):
+    if DOVOZ_NAINSTALOVAN in config.stash:
+        return
+    from zmije import dovoz
+
+    config.stash[DOVOZ_NAINSTALOVAN] = dovoz.HAK_ADRESARU not in sys.path_hooks
+    dovoz.instaluj()
+
+def pytest_configure(config):
+    if rezim_dovozu(config):
+        zapni_dovoz(config)
+
+def pytest_unconfigure(config):
+    if config.stash.get(DOVOZ_NAINSTALOVAN, False):
+        from zmije import dovoz
+
+        dovoz.odinstaluj()
+
+def pytest_collect_file(file_path, parent):
+    if file_path.suffix != ".zm":
+        return None
+    if not any(fnmatch.fnmatch(file_path.name, vzor) for vzor in parent.config.getini("zmije_files")):
+        return None
+    if rezim_dovozu(parent.config) is None:
+        zapni_dovoz(parent.config)
+    return ZmijeModul.from_parent(parent, path=file_path)
+
+def jmeno_modulu(cesta):
+    # Jako --import-mode=prepend: jméno vede přes nadřazené balíčky
+    # (adresáře s __init__.py nebo __init__.zm) a jejich kořen jde na sys.path.
+    casti = [os.path.splitext(os.path.basename(cesta))[0]]
+    adresar = os.path.dirname(cesta)
+    while any(os.path.exists(os.path.join(adresar, init)) for init in ("__init__.py", "__init__.zm")):
+        casti.insert(0, os.path.basename(adresar))
+        adresar = os.path.dirname(adresar)
+    return ".".join(casti), adresar
+
+def klic_kodu(zdroj, cesta, prepsat_asserty):
+    otisk = hashlib.sha256(zdroj)
+    for cast in (otisk_prepisu(), importlib.util.MAGIC_NUMBER.hex(), pytest.__version__, cesta, str(prepsat_asserty)):
+        otisk.update(b"\0" + cast.encode("utf-8", "surrogatepass"))
+    return otisk.hexdigest()
+
+def zkompiluj(zdroj, cesta, config, prepsat_asserty):
+    # Kódování podle PEP 263 jako při importu. Přepis assertů tokenizuje
+    # bajty podle deklarace kódování, proto dostane kód ve stejném kódování.
+    kod, kodovani = dekoduj_zdroj(zdroj)
+    kod = transpiluj(kod)
+    strom = ast.parse(kod, cesta)
+    if prepsat_asserty:
+        from _pytest.assertion.rewrite import rewrite_asserts
+
+        rewrite_asserts(strom, zakoduj_kusy((kod,), kodovani), cesta, config)
+    return compile(strom, cesta, "exec", dont_inherit=True)
+
+def nacti_kod(config, cesta):
+    with open(cesta, "rb") as f:
+        zdroj = f.read()
+    prepsat_asserty = config.getoption("assertmode", "plain") == "rewrite"
+
+    # S -p no:cacheprovider config.cache vůbec neexistuje.
+    cache = getattr(config, "cache", None)
+    adresar = cache.mkdir("zmije") if cache is not None else None
+    if adresar is None:
+        return zkompiluj(zdroj, cesta, config, prepsat_asserty)
+
+    soubor = os.path.join(str(adresar), klic_kodu(zdroj, cesta, prepsat_asserty) + ".bin")
+    try:
+        with open(soubor, "rb") as f:
+            return marshal.loads(f.read())
+    except (OSError, EOFError, ValueError, TypeError):
+        pass
+
+    kod_objekt = zkompiluj(zdroj, cesta, config, prepsat_asserty)
+    # Souběžné procesy xdist mohou zapisovat stejný klíč; přejmenování je
+    # atomické a obsah je pro stejný klíč vždy stejný.
+    docasny = f"{soubor}.{os.getpid()}.tmp"
+    try:
+        with open(docasny, "wb") as f:
+            f.write(marshal.dumps(kod_objekt))
+        os.replace(docasny, soubor)
+    except OSError:
+        if os.path.exists(docasny):
+            os.remove(docasny)
+    return kod_objekt
+
+class ZmijeModul(pytest.Module):
+    def _getobj(self):
+        cesta = str(self.path)
+        try:
+            kod_objekt = nacti_kod(self.config, cesta)
+        except (ChybaValidace, ValueError, SyntaxError, UnicodeDecodeError) as e:
+            raise self.CollectError(f"Modul {cesta} nelze přetlumočit:\n{e}") from e
+
+        jmeno, koren = jmeno_modulu(cesta)
+        if koren not in sys.path:
+            sys.path.insert(0, koren)
+        stary = sys.modules.get(jmeno)
+        if stary is not None and os.path.normcase(getattr(stary, "__file__", "") or "") != os.path.normcase(cesta):
+            raise self.CollectError(
+                f"Modul {jmeno!r} už je načtený ze souboru {stary.__file__}, "
+                f"nelze jej znovu načíst z {cesta}; použijte jedinečná jména testovacích modulů."
+            )
+
+        modul = types.ModuleType(jmeno)
+        modul.__file__ = cesta
+        if "." in jmeno:
+            modul.__package__ = jmeno.rpartition(".")[0]
+        sys.modules[jmeno] = modul
+        try:
+            exec(kod_objekt, modul.__dict__)
+        except pytest.skip.Exception as e:
+            del sys.modules[jmeno]
+            if e.allow_module_level:
+                raise
+            raise self.CollectError(
+                "pytest.skip mimo test přeskočí celý modul jen s allow_module_level=True."
+            ) from e
+        except BaseException:
+            del sys.modules[jmeno]
+            raise
+        self.config.pluginmanager.consider_module(modul)
+        return modul
@@ -0,0 +1,90 @@
+import os
+import py_compile
+import stat
+import zipfile
+
+from zmije.artefakt import sestav_pyc
+from zmije.dovoz import PRIPONA
+from zmije.main import dekoduj_zdroj, transpiluj
+
+# Pevné datum a práva zajistí, že stejný zdroj dá bajtově stejný archiv.
+DATUM = (1980, 1, 1, 0, 0, 0)
+
+SABLONA_HLAVNIHO = """import sys
+import {modul}
+sys.exit({modul}.{funkce}())
+"""
+
+def zapis_clen(archiv, jmeno, data):
+    info = zipfile.ZipInfo(jmeno, DATUM)
+    info.compress_type = zipfile.ZIP_DEFLATED
+    info.external_attr = 0o644 << 16
+    archiv.writestr(info, data)
+
+def zkompiluj_do_pyc(zdroj, jmeno, je_zmije):
+    # Jako při importu: kódování podle deklarace PEP 263 nebo BOM.
+    text, _ = dekoduj_zdroj(zdroj)
+    if je_zmije:
+        text = transpiluj(text)
+    kod = compile(text, jmeno, "exec", dont_inherit=True)
+    # Archiv zdroje neobsahuje, takže hash se při importu nekontroluje.
+    return sestav_pyc(kod, zdroj, py_compile.PycInvalidationMode.UNCHECKED_HASH)
+
+def zabal(adresar, cil, hlavni=None, interpret=None):
+    # Zabalí strom s moduly .zm a .py do spustitelného archivu, ve kterém jsou
+    # jen předkompilované .pyc. Archiv pak spustí i Python bez nainstalované Zmije.
+    clenove = []
+    for koren, adresare, soubory in os.walk(adresar):
+        adresare[:] = sorted(d for d in adresare if d != "__pycache__" and not d.startswith("."))
+        relativni = os.path.relpath(koren, adresar)
+        for soubor in sorted(soubory):
+            cesta = os.path.join(koren, soubor)
+            jmeno = soubor if relativni == "." else "/".join(relativni.split(os.sep) + [soubor])
+            clenove.append((cesta, jmeno))
+
+    jmena = {jmeno for _, jmeno in clenove}
+    ma_hlavni = "__main__" + PRIPONA in jmena or "__main__.py" in jmena
+    if hlavni is None and not ma_hlavni:
+        raise ValueError("Archiv nemá __main__; zadejte vstupní bod ve tvaru modul:funkce.")
+    if hlavni is not None:
+        if ma_hlavni:
+            raise ValueError("Strom už obsahuje modul __main__; vstupní bod nelze zadat zároveň.")
+        modul, _, funkce = hlavni.partition(":")
+        if not modul or not funkce:
+            raise ValueError("Vstupní bod musí mít tvar modul:funkce.")
+
+    # Archiv vzniká v dočasném souboru, takže chyba v některém modulu
+    # nenechá na místě cíle napůl zapsaný archiv.
+    docasny = f"{cil}.{os.getpid()}.tmp"
+    try:
+        with open(docasny, "wb") as f:
+            if interpret:
+                f.write(b"#!" + interpret.encode("utf-8") + b"\n")
+            with zipfile.ZipFile(f, "w") as archiv:
+                for cesta, jmeno in clenove:
+                    zaklad, pripona = os.path.splitext(jmeno)
+                    if pripona in (".pyc", ".pyo", ".zmc"):
+                        continue
+                    with open(cesta, "rb") as zdroj:
+                        data = zdroj.read()
+                    if pripona == PRIPONA:
+                        if zaklad + ".py" in jmena:
+                            continue
+                        zapis_clen(archiv, zaklad + ".pyc", zkompiluj_do_pyc(data, jmeno, True))
+                    elif pripona == ".py":
+                        zapis_clen(archiv, zaklad + ".pyc", zkompiluj_do_pyc(data, jmeno, False))
+                    else:
+                        zapis_clen(archiv, jmeno, data)
+
+                if hlavni is not None:
+                    zdroj = SABLONA_HLAVNIHO.format(modul=modul, funkce=funkce).encode("utf-8")
+                    zapis_clen(archiv, "__main__.pyc", zkompiluj_do_pyc(zdroj, "__main__.py", False))
+        os.replace(docasny, cil)
+    except BaseException:
+        if os.path.exists(docasny):
+            os.remove(docasny)
+        raise
+
+    if interpret:
+        os.chmod(cil, os.stat(cil).st_mode | stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH)
+    return cil